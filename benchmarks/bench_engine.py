@@ -0,0 +1,104 @@
+"""
+Many threads waiting for SMS at once: thread-per-activation :class:`SmsHubWrapper` vs :class:`EngineWrapper`
+running all requests and polling on one event loop. Wall time, client CPU time, peak open sockets and
+wait time of each activation, against :class:`SmsHubStub` in a separate process
+
+    python benchmarks/bench_engine.py [--threads 500] [--interval 0.25] [--limit 20]
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from smshub_py import SmsHubWrapper, SmsActivation  # noqa: E402
+from smshub_py.engine import AsyncEngine, EngineWrapper  # noqa: E402
+from smshub_py.stub import SmsHubStub  # noqa: E402
+
+
+def serve(urls: multiprocessing.Queue, done: multiprocessing.Event):
+    with SmsHubStub(prices={(0, 'tg'): (1., 10 ** 6)}, balance=10 ** 9,
+                    sms_delay=lambda: random.uniform(1, 3)) as stub:
+        urls.put(stub.base_url)
+        done.wait()
+
+
+def open_sockets() -> int:
+    try:
+        fds = os.listdir('/proc/self/fd')
+    except OSError:
+        return -1
+    count = 0
+    for fd in fds:
+        try:
+            count += os.readlink(f'/proc/self/fd/{fd}').startswith('socket:')
+        except OSError:
+            pass
+    return count
+
+
+class _PeakSockets(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = 0
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(0.05):
+            self.peak = max(self.peak, open_sockets())
+
+
+def run(name: str, w, threads: int, interval: float):
+    timings = []
+
+    def one(_):
+        with SmsActivation(None, 'tg', country=0, wrapper=w, lazy=True) as a:
+            start = time.perf_counter()
+            a.wait_for_sms(interval=interval)
+            timings.append(time.perf_counter() - start)
+            a.finish()
+
+    sockets = _PeakSockets()
+    sockets.start()
+    start, cpu = time.perf_counter(), time.process_time()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(one, range(threads)))
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+    sockets.done.set()
+    sockets.join()
+    timings.sort()
+    print(f'{name:<24} wall {elapsed:6.2f} s   cpu {cpu:6.2f} s   peak sockets {sockets.peak:5}   '
+          f'wait p50 {timings[len(timings) // 2]:5.2f} s   p99 {timings[int(len(timings) * 0.99)]:5.2f} s')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=500)
+    parser.add_argument('--interval', type=float, default=0.25)
+    parser.add_argument('--limit', type=int, default=20, help='connections of EngineWrapper')
+    args = parser.parse_args()
+    urls, done = multiprocessing.Queue(), multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(urls, done), daemon=True)
+    server.start()
+    base_url = urls.get()
+    try:
+        limits = httpx.Limits(max_connections=args.threads, max_keepalive_connections=args.threads)
+        with SmsHubWrapper('KEY', base_url=base_url, limits=limits) as w:
+            run('thread per activation', w, args.threads, args.interval)
+        with AsyncEngine(interval=args.interval) as engine, \
+                EngineWrapper('KEY', base_url=base_url, engine=engine, limit=args.limit) as w:
+            run('EngineWrapper', w, args.threads, args.interval)
+    finally:
+        done.set()
+        server.join()
+
+
+if __name__ == '__main__':
+    main()
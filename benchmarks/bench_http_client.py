@@ -0,0 +1,44 @@
+"""
+Per-call latency of `getStatus`: new connection on every call vs pooled :class:`SmsHubWrapper`
+
+    python benchmarks/bench_http_client.py [calls]
+"""
+import os
+import sys
+import time
+import statistics
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from smshub_py import SmsHubWrapper  # noqa: E402
+from smshub_py.stub import SmsHubStub  # noqa: E402
+
+
+def measure(call, calls: int) -> list[float]:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name: str, timings: list[float]):
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99) - 1]
+    print(f'{name:<12} mean {statistics.mean(timings) * 1e3:7.3f} ms   '
+          f'p50 {statistics.median(timings) * 1e3:7.3f} ms   p99 {p99 * 1e3:7.3f} ms')
+
+
+def main(calls: int = 1000):
+    with SmsHubStub() as stub, SmsHubWrapper('KEY', base_url=stub.base_url) as w:
+        id_, _ = w.get_number('tg', country=0)
+        params = {'api_key': 'KEY', 'action': 'getStatus', 'id': id_}
+        report('per-call', measure(lambda: httpx.get(stub.base_url, params=params), calls))
+        report('pooled', measure(lambda: w.get_status(id_), calls))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
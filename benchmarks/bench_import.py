@@ -0,0 +1,64 @@
+"""
+Cold import time of package entry points, each in a fresh interpreter, and HTTP clients they pull in.
+Fails if a sync-only entry point loads aiohttp or the asyncio subpackage, or a module without requests
+loads any HTTP client
+
+    python benchmarks/bench_import.py [--runs 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+HEAVY = ('httpx', 'aiohttp', 'asyncio', 'smshub_py.asyncio')
+
+# Statement: modules it must not load
+ENTRY_POINTS = {
+    'import smshub_py': HEAVY,
+    'from smshub_py.utils import country_to_id, find_min_prices': HEAVY,
+    'from smshub_py.status import STATUS_OK': HEAVY,
+    'from smshub_py.pricebook import PriceBook': HEAVY,
+    'from smshub_py.journal import SqliteJournal': HEAVY,
+    'from smshub_py.routing import Router': HEAVY,
+    'from smshub_py import SmsActivation': ('aiohttp', 'asyncio', 'smshub_py.asyncio'),
+    'from smshub_py.pool import WrapperPool': ('aiohttp', 'asyncio', 'smshub_py.asyncio'),
+    'from smshub_py.asyncio import AsyncSmsActivation': ('httpx',),
+}
+
+PROBE = '''
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, *(m for m in {heavy!r} if m in sys.modules))
+'''
+
+
+def measure(statement: str, runs: int) -> tuple[float, list[str]]:
+    timings, loaded = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(statement=statement, heavy=HEAVY)], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.split()
+        timings.append(float(out[0]))
+        loaded = out[1:]
+    return statistics.median(timings), loaded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=15)
+    args = parser.parse_args()
+    failed = False
+    for statement, forbidden in ENTRY_POINTS.items():
+        elapsed, loaded = measure(statement, args.runs)
+        unexpected = [m for m in loaded if m in forbidden]
+        failed = failed or bool(unexpected)
+        print(f'{statement:60} {elapsed * 1000:8.1f} ms  loads: {", ".join(loaded) or "-":30}'
+              f'{"  UNEXPECTED: " + ", ".join(unexpected) if unexpected else ""}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Load benchmarks against the local :class:`SmsHubStub`: throughput and latency of both wrappers,
+many parallel `wait_for_sms` and bulk number acquisition
+
+    python benchmarks/bench_load.py [--requests 2000] [--concurrency 32] [--activations 200] [--latency 0.002]
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from smshub_py import SmsHubWrapper, ActivationPoller, acquire_many  # noqa: E402
+from smshub_py.asyncio import AsyncSmsHubWrapper, AsyncActivationPoller, async_acquire_many  # noqa: E402
+from smshub_py.stub import SmsHubStub  # noqa: E402
+
+
+def report(name: str, elapsed: float, operations: int, timings: list[float] = (), requests: int = None):
+    line = f'{name:<28} {operations / elapsed:9.0f} ops/s'
+    if timings:
+        timings = sorted(timings)
+        p50, p99 = timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+        line += f'   p50 {p50 * 1e3:7.2f} ms   p99 {p99 * 1e3:7.2f} ms'
+    if requests is not None:
+        line += f'   {requests} requests'
+    print(line)
+
+
+def timed(call, timings: list[float]):
+    start = time.perf_counter()
+    result = call()
+    timings.append(time.perf_counter() - start)
+    return result
+
+
+async def async_timed(coro, timings: list[float]):
+    start = time.perf_counter()
+    result = await coro
+    timings.append(time.perf_counter() - start)
+    return result
+
+
+def stub(args, **kwargs) -> SmsHubStub:
+    prices = {(c, 'tg'): (1., 10 ** 6) for c in range(5)}
+    return SmsHubStub(latency=args.latency, prices=prices, balance=10 ** 9, **kwargs)
+
+
+def wrapper(args, s: SmsHubStub) -> SmsHubWrapper:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    return SmsHubWrapper('KEY', base_url=s.base_url, limits=limits)
+
+
+def bench_sync_status(args):
+    with stub(args) as s, wrapper(args, s) as w:
+        id_, _ = w.get_number('tg', country=0)
+        timings = []
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            list(executor.map(lambda _: timed(lambda: w.get_status(id_), timings), range(args.requests)))
+        report('sync getStatus', time.perf_counter() - start, args.requests, timings)
+
+
+async def bench_async_status(args):
+    with stub(args) as s:
+        async with AsyncSmsHubWrapper('KEY', base_url=s.base_url, limit=args.concurrency) as w:
+            id_, _ = await w.get_number('tg', country=0)
+            timings = []
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def one():
+                async with semaphore:
+                    await async_timed(w.get_status(id_), timings)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(args.requests)))
+            report('async getStatus', time.perf_counter() - start, args.requests, timings)
+
+
+def bench_sync_bulk(args):
+    with stub(args) as s, wrapper(args, s) as w:
+        start = time.perf_counter()
+        result = acquire_many(w, 'tg', args.activations, countries=range(5), max_concurrency=args.concurrency)
+        report('sync acquire_many', time.perf_counter() - start, args.activations, requests=s.requests['getNumber'])
+        assert len(result.activations) == args.activations
+
+
+async def bench_async_bulk(args):
+    with stub(args) as s:
+        async with AsyncSmsHubWrapper('KEY', base_url=s.base_url) as w:
+            start = time.perf_counter()
+            result = await async_acquire_many(w, 'tg', args.activations, countries=range(5),
+                                              max_concurrency=args.concurrency)
+            report('async acquire_many', time.perf_counter() - start, args.activations,
+                   requests=s.requests['getNumber'])
+            assert len(result.activations) == args.activations
+
+
+def bench_sync_wait(args, use_poller: bool):
+    with stub(args, sms_delay=lambda: random.uniform(0.5, 2)) as s, wrapper(args, s) as w:
+        activations = acquire_many(w, 'tg', args.activations, max_concurrency=args.concurrency).activations
+        timings = []
+        start = time.perf_counter()
+        if use_poller:
+            with ActivationPoller(interval=0.25, workers=args.concurrency) as poller:
+                futures = [poller.add(a, callback=lambda _: timings.append(time.perf_counter() - start))
+                           for a in activations]
+                for f in futures:
+                    f.result()
+            name = 'sync wait_for_sms (poller)'
+        else:
+            with ThreadPoolExecutor(len(activations)) as executor:
+                list(executor.map(lambda a: timed(lambda: a.wait_for_sms(interval=0.25), timings), activations))
+            name = 'sync wait_for_sms'
+        report(name, time.perf_counter() - start, len(activations), timings, s.requests['getStatus'])
+
+
+async def bench_async_wait(args, use_poller: bool):
+    with stub(args, sms_delay=lambda: random.uniform(0.5, 2)) as s:
+        async with AsyncSmsHubWrapper('KEY', base_url=s.base_url) as w:
+            result = await async_acquire_many(w, 'tg', args.activations, max_concurrency=args.concurrency)
+            timings = []
+            start = time.perf_counter()
+            if use_poller:
+                async with AsyncActivationPoller(interval=0.25, max_concurrency=args.concurrency) as poller:
+                    await asyncio.gather(*(
+                        poller.add(a, callback=lambda _: timings.append(time.perf_counter() - start))
+                        for a in result.activations))
+                name = 'async wait_for_sms (poller)'
+            else:
+                await asyncio.gather(*(async_timed(a.wait_for_sms(interval=0.25), timings)
+                                       for a in result.activations))
+                name = 'async wait_for_sms'
+            report(name, time.perf_counter() - start, len(result.activations), timings, s.requests['getStatus'])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--activations', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.002, help='Stub response delay (Seconds)')
+    args = parser.parse_args()
+    bench_sync_status(args)
+    asyncio.run(bench_async_status(args))
+    bench_sync_bulk(args)
+    asyncio.run(bench_async_bulk(args))
+    bench_sync_wait(args, use_poller=False)
+    bench_sync_wait(args, use_poller=True)
+    asyncio.run(bench_async_wait(args, use_poller=False))
+    asyncio.run(bench_async_wait(args, use_poller=True))
+
+
+if __name__ == '__main__':
+    main()
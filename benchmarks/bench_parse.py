@@ -0,0 +1,74 @@
+"""
+Per-response parsing overhead: previous comparison chain with repeated body decoding vs :mod:`smshub_py.responses`
+
+    python benchmarks/bench_parse.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from smshub_py import exceptions, responses  # noqa: E402
+from smshub_py.status import STATUS_OK, STATUS_WAIT_RETRY  # noqa: E402
+
+BODIES = [b'STATUS_WAIT_CODE', b'STATUS_OK:123456', b'ACCESS_NUMBER:123:79990000000', b'ACCESS_BALANCE:100.50']
+
+
+class _Response:
+    """Decodes body on every `text()` call like :meth:`aiohttp.ClientResponse.text`"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+
+    def text(self) -> str:
+        return self.body.decode('utf-8')
+
+
+def _process_status_before(r: _Response):
+    if r.text() == 'BAD_KEY':
+        raise exceptions.BadApiKey
+    elif r.text() == 'ERROR_SQL':
+        raise exceptions.SqlError
+    elif r.text() == 'NO_NUMBERS':
+        raise exceptions.NoNumbers
+    elif r.text() == 'NO_BALANCE':
+        raise exceptions.NoBalance
+    elif r.text() == 'WRONG_SERVICE':
+        raise exceptions.WrongService
+    elif r.text() == 'NO_ACTIVATION':
+        raise exceptions.NoActivation
+
+
+def before(body: bytes):
+    r = _Response(body)
+    _process_status_before(r)
+    if body.startswith(b'ACCESS_BALANCE'):
+        return float(r.text().replace('ACCESS_BALANCE:', ''))
+    if body.startswith(b'ACCESS_NUMBER'):
+        return tuple(map(int, r.text().split(':')[1:]))
+    if r.text().startswith(STATUS_WAIT_RETRY) or r.text().startswith(STATUS_OK):
+        status, code = r.text().split(':')
+        return status, code
+    return r.text(), 0
+
+
+def after(body: bytes):
+    text = responses.check(_Response(body).text())
+    if body.startswith(b'ACCESS_BALANCE'):
+        return responses.parse_balance(text)
+    if body.startswith(b'ACCESS_NUMBER'):
+        return responses.parse_number(text)
+    return responses.parse_status(text)
+
+
+def main(iterations: int = 200000):
+    for body in BODIES:
+        assert before(body) == after(body)
+        t_before = timeit.timeit(lambda: before(body), number=iterations) / iterations
+        t_after = timeit.timeit(lambda: after(body), number=iterations) / iterations
+        print(f'{body.decode():<32} before {t_before * 1e9:7.0f} ns   after {t_after * 1e9:7.0f} ns')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
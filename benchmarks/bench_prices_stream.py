@@ -0,0 +1,164 @@
+"""
+Unfiltered `getPrices` scan: full decode with `get_prices` vs incremental parsing with `stream_prices`.
+Time to first offer, total time and peak Python memory of the client on a large synthetic price matrix
+served by :class:`SmsHubStub` in a separate process
+
+    python benchmarks/bench_prices_stream.py [--countries 200] [--services 600]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from smshub_py import SmsHubWrapper  # noqa: E402
+from smshub_py.asyncio import AsyncSmsHubWrapper  # noqa: E402
+from smshub_py.stub import SmsHubStub  # noqa: E402
+
+SERVICE = 's7'
+
+
+def scan_dict(prices: dict) -> tuple[float, int]:
+    best, offers = float('inf'), 0
+    for country, services in prices.items():
+        for service, items in services.items():
+            for price, count in items.items():
+                offers += 1
+                if service == SERVICE and float(price) < best:
+                    best = float(price)
+    return best, offers
+
+
+class _Stub(SmsHubStub):
+    """Serves prebuilt `getPrices` body, so that the server side is not measured"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._prices_body = super()._getPrices({})
+
+    def _getPrices(self, query: dict[str, str]) -> str:
+        return self._prices_body
+
+
+def serve(countries: int, services: int, urls: multiprocessing.Queue, done: multiprocessing.Event):
+    prices = {(c, f's{s}'): (round(1 + (c * 31 + s * 17) % 997 / 10, 2), (c + s) % 500)
+              for c in range(countries) for s in range(services)}
+    with _Stub(prices=prices) as stub:
+        urls.put(stub.base_url)
+        done.wait()
+
+
+def report(name: str, first: float, elapsed: float, peak: int, best: float, offers: int):
+    print(f'{name:<28} first {first * 1e3:8.1f} ms   total {elapsed * 1e3:8.1f} ms   '
+          f'peak {peak / 2 ** 20:7.1f} MiB   {offers} offers, best {best}')
+
+
+def measure(name: str, run) -> float:
+    start = time.perf_counter()
+    first, best, offers = run(start)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run(time.perf_counter())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    report(name, first, elapsed, peak, best, offers)
+    return best
+
+
+async def async_measure(name: str, bench, w: AsyncSmsHubWrapper) -> float:
+    start = time.perf_counter()
+    first, best, offers = await bench(w, start)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    await bench(w, time.perf_counter())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    report(name, first, elapsed, peak, best, offers)
+    return best
+
+
+def sync_full(w: SmsHubWrapper):
+    def run(start):
+        prices = w.get_prices()
+        first = time.perf_counter() - start
+        return (first, *scan_dict(prices))
+    return run
+
+
+def sync_stream(w: SmsHubWrapper):
+    def run(start):
+        first, best, offers = None, float('inf'), 0
+        for record in w.stream_prices():
+            if first is None:
+                first = time.perf_counter() - start
+            offers += 1
+            if record.service == SERVICE and record.price < best:
+                best = record.price
+        return first, best, offers
+    return run
+
+
+def sync_stream_filtered(w: SmsHubWrapper):
+    def run(start):
+        first, best, offers = None, float('inf'), 0
+        for record in w.stream_prices(services={SERVICE}):
+            if first is None:
+                first = time.perf_counter() - start
+            offers += 1
+            best = min(best, record.price)
+        return first, best, offers
+    return run
+
+
+async def async_full(w: AsyncSmsHubWrapper, start):
+    prices = await w.get_prices()
+    first = time.perf_counter() - start
+    return (first, *scan_dict(prices))
+
+
+async def async_stream(w: AsyncSmsHubWrapper, start):
+    first, best, offers = None, float('inf'), 0
+    async for record in w.stream_prices():
+        if first is None:
+            first = time.perf_counter() - start
+        offers += 1
+        if record.service == SERVICE and record.price < best:
+            best = record.price
+    return first, best, offers
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--countries', type=int, default=200)
+    parser.add_argument('--services', type=int, default=600)
+    args = parser.parse_args()
+    urls, done = multiprocessing.Queue(), multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(args.countries, args.services, urls, done), daemon=True)
+    server.start()
+    base_url = urls.get()
+    try:
+        with SmsHubWrapper('KEY', base_url=base_url) as w:
+            w.get_balance()
+            results = {measure('sync get_prices', sync_full(w)),
+                       measure('sync stream_prices', sync_stream(w)),
+                       measure('sync stream_prices filtered', sync_stream_filtered(w))}
+
+        async def run_async():
+            async with AsyncSmsHubWrapper('KEY', base_url=base_url) as w:
+                await w.get_balance()
+                results.add(await async_measure('async get_prices', async_full, w))
+                results.add(await async_measure('async stream_prices', async_stream, w))
+
+        asyncio.run(run_async())
+    finally:
+        done.set()
+        server.join()
+    assert len(results) == 1
+
+
+if __name__ == '__main__':
+    main()
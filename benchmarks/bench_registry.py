@@ -0,0 +1,68 @@
+"""
+Many in-flight activations: :class:`SmsActivation` objects sharing one wrapper vs :class:`ActivationRegistry`.
+Memory per activation, full GC pass and finding activations waiting for code longer than a minute
+
+    python benchmarks/bench_registry.py [count]
+"""
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from smshub_py import SmsHubWrapper, SmsActivation  # noqa: E402
+from smshub_py.registry import ActivationRegistry  # noqa: E402
+from smshub_py.status import STATUS_WAIT_CODE, STATUS_OK  # noqa: E402
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    container = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    gc.collect()
+    return container, memory, time.perf_counter() - start
+
+
+def timed(call) -> float:
+    start = time.perf_counter()
+    call()
+    return time.perf_counter() - start
+
+
+def main(count: int = 100000):
+    w = SmsHubWrapper('KEY')
+
+    def activations():
+        result = {}
+        for i in range(count):
+            a = SmsActivation.from_number(i, 79990000000 + i, 'tg', wrapper=w, operator='any', country=0)
+            a.status = STATUS_OK if i % 10 == 0 else STATUS_WAIT_CODE
+            a.waiting_since = time.monotonic()
+            result[i] = a
+        return result
+
+    def registry():
+        r = ActivationRegistry(w)
+        for i in range(count):
+            r.add(i, 79990000000 + i, 'tg', 0, 'any', status=STATUS_OK if i % 10 == 0 else STATUS_WAIT_CODE)
+        return r
+
+    objects, memory, gc_time = measure(activations)
+    cutoff = time.monotonic() - 60
+    query = timed(lambda: [a for a in objects.values() if a.status == STATUS_WAIT_CODE and a.waiting_since < cutoff])
+    print(f'SmsActivation objects   {memory / count:6.0f} B each   gc {gc_time * 1e3:6.1f} ms   '
+          f'waiting > 60 s {query * 1e3:7.3f} ms')
+    del objects
+    r, memory, gc_time = measure(registry)
+    query = timed(lambda: r.older_than(STATUS_WAIT_CODE, 60))
+    print(f'ActivationRegistry      {memory / count:6.0f} B each   gc {gc_time * 1e3:6.1f} ms   '
+          f'waiting > 60 s {query * 1e3:7.3f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
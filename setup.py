@@ -20,5 +20,6 @@ setup(
     long_description=readme(),
     long_description_content_type='text/markdown',
     packages=find_packages(),
-    install_requires=[*requirements()]
+    install_requires=[*requirements()],
+    extras_require={'http2': ['httpx[http2]']}
 )
@@ -1,2 +1,35 @@
-from .wrapper import SmsHubWrapper
-from .activation import SmsActivation
+"""
+Public names are imported on first access, so submodules like :mod:`smshub_py.utils` and
+:mod:`smshub_py.status` load without HTTP clients
+"""
+from typing import TYPE_CHECKING
+import importlib
+
+if TYPE_CHECKING:
+    from .wrapper import SmsHubWrapper
+    from .activation import SmsActivation
+    from .poller import ActivationPoller
+    from .bulk import acquire_many, release_all
+
+_LAZY = {
+    'SmsHubWrapper': '.wrapper',
+    'SmsActivation': '.activation',
+    'ActivationPoller': '.poller',
+    'acquire_many': '.bulk',
+    'release_all': '.bulk',
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY})
@@ -1,36 +1,101 @@
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 import time
 
 from .wrapper import SmsHubWrapper
 from .status import *
-from .exceptions import IncorrectResponse, TimeoutException
+from .exceptions import IncorrectResponse, NoActivation, TimeoutException
+from .polling import PollingPolicy, FixedInterval, WaitResult
+
+_CODE_STATUSES = (STATUS_OK, STATUS_WAIT_RETRY)
+
+if TYPE_CHECKING:
+    from .poller import ActivationPoller
 
 
 class SmsActivation:
-    def __init__(self, api_key: str, service: str, operator: Optional[str] = None, country: Optional[int] = None,
-                 proxy: Optional[str] = None):
+    def __init__(self, api_key: Optional[str], service: str,
+                 operator: Optional[str] = None, country: Optional[int] = None, proxy: Optional[str] = None,
+                 wrapper: Optional[SmsHubWrapper] = None, lazy: bool = False):
         """
-        Provides convenient operations with activation on SmsHub
-        :param api_key: API key for SmsHub
+        Provides convenient operations with activation on SmsHub.
+        If the request after getting number fails, the number is released and own wrapper is closed
+        :param api_key: API key for SmsHub. May be `None` if `wrapper` passed
         :param service: Service code
         :param operator: Operator name
         :param country: Country ID
         :param proxy: protocol://ip:port OR protocol://user:password@ip:port
+        :param wrapper: Existing :class:`SmsHubWrapper` to share its connection pool between activations
+        :param lazy: Don't request status after getting number, assume `STATUS_WAIT_CODE`
+        """
+        self._setup(api_key, service, operator, country, proxy, wrapper)
+        try:
+            self.activation_id, self.phone = self.wrapper.get_number(service, operator, country)
+            if country is None and self.wrapper.router is not None:
+                self.country_code = self.wrapper.router.country_of(self.activation_id)
+            if lazy:
+                self.status = STATUS_WAIT_CODE
+            else:
+                self.update_status()
+        except BaseException:
+            # Neither `__exit__` nor the caller can release the number
+            try:
+                self._release_or_leak()
+            finally:
+                if self._own_wrapper:
+                    self.wrapper.close()
+            raise
+
+    @classmethod
+    def from_number(cls, activation_id: int, phone: int, service: str, wrapper: Optional[SmsHubWrapper] = None,
+                    api_key: Optional[str] = None, proxy: Optional[str] = None, operator: Optional[str] = None,
+                    country: Optional[int] = None) -> 'SmsActivation':
+        """
+        Take over activation got earlier, e.g. by another process. No requests are made,
+        status is unknown until :meth:`update_status`
+        :param activation_id: Activation ID
+        :param phone: Phone number
+        :param service: Service code
+        :param wrapper: Existing :class:`SmsHubWrapper`. Created from `api_key` and `proxy` if not passed
+        :param api_key: API key for SmsHub
+        :param proxy: protocol://ip:port OR protocol://user:password@ip:port
+        :param operator: Operator name
+        :param country: Country ID
         """
-        self.wrapper = SmsHubWrapper(key=api_key, proxy=proxy)
+        self = cls.__new__(cls)
+        self._setup(api_key, service, operator, country, proxy, wrapper)
+        self.activation_id, self.phone = activation_id, phone
+        return self
+
+    def _setup(self, api_key: Optional[str], service: str, operator: Optional[str], country: Optional[int],
+               proxy: Optional[str], wrapper: Optional[SmsHubWrapper]):
+        self._own_wrapper = wrapper is None
+        self.wrapper = SmsHubWrapper(key=api_key, proxy=proxy) if wrapper is None else wrapper
         self.service = service
         self.operator = operator
         self.country_code = country
-        self.activation_id, self.phone = self.wrapper.get_number(service, operator, country)
         self.code = None
         self.status = None
-        self.update_status()
+        self.closed = False
+        self.sent_at: Optional[float] = None
+        self.polls = 0
+        self.activation_id, self.phone = None, None
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        return
+        """
+        On exception the activation is released, see :meth:`release`.
+        Activation left open is reported to `Instrumentation.on_leak`
+        """
+        try:
+            if exc_type is not None:
+                self._release_or_leak()
+            elif not self.closed:
+                self._leak()
+        finally:
+            if self._own_wrapper:
+                self.wrapper.close()
 
     def sms_sent(self):
         """
@@ -39,6 +104,7 @@ class SmsActivation:
         r = self.wrapper.set_status(self.activation_id, status=SMS_SENT)
         if r != ACCESS_READY:
             raise IncorrectResponse(ACCESS_READY, r)
+        self.sent_at = time.monotonic()
 
     def cancel(self):
         """
@@ -47,6 +113,8 @@ class SmsActivation:
         r = self.wrapper.set_status(self.activation_id, status=CANCEL)
         if r != ACCESS_CANCEL:
             raise IncorrectResponse(ACCESS_CANCEL, r)
+        self.status = STATUS_CANCEL
+        self.closed = True
 
     def retry(self):
         """
@@ -55,6 +123,7 @@ class SmsActivation:
         r = self.wrapper.set_status(self.activation_id, status=SMS_RETRY)
         if r != ACCESS_RETRY_GET:
             raise IncorrectResponse(ACCESS_RETRY_GET, r)
+        self.sent_at = time.monotonic()
 
     def finish(self):
         """
@@ -63,28 +132,93 @@ class SmsActivation:
         r = self.wrapper.set_status(self.activation_id, status=SMS_ACCEPTED)
         if r != ACCESS_ACTIVATION:
             raise IncorrectResponse(ACCESS_ACTIVATION, r)
+        self.closed = True
+
+    def release(self):
+        """
+        Finish activation if code was received, otherwise cancel it. Does nothing if activation is closed.
+        If cancel is refused because SMS has just arrived, activation is finished
+        """
+        if self.closed or self.activation_id is None:
+            return
+        try:
+            if self.status in _CODE_STATUSES:
+                self.finish()
+                return
+            try:
+                self.cancel()
+            except IncorrectResponse:
+                self.update_status()
+                if self.status not in _CODE_STATUSES:
+                    raise
+                self.finish()
+        except NoActivation:
+            self.closed = True
+
+    def _release_or_leak(self) -> Optional[Exception]:
+        try:
+            self.release()
+        except Exception as e:
+            self._leak()
+            return e
+
+    def _leak(self):
+        if self.wrapper.instrumentation is not None:
+            self.wrapper.instrumentation.on_leak(self.activation_id)
 
     def update_status(self):
         """
         Get current activation status from SmsHub
         """
         s = self.wrapper.get_status(self.activation_id)
+        self.polls += 1
         self.status = s[0]
         if s[0] == STATUS_OK or s[0] == STATUS_WAIT_RETRY:
             self.code = s[1]
+        elif s[0] == STATUS_CANCEL:
+            self.closed = True
 
-    def wait_for_sms(self, interval: int = 1, timeout: int = 120):
+    def wait_for_sms(self, interval: Optional[float] = None, timeout: int = 120,
+                     poller: Optional['ActivationPoller'] = None, policy: Optional[PollingPolicy] = None) -> WaitResult:
         """
         Wait until new SMS got on SmsHub
-        :param interval: Interval of requests (Seconds)
+        :param interval: Interval of requests (Seconds). 1 by default, or the policy of `poller`
+            or of :class:`EngineWrapper`
         :param timeout: Timeout (Seconds). When time is off :class:`TimeoutException` will be raised
+        :param poller: Started :class:`ActivationPoller` to share requests with other activations.
+            Its policy is used instead of `interval`, unless `policy` is passed
+        :param policy: :class:`PollingPolicy` deciding when to make requests. Overrides `interval`
+        :return: Number of requests made and time spent waiting
         """
-        start_time = time.time()
-        while time.time() - start_time < timeout:
-            last_time = time.time()
+        start_time = time.monotonic()
+        if poller is not None:
+            polls = self.polls
+            poller.add(self, timeout=timeout, policy=policy).result()
+            return WaitResult(self.polls - polls, time.monotonic() - start_time)
+        wait = getattr(self.wrapper, 'wait_for_sms', None)
+        if wait is not None:
+            # Wrapper serving waits itself, e.g. :class:`EngineWrapper`
+            return wait(self, interval, timeout, policy)
+        policy = policy if policy is not None else FixedInterval(1 if interval is None else interval)
+        origin = self.sent_at if self.sent_at is not None else start_time
+        polls = 0
+        while True:
+            last_time = time.monotonic()
             self.update_status()
+            polls += 1
+            now = time.monotonic()
             if self.status == STATUS_OK:
-                break
-            time.sleep(abs(interval - (time.time() - last_time) * (interval > (time.time() - last_time))))
-        else:
-            raise TimeoutException
+                policy.record(self, now - origin)
+                self._report_wait(polls, now - start_time, True)
+                return WaitResult(polls, now - start_time)
+            remaining = start_time + timeout - now
+            if remaining <= 0:
+                self._report_wait(polls, now - start_time, False)
+                raise TimeoutException
+            time.sleep(min(max(last_time + policy.next_delay(self, polls, now - origin) - now, 0), remaining))
+
+    def _report_wait(self, polls: int, elapsed: float, received: bool):
+        if self.wrapper.instrumentation is not None:
+            self.wrapper.instrumentation.on_wait(polls, elapsed, received)
+        if self.wrapper.router is not None:
+            self.wrapper.router.record(self, elapsed, received)
@@ -1,2 +1,5 @@
 from .wrapper import AsyncSmsHubWrapper
 from .activation import AsyncSmsActivation
+from .poller import AsyncActivationPoller
+from .bulk import async_acquire_many, async_release_all
+from .watch import watch
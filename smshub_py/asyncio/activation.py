@@ -1,41 +1,110 @@
-from typing import Optional
+from typing import AsyncIterator, Optional, TYPE_CHECKING
 import time
 import asyncio
 
 from .wrapper import AsyncSmsHubWrapper
 from ..status import *
-from ..exceptions import IncorrectResponse, TimeoutException
+from ..exceptions import IncorrectResponse, NoActivation, TimeoutException
+from ..polling import PollingPolicy, FixedInterval, WaitResult
+
+_CODE_STATUSES = (STATUS_OK, STATUS_WAIT_RETRY)
+
+if TYPE_CHECKING:
+    from .poller import AsyncActivationPoller
+    from .watch import StatusWatcher, ActivationEvent
 
 
 class AsyncSmsActivation:
-    def __init__(self, api_key: str, service: str, operator: Optional[str] = '', country: Optional[int] = '',
-                 proxy: Optional[str] = None):
+    def __init__(self, api_key: Optional[str], service: str,
+                 operator: Optional[str] = '', country: Optional[int] = '', proxy: Optional[str] = None,
+                 wrapper: Optional[AsyncSmsHubWrapper] = None, lazy: bool = False):
         """
         Provides convenient asynchronous operations with activation on SmsHub
-        :param api_key: API key for SmsHub
+        :param api_key: API key for SmsHub. May be `None` if `wrapper` passed
         :param service: Service code
         :param operator: Operator name
         :param country: Country ID
         :param proxy: protocol://ip:port OR protocol://user:password@ip:port
+        :param wrapper: Existing :class:`AsyncSmsHubWrapper` to share its connection pool between activations
+        :param lazy: Don't request status after getting number, assume `STATUS_WAIT_CODE`
         """
-        self.wrapper = AsyncSmsHubWrapper(key=api_key, proxy=proxy)
+        self.lazy = lazy
+        self._own_wrapper = wrapper is None
+        self.wrapper = AsyncSmsHubWrapper(key=api_key, proxy=proxy) if wrapper is None else wrapper
         self.service = service
         self.operator = operator
         self.country_code = country
         self.code = None
         self.status = None
+        self.closed = False
+        self.sent_at: Optional[float] = None
+        self.polls = 0
         self.activation_id, self.phone = None, None
 
+    @classmethod
+    def from_number(cls, activation_id: int, phone: int, service: str,
+                    wrapper: Optional[AsyncSmsHubWrapper] = None, api_key: Optional[str] = None,
+                    proxy: Optional[str] = None, operator: Optional[str] = '',
+                    country: Optional[int] = '') -> 'AsyncSmsActivation':
+        """
+        Take over activation got earlier, e.g. by another process. No requests are made,
+        status is unknown until :meth:`update_status`
+        :param activation_id: Activation ID
+        :param phone: Phone number
+        :param service: Service code
+        :param wrapper: Existing :class:`AsyncSmsHubWrapper`. Created from `api_key` and `proxy` if not passed
+        :param api_key: API key for SmsHub
+        :param proxy: protocol://ip:port OR protocol://user:password@ip:port
+        :param operator: Operator name
+        :param country: Country ID
+        """
+        self = cls(api_key, service, operator, country, proxy, wrapper)
+        self.activation_id, self.phone = activation_id, phone
+        return self
+
     async def init_(self):
-        self.activation_id, self.phone = await self.wrapper.get_number(self.service, self.operator, self.country_code)
-        await self.update_status()
+        """
+        Get number. Does nothing if activation already has it.
+        If the request after getting number fails, the number is released and own wrapper is closed
+        """
+        if self.activation_id is not None:
+            return
+        try:
+            self.activation_id, self.phone = await self.wrapper.get_number(self.service, self.operator,
+                                                                           self.country_code)
+            if self.country_code in (None, '') and self.wrapper.router is not None:
+                routed = self.wrapper.router.country_of(self.activation_id)
+                self.country_code = self.country_code if routed is None else routed
+            if self.lazy:
+                self.status = STATUS_WAIT_CODE
+            else:
+                await self.update_status()
+        except BaseException:
+            # `__aexit__` does not run when `__aenter__` fails
+            try:
+                await self._release_or_leak()
+            finally:
+                if self._own_wrapper:
+                    await self.wrapper.close()
+            raise
 
     async def __aenter__(self):
         await self.init_()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        return
+        """
+        On exception, including cancellation of the task, the activation is released, see :meth:`release`.
+        Activation left open is reported to `Instrumentation.on_leak`
+        """
+        try:
+            if exc_type is not None:
+                await self._release_or_leak()
+            elif not self.closed:
+                self._leak()
+        finally:
+            if self._own_wrapper:
+                await self.wrapper.close()
 
     async def sms_sent(self):
         """
@@ -44,6 +113,7 @@ class AsyncSmsActivation:
         r = await self.wrapper.set_status(self.activation_id, status=SMS_SENT)
         if r != ACCESS_READY:
             raise IncorrectResponse(ACCESS_READY, r)
+        self.sent_at = time.monotonic()
 
     async def cancel(self):
         """
@@ -52,6 +122,8 @@ class AsyncSmsActivation:
         r = await self.wrapper.set_status(self.activation_id, status=CANCEL)
         if r != ACCESS_CANCEL:
             raise IncorrectResponse(ACCESS_CANCEL, r)
+        self.status = STATUS_CANCEL
+        self.closed = True
 
     async def retry(self):
         """
@@ -60,6 +132,7 @@ class AsyncSmsActivation:
         r = await self.wrapper.set_status(self.activation_id, status=SMS_RETRY)
         if r != ACCESS_RETRY_GET:
             raise IncorrectResponse(ACCESS_RETRY_GET, r)
+        self.sent_at = time.monotonic()
 
     async def finish(self):
         """
@@ -68,30 +141,101 @@ class AsyncSmsActivation:
         r = await self.wrapper.set_status(self.activation_id, status=SMS_ACCEPTED)
         if r != ACCESS_ACTIVATION:
             raise IncorrectResponse(ACCESS_ACTIVATION, r)
+        self.closed = True
+
+    async def release(self):
+        """
+        Finish activation if code was received, otherwise cancel it. Does nothing if activation is closed.
+        If cancel is refused because SMS has just arrived, activation is finished
+        """
+        if self.closed or self.activation_id is None:
+            return
+        try:
+            if self.status in _CODE_STATUSES:
+                await self.finish()
+                return
+            try:
+                await self.cancel()
+            except IncorrectResponse:
+                await self.update_status()
+                if self.status not in _CODE_STATUSES:
+                    raise
+                await self.finish()
+        except NoActivation:
+            self.closed = True
+
+    async def _release_or_leak(self) -> Optional[Exception]:
+        try:
+            await self.release()
+        except Exception as e:
+            self._leak()
+            return e
+
+    def _leak(self):
+        if self.wrapper.instrumentation is not None:
+            self.wrapper.instrumentation.on_leak(self.activation_id)
 
     async def update_status(self):
         """
         Get current activation status from SmsHub
         """
         s = await self.wrapper.get_status(self.activation_id)
+        self.polls += 1
         self.status = s[0]
         if s[0] == STATUS_OK or s[0] == STATUS_WAIT_RETRY:
             self.code = s[1]
+        elif s[0] == STATUS_CANCEL:
+            self.closed = True
 
-    async def wait_for_sms(self, interval: int = 1, timeout: int = 120):
+    async def wait_for_sms(self, interval: Optional[float] = None, timeout: int = 120,
+                           poller: Optional['AsyncActivationPoller'] = None,
+                           policy: Optional[PollingPolicy] = None) -> WaitResult:
         """
         Asynchronous wait until new SMS got on SmsHub
-        :param interval: Interval of requests (Seconds)
+        :param interval: Interval of requests (Seconds). 1 by default, or the policy of `poller`
         :param timeout: Timeout (Seconds). When time is off :class:`TimeoutException` will be raised
+        :param poller: Started :class:`AsyncActivationPoller` to share requests with other activations.
+            Its policy is used instead of `interval`, unless `policy` is passed
+        :param policy: :class:`PollingPolicy` deciding when to make requests. Overrides `interval`
+        :return: Number of requests made and time spent waiting
         """
+        start_time = time.monotonic()
+        if poller is not None:
+            polls = self.polls
+            await poller.add(self, timeout=timeout, policy=policy)
+            return WaitResult(self.polls - polls, time.monotonic() - start_time)
+        policy = policy if policy is not None else FixedInterval(1 if interval is None else interval)
+        origin = self.sent_at if self.sent_at is not None else start_time
+        polls = 0
         try:
             async with asyncio.timeout(timeout):
                 while True:
-                    last_time = time.time()
+                    last_time = time.monotonic()
                     await self.update_status()
+                    polls += 1
+                    now = time.monotonic()
                     if self.status == STATUS_OK:
-                        break
-                    await asyncio.sleep(
-                        abs(interval - (time.time() - last_time) * (interval > (time.time() - last_time))))
+                        policy.record(self, now - origin)
+                        self._report_wait(polls, now - start_time, True)
+                        return WaitResult(polls, now - start_time)
+                    await asyncio.sleep(max(last_time + policy.next_delay(self, polls, now - origin) - now, 0))
         except asyncio.TimeoutError:
+            self._report_wait(polls, time.monotonic() - start_time, False)
             raise TimeoutException
+
+    def events(self, watcher: Optional['StatusWatcher'] = None) -> AsyncIterator['ActivationEvent']:
+        """
+        Stream of status changes until activation is finished, cancelled or gone from SmsHub.
+        Polling is shared with other streams, see :func:`smshub_py.asyncio.watch.watch`
+        :param watcher: :class:`StatusWatcher` polling activation. Shared one by default
+        :return: Asynchronous iterator of events
+        """
+        from .watch import watch
+
+        return watch(self, watcher=watcher)
+
+    def _report_wait(self, polls: int, elapsed: float, received: bool):
+        if self.wrapper.instrumentation is not None:
+            self.wrapper.instrumentation.on_wait(polls, elapsed, received)
+        if self.wrapper.router is not None:
+            self.wrapper.router.record(self, elapsed, received)
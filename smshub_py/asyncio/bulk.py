@@ -0,0 +1,69 @@
+from typing import Iterable, Optional, Sequence
+import asyncio
+
+from .wrapper import AsyncSmsHubWrapper
+from .activation import AsyncSmsActivation
+from ..bulk import AcquireFailure, AcquireResult, FATAL_ERRORS, _Acquisition
+from ..exceptions import NoNumbers
+
+
+async def async_acquire_many(wrapper: AsyncSmsHubWrapper, service: str, count: int,
+                             countries: Optional[Iterable[int]] = None, operator: Optional[str] = '',
+                             max_concurrency: int = 8) -> AcquireResult:
+    """
+    Get many numbers concurrently. When a country has no numbers, the next one from `countries` is used.
+    Activations are created lazily, see :class:`AsyncSmsActivation`.
+    :class:`NoBalance` or :class:`BadApiKey` stops acquisition, as does wrapper `ledger` short of the price
+    :param wrapper: :class:`AsyncSmsHubWrapper` shared by all activations
+    :param service: Service code
+    :param count: Numbers count
+    :param countries: Country IDs in order of preference (optional)
+    :param operator: Operator code (optional)
+    :param max_concurrency: Maximum number of simultaneous requests
+    :return: Got activations, failures and number of activations not attempted
+    """
+    state = _Acquisition(countries, '')
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def acquire_one():
+        error, country = None, None
+        async with semaphore:
+            for country in state.next_countries():
+                activation = AsyncSmsActivation(None, service, operator, country, wrapper=wrapper, lazy=True)
+                try:
+                    state.check_funds(wrapper, service, country)
+                    await activation.init_()
+                    return activation
+                except NoNumbers as e:
+                    state.exhausted.add(country)
+                    error = e
+                except FATAL_ERRORS as e:
+                    state.stopped = True
+                    return AcquireFailure(country, e)
+                except Exception as e:
+                    return AcquireFailure(country, e)
+        return None if error is None else AcquireFailure(country, error)
+
+    results = await asyncio.gather(*(acquire_one() for _ in range(count)))
+    activations = [r for r in results if isinstance(r, AsyncSmsActivation)]
+    failures = [r for r in results if isinstance(r, AcquireFailure)]
+    return AcquireResult(activations, failures, results.count(None))
+
+
+async def async_release_all(activations: Sequence[AsyncSmsActivation],
+                            max_concurrency: int = 8) -> list[tuple[AsyncSmsActivation, Exception]]:
+    """
+    Release many activations concurrently: finish those which got code, cancel the others,
+    see :meth:`AsyncSmsActivation.release`. Activations failed to release are reported to `Instrumentation.on_leak`
+    :param activations: Activations, e.g. from :func:`async_acquire_many`
+    :param max_concurrency: Maximum number of simultaneous requests
+    :return: Activations failed to release with exceptions
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def release_one(activation: AsyncSmsActivation):
+        async with semaphore:
+            return await activation._release_or_leak()
+
+    errors = await asyncio.gather(*(release_one(a) for a in activations))
+    return [(a, e) for a, e in zip(activations, errors) if e is not None]
@@ -0,0 +1,55 @@
+from typing import Any, Awaitable, Callable, Hashable, Optional
+import asyncio
+
+from ..cache import BaseTTLCache, FRESH, STALE
+
+
+class AsyncTTLCache(BaseTTLCache):
+    """
+    Response cache for :class:`AsyncSmsHubWrapper`.
+    Concurrent requests of the same missing entry share one request
+    """
+
+    def __init__(self, ttl: float = 60, maxsize: int = 256, stale_ttl: Optional[float] = None):
+        super().__init__(ttl, maxsize, stale_ttl)
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        :param key: Entry key
+        :param fetch: Coroutine function making request if entry is missing or expired
+        :return: Cached or fetched value
+        """
+        state, value = self._lookup(key)
+        if state == FRESH:
+            self.hits += 1
+            return value
+        task = self._inflight.get(key)
+        if state == STALE:
+            self.stale_hits += 1
+            if task is None:
+                self._start(key, fetch).add_done_callback(self._consume)
+            return value
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start(key, fetch)
+        return await asyncio.shield(task)
+
+    def _start(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight[key] = asyncio.create_task(self._fetch(key, fetch))
+        return task
+
+    async def _fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+            self._store(key, value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    @staticmethod
+    def _consume(task: asyncio.Task):
+        if not task.cancelled():
+            task.exception()
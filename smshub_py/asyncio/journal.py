@@ -0,0 +1,65 @@
+from typing import Callable, Optional
+import asyncio
+
+from .wrapper import AsyncSmsHubWrapper
+from .activation import AsyncSmsActivation
+from .poller import AsyncActivationPoller
+from ..journal import Journal, CancelResult
+from ..status import CANCEL, ACCESS_CANCEL
+from ..exceptions import IncorrectResponse, NoActivation
+
+
+async def async_recover(journal: Journal, wrapper: AsyncSmsHubWrapper,
+                        poller: Optional[AsyncActivationPoller] = None,
+                        callback: Optional[Callable[[AsyncSmsActivation], None]] = None) -> list[AsyncSmsActivation]:
+    """
+    Take over activations left open by a previous run. No requests are made
+    :param journal: Journal of the previous run
+    :param wrapper: :class:`AsyncSmsHubWrapper` for the activations
+    :param poller: Started :class:`AsyncActivationPoller` to wait for SMS on all activations (optional)
+    :param callback: Called by `poller` with activation when code received (optional)
+    :return: Activations with their last known status
+    """
+    activations = []
+    # Journal is read and flushed with blocking I/O
+    for r in await asyncio.to_thread(journal.open_activations):
+        activation = AsyncSmsActivation.from_number(r.activation_id, r.phone, r.service, wrapper=wrapper,
+                                                    operator=r.operator or '',
+                                                    country='' if r.country is None else r.country)
+        activation.status = r.status
+        if poller is not None:
+            poller.add(activation, callback)
+        activations.append(activation)
+    return activations
+
+
+async def async_cancel_open(journal: Journal, wrapper: AsyncSmsHubWrapper, max_concurrency: int = 8) -> CancelResult:
+    """
+    Cancel activations left open by a previous run concurrently.
+    Activations already gone from SmsHub are counted as cancelled
+    :param journal: Journal of the previous run
+    :param wrapper: :class:`AsyncSmsHubWrapper` of the same account
+    :param max_concurrency: Maximum number of simultaneous requests
+    :return: Cancelled activation IDs and failures, e.g. of activations which already got code
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def cancel(id_: int):
+        async with semaphore:
+            try:
+                r = await wrapper.set_status(id_, CANCEL)
+                if r != ACCESS_CANCEL:
+                    raise IncorrectResponse(ACCESS_CANCEL, r)
+            except NoActivation:
+                # Repeated closing event of the wrapper journal is ignored on replay
+                journal.closed(id_)
+                return None
+            except Exception as e:
+                return e
+        if wrapper.journal is not journal:
+            journal.closed(id_)
+
+    ids = [r.activation_id for r in await asyncio.to_thread(journal.open_activations)]
+    errors = await asyncio.gather(*(cancel(id_) for id_ in ids))
+    return CancelResult([id_ for id_, e in zip(ids, errors) if e is None],
+                        [(id_, e) for id_, e in zip(ids, errors) if e is not None])
@@ -0,0 +1,217 @@
+from typing import AsyncIterator, Callable, Optional
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from .activation import AsyncSmsActivation
+from ..status import STATUS_OK
+from ..exceptions import TimeoutException
+from ..polling import PollingPolicy, FixedInterval
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ('activation', 'future', 'callback', 'policy', 'deadline', 'origin', 'started', 'polls')
+
+    def __init__(self, activation, future: asyncio.Future, callback: Optional[Callable], policy: PollingPolicy,
+                 deadline: float, origin: float, started: float):
+        self.activation = activation
+        self.future = future
+        self.callback = callback
+        self.policy = policy
+        self.deadline = deadline
+        self.origin = origin
+        self.started = started
+        self.polls = 0
+
+    def report(self, now: float, received: bool):
+        self.activation._report_wait(self.polls, now - self.started, received)
+
+
+class AsyncActivationPoller:
+    def __init__(self, interval: float = 1, timeout: float = 120, max_rps: Optional[float] = None,
+                 policy: Optional[PollingPolicy] = None, max_concurrency: int = 32):
+        """
+        Polls status of many activations from one task, ordered by time of the next request.
+        Use it instead of :meth:`AsyncSmsActivation.wait_for_sms` on every activation.
+        Activations whose codes are received while `async for` runs are yielded by it, iteration ends on :meth:`stop`
+        :param interval: Interval of requests for each activation (Seconds)
+        :param timeout: Default timeout for each activation (Seconds)
+        :param max_rps: Maximum requests per second for all activations together (optional)
+        :param policy: :class:`PollingPolicy` deciding when to make requests. Overrides `interval`
+        :param max_concurrency: Maximum number of simultaneous requests
+        """
+        self.policy = policy if policy is not None else FixedInterval(interval)
+        self.timeout = timeout
+        self.max_rps = max_rps
+        self.max_concurrency = max_concurrency
+        self._heap: list[tuple[float, int, _Entry]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Exists only while someone iterates, so codes delivered through futures are not kept
+        self._received: Optional[asyncio.Queue[Optional[AsyncSmsActivation]]] = None
+        self._iterators = 0
+        self._tasks: dict[asyncio.Task, _Entry] = {}
+        self._runner: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def __aiter__(self) -> AsyncIterator[AsyncSmsActivation]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[AsyncSmsActivation]:
+        if self._received is None:
+            self._received = asyncio.Queue()
+        received = self._received
+        self._iterators += 1
+        try:
+            while True:
+                activation = await received.get()
+                if activation is None:
+                    # Stopped, wake up other iterators
+                    received.put_nowait(None)
+                    return
+                yield activation
+        finally:
+            self._iterators -= 1
+            if not self._iterators and self._received is received:
+                self._received = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, activation: AsyncSmsActivation, callback: Optional[Callable[[AsyncSmsActivation], None]] = None,
+            timeout: Optional[float] = None, policy: Optional[PollingPolicy] = None) -> asyncio.Future:
+        """
+        Start polling activation until SMS code received
+        :param activation: :class:`AsyncSmsActivation` object
+        :param callback: Called with activation when code received (optional)
+        :param timeout: Timeout (Seconds). When time is off :class:`TimeoutException` will be set to the future
+        :param policy: :class:`PollingPolicy` for this activation. Policy of the poller by default
+        :return: Future with SMS code
+        """
+        future = asyncio.get_running_loop().create_future()
+        now = time.monotonic()
+        origin = activation.sent_at if activation.sent_at is not None else now
+        entry = _Entry(activation, future, callback, self.policy if policy is None else policy,
+                       now + (self.timeout if timeout is None else timeout), origin, now)
+        self._push(now, entry)
+        return future
+
+    def start(self):
+        """
+        Start polling in background task
+        """
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop polling. Futures of activations left in queue or being polled are cancelled, the activations
+        are not cancelled on SmsHub. `async for` over the poller ends
+        """
+        entries = list(self._tasks.values())
+        if self._runner is not None:
+            self._runner.cancel()
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(self._runner, *self._tasks, return_exceptions=True)
+            self._runner = None
+        entries += [item[2] for item in self._heap]
+        self._heap.clear()
+        for entry in entries:
+            entry.future.cancel()
+        if self._received is not None:
+            self._received.put_nowait(None)
+            self._received = None
+
+    async def discard(self, *activations: AsyncSmsActivation):
+        """
+        Stop polling activations. Their futures are cancelled, requests in progress are cancelled and awaited
+        """
+        activations = set(activations)
+        entries = [item[2] for item in self._heap if item[2].activation in activations]
+        if entries:
+            self._heap = [item for item in self._heap if item[2].activation not in activations]
+            heapq.heapify(self._heap)
+        tasks = [task for task, entry in self._tasks.items() if entry.activation in activations]
+        for task in tasks:
+            entries.append(self._tasks[task])
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for entry in entries:
+            entry.future.cancel()
+
+    def _push(self, due: float, entry: _Entry):
+        heapq.heappush(self._heap, (due, next(self._seq), entry))
+        self._wakeup.set()
+
+    async def _run(self):
+        next_slot = 0.
+        while True:
+            now = time.monotonic()
+            if not self._heap or self._heap[0][0] > now or next_slot > now:
+                self._wakeup.clear()
+                timeout = max(self._heap[0][0], next_slot) - now if self._heap else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            entry = heapq.heappop(self._heap)[2]
+            if entry.future.done():
+                continue
+            if self.max_rps:
+                next_slot = now + 1 / self.max_rps
+            await self._semaphore.acquire()
+            task = asyncio.create_task(self._poll(entry))
+            self._tasks[task] = entry
+            task.add_done_callback(self._forget)
+
+    def _forget(self, task: asyncio.Task):
+        self._tasks.pop(task, None)
+
+    async def _poll(self, entry: _Entry):
+        try:
+            await entry.activation.update_status()
+        except Exception as e:
+            if not entry.future.done():
+                entry.future.set_exception(e)
+            return
+        finally:
+            self._semaphore.release()
+        if entry.future.done():
+            return
+        entry.polls += 1
+        now = time.monotonic()
+        if entry.activation.status == STATUS_OK:
+            entry.policy.record(entry.activation, now - entry.origin)
+            entry.report(now, True)
+            entry.future.set_result(entry.activation.code)
+            if self._received is not None:
+                self._received.put_nowait(entry.activation)
+            if entry.callback is not None:
+                _call(entry)
+            return
+        if now >= entry.deadline:
+            entry.report(now, False)
+            entry.future.set_exception(TimeoutException())
+            return
+        delay = entry.policy.next_delay(entry.activation, entry.polls, now - entry.origin)
+        self._push(min(now + delay, entry.deadline), entry)
+
+
+def _call(entry):
+    try:
+        entry.callback(entry.activation)
+    except Exception:
+        logger.exception('Callback for activation %s failed', entry.activation.activation_id)
@@ -0,0 +1,180 @@
+from typing import AsyncIterator, Callable, Collection, Iterable, Optional
+import asyncio
+import time
+
+import aiohttp
+
+from .wrapper import AsyncSmsHubWrapper
+from .. import exceptions, responses
+from ..pool import _Balancer, _Member, _member_kwargs
+
+
+class AsyncWrapperPool:
+    _transient_errors = AsyncSmsHubWrapper._transient_errors
+    _read_failover = (exceptions.BadApiKey, exceptions.CircuitOpen, aiohttp.ClientConnectionError,
+                      asyncio.TimeoutError)
+
+    def __init__(self, credentials: Iterable[tuple[str, Optional[str]]], alpha: float = 0.2, cooldown: float = 60,
+                 failure_threshold: int = 3, track: int = 100000,
+                 per_member: Optional[Callable[[str, Optional[str]], dict]] = None, **kwargs):
+        """
+        Spreads requests over asynchronous wrappers with different API keys and proxies, see :class:`WrapperPool`.
+        May be passed to activations instead of wrapper
+        :param credentials: Pairs (API key, proxy), proxy may be `None`
+        :param alpha: Weight of the newest request in EWMA
+        :param cooldown: Time a wrapper stays out of rotation (Seconds)
+        :param failure_threshold: Consecutive connection errors taking a wrapper out of rotation
+        :param track: Number of last activations whose wrapper is remembered
+        :param per_member: Called with API key and proxy of each wrapper, returns its own parameters
+        :param kwargs: Other :class:`AsyncSmsHubWrapper` parameters. `router` is applied by the pool,
+            other objects, including `breaker` and `limiter`, are shared by all wrappers
+        """
+        if kwargs.get('ledger') is not None:
+            raise ValueError('BalanceLedger tracks one API key and cannot be shared by the pool')
+        self.router = kwargs.pop('router', None)
+        self.ledger = None
+        self.instrumentation = kwargs.get('instrumentation')
+        self.journal = kwargs.get('journal')
+        self.cache = kwargs.get('cache')
+        wrappers = [AsyncSmsHubWrapper(key, proxy, **_member_kwargs(kwargs, per_member, key, proxy))
+                    for key, proxy in credentials]
+        if not wrappers:
+            raise ValueError('At least one API key is required')
+        self._balancer = _Balancer(wrappers, (aiohttp.ClientConnectionError, asyncio.TimeoutError), alpha, cooldown,
+                                   failure_threshold, track)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def wrappers(self) -> list[AsyncSmsHubWrapper]:
+        return [m.wrapper for m in self._balancer.members]
+
+    async def close(self):
+        """
+        Close connection pools of all wrappers
+        """
+        await asyncio.gather(*(m.wrapper.close() for m in self._balancer.members))
+
+    async def _call(self, member: _Member, method: str, *args):
+        self._balancer.begin(member)
+        start = time.perf_counter()
+        error = None
+        try:
+            return await getattr(member.wrapper, method)(*args)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._balancer.done(member, time.perf_counter() - start, error)
+
+    async def _balanced(self, method: str, failover: tuple, *args):
+        tried, error = [], None
+        while True:
+            try:
+                member = self._balancer.pick(tried)
+            except exceptions.PoolExhausted:
+                if error is not None:
+                    raise error
+                raise
+            try:
+                return member, await self._call(member, method, *args)
+            except failover as e:
+                tried.append(member)
+                error = e
+
+    async def _owner(self, activation_id: int) -> Optional[_Member]:
+        # Plain request, as `get_status` of a wrong key would close the activation in journal
+        error = None
+        for member in self._balancer.candidates():
+            try:
+                await self._call(member, '_request', {'action': 'getStatus', 'id': activation_id})
+            except exceptions.NoActivation:
+                continue
+            except Exception as e:
+                error = error or e
+                continue
+            self._balancer.remember(activation_id, member)
+            return member
+        if error is not None:
+            raise error
+        return None
+
+    async def _sticky(self, activation_id: int, method: str, *args):
+        member = self._balancer.stick(activation_id) or await self._owner(activation_id)
+        if member is None:
+            # Unknown to every key
+            return (await self._balanced(method, (), activation_id, *args))[1]
+        return await self._call(member, method, activation_id, *args)
+
+    async def get_balance(self) -> float:
+        """
+        :return: Total balance of all API keys in rotation
+        """
+        return sum(await asyncio.gather(*(m.wrapper.get_balance() for m in self._balancer.healthy())))
+
+    async def get_number_status(self, country: Optional[int] = '', operator: Optional[str] = '') -> dict[str, int]:
+        """
+        Request for quantity available numbers
+        :param country: Country ID
+        :param operator: Operator code
+        :return: `Dict` service - numbers quantity
+        """
+        return (await self._balanced('get_number_status', self._read_failover, country, operator))[1]
+
+    async def get_number(self, service: str, operator: Optional[str] = '', country: Optional[int] = '') -> \
+            responses.Number:
+        """
+        Request for using number. Other wrappers are tried on :class:`NoBalance` and :class:`BadApiKey`
+        :param service: Service code
+        :param operator: Operator code
+        :param country: Country ID. Chosen by `router` if not passed
+        :return: Activation ID and phone number
+        """
+        if self.router is not None and country in (None, ''):
+            return await self.router.async_get_number(self, service, operator)
+        return await self._get_number(service, operator, country)
+
+    async def _get_number(self, service: str, operator: Optional[str], country: Optional[int]) -> responses.Number:
+        member, number = await self._balanced('_get_number', (exceptions.NoBalance, exceptions.BadApiKey),
+                                              service, operator, country)
+        self._balancer.remember(number.activation_id, member)
+        return number
+
+    async def set_status(self, id_: int, status: int) -> str:
+        """
+        Set current status of activation through the wrapper which got it
+        :param id_: Activation ID
+        :param status: Status ID
+        :return: Status message
+        """
+        return await self._sticky(id_, 'set_status', status)
+
+    async def get_status(self, id_: int) -> responses.Status:
+        """
+        Get status of activation through the wrapper which got it
+        :param id_: Activation ID
+        :return: Status message, with code if possible
+        """
+        return await self._sticky(id_, 'get_status')
+
+    async def get_prices(self, service: Optional[str] = '', country: Optional[int] = '') -> \
+            dict[str, dict[str, dict[str, int]]]:
+        """
+        Get all prices
+        :param service: Service code
+        :param country: Country ID
+        :return: `Dict` with prices
+        """
+        return (await self._balanced('get_prices', self._read_failover, service, country))[1]
+
+    def stream_prices(self, service: Optional[str] = '', country: Optional[int] = '',
+                      services: Optional[Collection[str]] = None,
+                      countries: Optional[Collection[int]] = None) -> AsyncIterator[responses.PriceRecord]:
+        """
+        See :meth:`AsyncSmsHubWrapper.stream_prices`
+        """
+        return self._balancer.pick().wrapper.stream_prices(service, country, services, countries)
@@ -0,0 +1,101 @@
+from typing import Iterable, Optional
+import asyncio
+import time
+
+from .wrapper import AsyncSmsHubWrapper
+from ..stock import _BaseStockWatcher, _Pair
+from ..exceptions import TimeoutException
+
+
+class AsyncStockWatcher(_BaseStockWatcher):
+    def __init__(self, wrapper: AsyncSmsHubWrapper, pairs: Iterable[_Pair] = (), interval: float = 5,
+                 threshold: int = 1, max_concurrency: int = 4):
+        """
+        Polls `getNumbersStatus` of (country, operator) pairs every `interval` from one task,
+        see :class:`StockWatcher`
+        :param wrapper: :class:`AsyncSmsHubWrapper`
+        :param pairs: Pairs of country ID and operator code, `''` for SmsHub default
+        :param interval: Interval of requests for each pair (Seconds)
+        :param threshold: Default quantity subscribers are notified about
+        :param max_concurrency: Maximum number of simultaneous requests
+        """
+        super().__init__(wrapper, pairs, interval, threshold, max_concurrency)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._changed = asyncio.Condition()
+        self._wakeup = asyncio.Event()
+        self._runner: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def start(self):
+        """
+        Start polling in background task
+        """
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stop polling
+        """
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+
+    async def wait_for(self, service: str, country: Optional[int] = '', operator: Optional[str] = '',
+                       min_count: int = 1, timeout: Optional[float] = None) -> int:
+        """
+        Wait until numbers of service are in stock. The pair is watched if it was not
+        :param service: Service code
+        :param country: Country ID
+        :param operator: Operator code
+        :param min_count: Minimal numbers quantity
+        :param timeout: Timeout (Seconds). When time is off :class:`TimeoutException` will be raised
+        :return: Numbers quantity
+        """
+        pair = (country, operator)
+        self.add(country, operator)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        async with self._changed:
+            while True:
+                if pair in self.errors:
+                    raise self.errors[pair]
+                count = self.book.count(pair, service)
+                if count is not None and count >= min_count:
+                    return count
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutException
+                try:
+                    await asyncio.wait_for(self._changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    raise TimeoutException
+
+    def _wake(self):
+        self._wakeup.set()
+
+    async def _poll(self, pair: _Pair):
+        async with self._semaphore:
+            try:
+                self._publish(pair, await self.wrapper.get_number_status(*('' if x is None else x for x in pair)))
+            except Exception as e:
+                self._failed(pair, e)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _run(self):
+        while True:
+            start = time.monotonic()
+            self._wakeup.clear()
+            await asyncio.gather(*(self._poll(pair) for pair in self.pairs))
+            # New pairs are polled at once
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(start + self.interval - time.monotonic(), 0))
+            except asyncio.TimeoutError:
+                pass
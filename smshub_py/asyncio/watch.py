@@ -0,0 +1,220 @@
+"""
+Streams of activation status changes. All streams of one event loop share a single polling task
+unless own :class:`StatusWatcher` is passed
+"""
+from typing import AsyncIterator, NamedTuple, Optional, Union
+import asyncio
+import heapq
+import itertools
+import time
+import weakref
+
+from .activation import AsyncSmsActivation
+from ..status import STATUS_OK, STATUS_WAIT_RETRY, STATUS_CANCEL
+from ..exceptions import NoActivation, CircuitOpen
+from ..polling import PollingPolicy, FixedInterval
+
+_END = object()
+
+
+class ActivationEvent(NamedTuple):
+    activation: AsyncSmsActivation
+    status: str
+    code: Optional[str]
+    previous: Optional[str]
+
+
+class _Watch:
+    __slots__ = ('activation', 'queues', 'last', 'origin', 'polls')
+
+    def __init__(self, activation: AsyncSmsActivation, origin: float):
+        self.activation = activation
+        self.queues: list[asyncio.Queue] = []
+        self.last = _state(activation)
+        self.origin = origin
+        self.polls = 0
+
+    def publish(self, item: Union[ActivationEvent, Exception, object]):
+        for queue in self.queues:
+            queue.put_nowait(item)
+
+
+def _state(activation: AsyncSmsActivation) -> tuple[Optional[str], Optional[str]]:
+    status = activation.status
+    return status, activation.code if status in (STATUS_OK, STATUS_WAIT_RETRY) else None
+
+
+class StatusWatcher:
+    def __init__(self, interval: float = 1, max_rps: Optional[float] = None, policy: Optional[PollingPolicy] = None,
+                 max_concurrency: int = 32):
+        """
+        Polls status of watched activations from one task, ordered by time of the next request,
+        and publishes changes to :func:`watch` streams. Runs only while something is watched.
+        An activation is watched until it is finished, cancelled or gone from SmsHub
+        :param interval: Interval of requests for each activation (Seconds)
+        :param max_rps: Maximum requests per second for all activations together (optional)
+        :param policy: :class:`PollingPolicy` deciding when to make requests. Overrides `interval`
+        :param max_concurrency: Maximum number of simultaneous requests
+        """
+        self.policy = policy if policy is not None else FixedInterval(interval)
+        self.max_rps = max_rps
+        self.max_concurrency = max_concurrency
+        self._watches: dict[AsyncSmsActivation, _Watch] = {}
+        self._heap: list[tuple[float, int, _Watch]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        self._runner: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._watches)
+
+    def subscribe(self, activation: AsyncSmsActivation, queue: asyncio.Queue):
+        """
+        Publish changes of activation to queue. Activation is polled once however many queues subscribe
+        """
+        watch = self._watches.get(activation)
+        if watch is None:
+            now = time.monotonic()
+            watch = self._watches[activation] = _Watch(activation,
+                                                       activation.sent_at if activation.sent_at is not None else now)
+            self._push(now, watch)
+        watch.queues.append(queue)
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    def unsubscribe(self, activation: AsyncSmsActivation, queue: asyncio.Queue):
+        watch = self._watches.get(activation)
+        if watch is not None and queue in watch.queues:
+            watch.queues.remove(queue)
+            if not watch.queues:
+                del self._watches[activation]
+
+    async def stop(self):
+        """
+        Stop polling and end all streams
+        """
+        for watch in self._watches.values():
+            watch.publish(_END)
+        self._watches.clear()
+        self._heap.clear()
+        if self._runner is not None:
+            self._runner.cancel()
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(self._runner, *self._tasks, return_exceptions=True)
+
+    def _push(self, due: float, watch: _Watch):
+        heapq.heappush(self._heap, (due, next(self._seq), watch))
+        self._wakeup.set()
+
+    async def _run(self):
+        next_slot = 0.
+        try:
+            while self._watches:
+                now = time.monotonic()
+                if not self._heap or self._heap[0][0] > now or next_slot > now:
+                    self._wakeup.clear()
+                    timeout = max(self._heap[0][0], next_slot) - now if self._heap else None
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                watch = heapq.heappop(self._heap)[2]
+                if self._watches.get(watch.activation) is not watch:
+                    continue
+                if self.max_rps:
+                    next_slot = now + 1 / self.max_rps
+                await self._semaphore.acquire()
+                task = asyncio.create_task(self._poll(watch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        finally:
+            self._runner = None
+
+    def _end(self, watch: _Watch, item=_END):
+        watch.publish(item)
+        if self._watches.get(watch.activation) is watch:
+            del self._watches[watch.activation]
+        self._wakeup.set()
+
+    async def _poll(self, watch: _Watch):
+        activation = watch.activation
+        try:
+            if not activation.closed:
+                await activation.update_status()
+                watch.polls += 1
+        except NoActivation:
+            activation.closed = True
+            self._end(watch)
+            return
+        except (*activation.wrapper._transient_errors, CircuitOpen):
+            pass
+        except Exception as e:
+            self._end(watch, e)
+            return
+        finally:
+            self._semaphore.release()
+        if self._watches.get(activation) is not watch:
+            return
+        state = _state(activation)
+        if state != watch.last:
+            watch.publish(ActivationEvent(activation, state[0], state[1], watch.last[0]))
+            if state[0] == STATUS_OK:
+                self.policy.record(activation, time.monotonic() - watch.origin)
+            watch.last = state
+        if state[0] == STATUS_CANCEL or activation.closed:
+            self._end(watch)
+            return
+        now = time.monotonic()
+        self._push(now + self.policy.next_delay(activation, watch.polls, now - watch.origin), watch)
+
+
+_shared: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, StatusWatcher]' = weakref.WeakKeyDictionary()
+
+
+def shared_watcher() -> StatusWatcher:
+    """
+    :return: :class:`StatusWatcher` used by streams of the running event loop by default
+    """
+    loop = asyncio.get_running_loop()
+    watcher = _shared.get(loop)
+    if watcher is None:
+        watcher = _shared[loop] = StatusWatcher()
+    return watcher
+
+
+async def watch(*activations: AsyncSmsActivation,
+                watcher: Optional[StatusWatcher] = None) -> AsyncIterator[ActivationEvent]:
+    """
+    Merged stream of status changes of activations: code received, waiting for another SMS, cancelled.
+    Unchanged statuses are not repeated. Ends when all activations are finished, cancelled or gone from SmsHub::
+
+        async for event in watch(*activations):
+            if event.status == STATUS_OK:
+                print(event.activation.phone, event.code)
+
+    :param activations: :class:`AsyncSmsActivation` objects with numbers
+    :param watcher: :class:`StatusWatcher` polling activations. Shared one by default
+    :return: Asynchronous iterator of events
+    """
+    watcher = watcher if watcher is not None else shared_watcher()
+    activations = tuple(dict.fromkeys(activations))
+    queue: asyncio.Queue = asyncio.Queue()
+    for activation in activations:
+        watcher.subscribe(activation, queue)
+    remaining = len(activations)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is _END:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        for activation in activations:
+            watcher.unsubscribe(activation, queue)
@@ -1,52 +1,185 @@
-from typing import Optional
+from typing import AsyncIterator, Awaitable, Collection, Optional, TYPE_CHECKING
+import json
+import time
+import asyncio
 import aiohttp
 
-from .. import exceptions
-from ..status import STATUS_WAIT_RETRY, STATUS_OK
+from .. import exceptions, responses
+from .cache import AsyncTTLCache
+from ..ratelimit import RateLimiter
+from ..retry import RetryPolicy, CircuitBreaker
+from ..instrumentation import Instrumentation
+
+from ..status import CANCEL, SMS_ACCEPTED, ACCESS_CANCEL, ACCESS_ACTIVATION, STATUS_CANCEL
+
+if TYPE_CHECKING:
+    from ..journal import Journal
+    from ..ledger import BalanceLedger
+    from ..routing import Router
 
 
 class AsyncSmsHubWrapper:
     base_url = 'https://www.smshub.org/stubs/handler_api.php'
+    _transient_errors = (exceptions.SqlError, exceptions.ServerError, aiohttp.ClientError, asyncio.TimeoutError)
 
-    def __init__(self, key: str, proxy: Optional[str] = None):
+    def __init__(self, key: str, proxy: Optional[str] = None, timeout: float = 10, limit: int = 100,
+                 limit_per_host: int = 0, ttl_dns_cache: Optional[int] = 300, keepalive_timeout: float = 30,
+                 base_url: Optional[str] = None, cache: Optional[AsyncTTLCache] = None,
+                 limiter: Optional[RateLimiter] = None, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, instrumentation: Optional[Instrumentation] = None,
+                 journal: Optional['Journal'] = None, router: Optional['Router'] = None,
+                 ledger: Optional['BalanceLedger'] = None):
         """
-        Asynchronous wrapper for SmsHub API
+        Asynchronous wrapper for SmsHub API.
+        One connection pool is shared by all requests, so many activations may use one wrapper
         :param key: API Key for SmsHub
         :param proxy: protocol://ip:port OR protocol://user:password@ip:port
+        :param timeout: Total request timeout (Seconds)
+        :param limit: Maximum number of simultaneous connections
+        :param limit_per_host: Maximum number of simultaneous connections to one host, 0 is unlimited
+        :param ttl_dns_cache: Time to keep resolved DNS entries (Seconds), `None` to cache forever
+        :param keepalive_timeout: Time to keep idle connections open (Seconds)
+        :param base_url: SmsHub API endpoint (optional)
+        :param cache: :class:`AsyncTTLCache` for `get_prices` and `get_number_status` responses (optional).
+            Cached responses are shared between callers and must not be modified
+        :param limiter: :class:`RateLimiter` every request waits for (optional). May be shared between wrappers
+        :param retry: :class:`RetryPolicy` for transient errors (optional)
+        :param breaker: :class:`CircuitBreaker` failing requests fast while SmsHub is unavailable (optional)
+        :param instrumentation: :class:`Instrumentation` hooks, e.g. :class:`MetricsCollector` (optional)
+        :param journal: :class:`Journal` recording got numbers and status changes for crash recovery (optional)
+        :param router: :class:`Router` choosing country when `get_number` is called without it (optional)
+        :param ledger: :class:`BalanceLedger` answering `get_balance` locally between requests (optional).
+            Tracks one API key, so must not be shared with wrappers of other keys
         """
         self.key = key
+        self.cache = cache
+        self.limiter = limiter
+        self.retry = retry
+        self.breaker = breaker
+        self.instrumentation = instrumentation
+        self.journal = journal
+        self.router = router
+        self.ledger = ledger
         self.proxy = proxy
+        if base_url is not None:
+            self.base_url = base_url
+        self.timeout = timeout
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: Optional[asyncio.Task] = None
 
-    def __aenter__(self):
+    async def __aenter__(self):
         return self
 
-    def __aexit__(self, exc_type, exc_val, exc_tb):
-        return
-
-    @staticmethod
-    async def _process_status(r: aiohttp.ClientResponse):
-        if await r.text() == 'BAD_KEY':
-            raise exceptions.BadApiKey
-        elif await r.text() == 'ERROR_SQL':
-            raise exceptions.SqlError
-        elif await r.text() == 'NO_NUMBERS':
-            raise exceptions.NoNumbers
-        elif await r.text() == 'NO_BALANCE':
-            raise exceptions.NoBalance
-        elif await r.text() == 'WRONG_SERVICE':
-            raise exceptions.WrongService
-        elif await r.text() == 'NO_ACTIVATION':
-            raise exceptions.NoActivation
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Shared client session. Created on first request, because it must be bound to a running event loop,
+        and created anew when the wrapper is used from another loop, e.g. by a second `asyncio.run`
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._session_loop is not loop:
+            self._closing = asyncio.ensure_future(self._drop_session())
+        if self._session is None or self._session.closed:
+            self._session_loop = loop
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             ttl_dns_cache=self.ttl_dns_cache,
+                                             use_dns_cache=self.ttl_dns_cache != 0,
+                                             keepalive_timeout=self.keepalive_timeout)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self._session
+
+    async def close(self):
+        """
+        Close underlying connection pool
+        """
+        if self._session is not None:
+            await self._drop_session()
+
+    def _drop_session(self) -> Awaitable[None]:
+        session, loop, self._session = self._session, self._session_loop, None
+        if loop.is_running() and loop is not asyncio.get_running_loop():
+            # Connections are closed on their own loop
+            return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(session.close(), loop))
+        # For a closed loop aiohttp only marks session closed and leaves connections to the garbage collector
+        return session.close()
+
+    async def _request(self, params: dict) -> str:
+        attempt = 0
+        while True:
+            if self.breaker is not None:
+                self.breaker.check()
+            try:
+                text = await self._send(params)
+            except self._transient_errors as e:
+                if self.breaker is not None:
+                    self.breaker.failure()
+                if self.retry is None or not self.retry.should_retry(params['action'], attempt):
+                    raise
+                if self.instrumentation is not None:
+                    self.instrumentation.on_retry(params['action'], attempt, e)
+                await asyncio.sleep(self.retry.backoff(attempt))
+                attempt += 1
+                continue
+            if self.breaker is not None:
+                self.breaker.success()
+            return text
+
+    async def _send(self, params: dict) -> str:
+        action = params['action']
+        if self.limiter is not None:
+            await self.limiter.async_acquire(action)
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return (await self._get(params))[0]
+        instrumentation.before_request(action)
+        start = time.perf_counter()
+        size, error = 0, None
+        try:
+            text, size = await self._get(params)
+            return text
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            instrumentation.after_request(action, time.perf_counter() - start, size, error)
+
+    async def _get(self, params: dict) -> tuple[str, int]:
+        async with self.session.get(self.base_url, params={'api_key': self.key, **params}, proxy=self.proxy) as r:
+            if r.status >= 500:
+                raise exceptions.ServerError(r.status)
+            size = len(await r.read())
+            return responses.check(await r.text()), size
+
+    async def _request_json(self, params: dict):
+        if self.cache is None:
+            return await self._fetch_json(params)
+        key = (params['action'], params.get('service'), params.get('country'), params.get('operator'))
+        return await self.cache.get_or_fetch(key, lambda: self._fetch_json(params))
+
+    async def _fetch_json(self, params: dict):
+        return json.loads(await self._request(params))
 
     async def get_balance(self) -> float:
         """
-        Get balance value
+        Get balance value. With `ledger` SmsHub is requested only when it is due to sync
         :return: Balance value
         """
-        async with aiohttp.request('GET', self.base_url, params={'api_key': self.key, 'action': 'getBalance'},
-                                   proxy=self.proxy) as req:
-            await self._process_status(req)
-            return float((await req.text()).replace('ACCESS_BALANCE:', ''))
+        if self.ledger is not None and not self.ledger.due():
+            return self.ledger.balance
+        text = await self._request({'action': 'getBalance'})
+        balance = responses.parse_balance(text)
+        if self.ledger is not None:
+            self.ledger.synced(balance)
+        return balance
 
     async def get_number_status(self, country: Optional[int] = '', operator: Optional[str] = '') -> dict[str, int]:
         """
@@ -55,33 +188,43 @@ class AsyncSmsHubWrapper:
         :param operator: Operator code
         :return: `Dict` service - numbers quantity
         """
-        async with aiohttp.request('GET', self.base_url, params={
-            'api_key': self.key,
+        return await self._request_json({
             'action': 'getNumbersStatus',
             'country': country,
             'operator': operator
-        }, proxy=self.proxy) as req:
-            await self._process_status(req)
-            return await req.json()
+        })
 
-    async def get_number(self, service: str, operator: Optional[str] = '', country: Optional[int] = '') -> (
-            int, int):
+    async def get_number(self, service: str, operator: Optional[str] = '', country: Optional[int] = '') -> \
+            responses.Number:
         """
         Request for using number
         :param service: Service code
         :param operator: Operator code
-        :param country: Country ID
+        :param country: Country ID. Chosen by `router` if not passed
         :return: Activation ID and phone number
         """
-        async with aiohttp.request('GET', self.base_url, params={
-            'api_key': self.key,
-            'action': 'getNumber',
-            'service': service,
-            'operator': operator,
-            'country': country
-        }, proxy=self.proxy) as req:
-            await self._process_status(req)
-            return tuple(map(int, (await req.text()).split(':')[1:]))
+        if self.router is not None and country in (None, ''):
+            return await self.router.async_get_number(self, service, operator)
+        return await self._get_number(service, operator, country)
+
+    async def _get_number(self, service: str, operator: Optional[str], country: Optional[int]) -> responses.Number:
+        try:
+            text = await self._request({
+                'action': 'getNumber',
+                'service': service,
+                'operator': operator,
+                'country': country
+            })
+        except exceptions.NoBalance:
+            if self.ledger is not None:
+                self.ledger.invalidate()
+            raise
+        number = responses.parse_number(text)
+        if self.journal is not None:
+            self.journal.opened(number.activation_id, number.phone, service, country, operator)
+        if self.ledger is not None:
+            self.ledger.debit(number.activation_id, service, country)
+        return number
 
     async def set_status(self, id_: int, status: int) -> str:
         """
@@ -90,31 +233,50 @@ class AsyncSmsHubWrapper:
         :param status: Status ID
         :return: Status message
         """
-        async with aiohttp.request('GET', self.base_url, params={
-            'api_key': self.key,
-            'action': 'setStatus',
-            'id': id_,
-            'status': status
-        }, proxy=self.proxy) as req:
-            await self._process_status(req)
-            return await req.text()
+        try:
+            text = await self._request({
+                'action': 'setStatus',
+                'id': id_,
+                'status': status
+            })
+        except exceptions.NoActivation:
+            if self.journal is not None:
+                self.journal.closed(id_)
+            if self.ledger is not None:
+                self.ledger.settle(id_)
+            raise
+        if self.journal is not None:
+            self.journal.status_set(id_, status, text)
+        if self.ledger is not None:
+            if status == CANCEL and text == ACCESS_CANCEL:
+                self.ledger.refund(id_)
+            elif status == SMS_ACCEPTED and text == ACCESS_ACTIVATION:
+                self.ledger.settle(id_)
+        return text
 
-    async def get_status(self, id_: int) -> (int, int):
+    async def get_status(self, id_: int) -> responses.Status:
         """
         Get status of activation
         :param id_: Activation ID
         :return: Status message, with code if possible
         """
-        async with aiohttp.request('GET', self.base_url, params={
-            'api_key': self.key,
-            'action': 'getStatus',
-            'id': id_
-        }, proxy=self.proxy) as req:
-            await self._process_status(req)
-            if (await req.text()).startswith(STATUS_WAIT_RETRY) or (await req.text()).startswith(STATUS_OK):
-                status, code = (await req.text()).split(':')
-                return status, code
-            return await req.text(), 0
+        try:
+            text = await self._request({
+                'action': 'getStatus',
+                'id': id_
+            })
+        except exceptions.NoActivation:
+            if self.journal is not None:
+                self.journal.closed(id_)
+            if self.ledger is not None:
+                self.ledger.settle(id_)
+            raise
+        status = responses.parse_status(text)
+        if self.journal is not None:
+            self.journal.status_got(id_, status.status)
+        if self.ledger is not None and status.status == STATUS_CANCEL:
+            self.ledger.refund(id_)
+        return status
 
     async def get_prices(self, service: Optional[str] = '', country: Optional[int] = '') -> \
             dict[str, dict[str, dict[str, int]]]:
@@ -124,11 +286,59 @@ class AsyncSmsHubWrapper:
         :param country: Country ID
         :return: `Dict` with prices
         """
-        async with aiohttp.request('GET', self.base_url, params={
-            'api_key': self.key,
+        prices = await self._request_json({
             'action': 'getPrices',
             'service': service,
-            'country': country,
-        }, proxy=self.proxy) as req:
-            await self._process_status(req)
-            return await req.json()
+            'country': country
+        })
+        if self.ledger is not None:
+            self.ledger.prices_received(service, country, prices)
+        return prices
+
+    async def stream_prices(self, service: Optional[str] = '', country: Optional[int] = '',
+                            services: Optional[Collection[str]] = None,
+                            countries: Optional[Collection[int]] = None) -> AsyncIterator[responses.PriceRecord]:
+        """
+        Get prices parsed while the response is being received. Uses much less memory than `get_prices`
+        for unfiltered responses and yields first offers before the body is complete.
+        Not cached and not retried, because offers may already be consumed when an error occurs
+        :param service: Service code, filtered by SmsHub
+        :param country: Country ID, filtered by SmsHub
+        :param services: Only offers of these service codes, filtered while parsing (optional)
+        :param countries: Only offers of these country IDs, filtered while parsing (optional)
+        :return: Asynchronous iterator of offers (country ID, service code, price, numbers quantity)
+            in response order
+        """
+        action = 'getPrices'
+        if self.breaker is not None:
+            self.breaker.check()
+        if self.limiter is not None:
+            await self.limiter.async_acquire(action)
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.before_request(action)
+        parser = responses.PriceParser(services, countries)
+        params = {'api_key': self.key, 'action': action, 'service': service, 'country': country}
+        start = time.perf_counter()
+        size, error = 0, None
+        try:
+            async with self.session.get(self.base_url, params=params, proxy=self.proxy) as r:
+                if r.status >= 500:
+                    raise exceptions.ServerError(r.status)
+                async for chunk in r.content.iter_any():
+                    size += len(chunk)
+                    for record in parser.feed(chunk):
+                        yield record
+            for record in parser.close():
+                yield record
+        except Exception as e:
+            error = e
+            if self.breaker is not None and isinstance(e, self._transient_errors):
+                self.breaker.failure()
+            raise
+        else:
+            if self.breaker is not None:
+                self.breaker.success()
+        finally:
+            if instrumentation is not None:
+                instrumentation.after_request(action, time.perf_counter() - start, size, error)
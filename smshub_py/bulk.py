@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, NamedTuple, Optional, Sequence, TYPE_CHECKING
+
+from .exceptions import NoNumbers, NoBalance, BadApiKey
+
+if TYPE_CHECKING:
+    from .wrapper import SmsHubWrapper
+    from .activation import SmsActivation
+
+FATAL_ERRORS = (NoBalance, BadApiKey)
+
+
+class AcquireFailure(NamedTuple):
+    country: Optional[int]
+    error: Exception
+
+
+class AcquireResult(NamedTuple):
+    activations: list
+    failures: list[AcquireFailure]
+    not_attempted: int
+
+    @property
+    def stopped(self) -> bool:
+        """
+        Acquisition was stopped early by :class:`NoBalance` or :class:`BadApiKey`
+        """
+        return any(isinstance(f.error, FATAL_ERRORS) for f in self.failures)
+
+
+class _Acquisition:
+    """
+    State shared by parallel acquisitions: countries without numbers and stop flag
+    """
+
+    def __init__(self, countries: Optional[Iterable[Optional[int]]], default_country):
+        self.countries = list(countries) if countries else [default_country]
+        self.exhausted = set()
+        self.stopped = False
+
+    def next_countries(self):
+        for country in self.countries:
+            if self.stopped:
+                return
+            if country not in self.exhausted:
+                yield country
+
+    def check_funds(self, wrapper, service: str, country: Optional[int]):
+        """
+        Stop without a request if `ledger` of wrapper shows the number is unaffordable
+        """
+        if wrapper.ledger is not None and not wrapper.ledger.can_afford(service, country):
+            self.stopped = True
+            raise NoBalance
+
+
+def acquire_many(wrapper: 'SmsHubWrapper', service: str, count: int, countries: Optional[Iterable[int]] = None,
+                 operator: Optional[str] = None, max_concurrency: int = 8) -> AcquireResult:
+    """
+    Get many numbers in parallel threads. When a country has no numbers, the next one from `countries` is used.
+    Activations are created lazily, see :class:`SmsActivation`.
+    :class:`NoBalance` or :class:`BadApiKey` stops acquisition, as does wrapper `ledger` short of the price
+    :param wrapper: :class:`SmsHubWrapper` shared by all activations
+    :param service: Service code
+    :param count: Numbers count
+    :param countries: Country IDs in order of preference (optional)
+    :param operator: Operator code (optional)
+    :param max_concurrency: Maximum number of simultaneous requests
+    :return: Got activations, failures and number of activations not attempted
+    """
+    from .activation import SmsActivation
+
+    state = _Acquisition(countries, None)
+
+    def acquire_one():
+        error, country = None, None
+        for country in state.next_countries():
+            try:
+                state.check_funds(wrapper, service, country)
+                return SmsActivation(None, service, operator, country, wrapper=wrapper, lazy=True)
+            except NoNumbers as e:
+                state.exhausted.add(country)
+                error = e
+            except FATAL_ERRORS as e:
+                state.stopped = True
+                return AcquireFailure(country, e)
+            except Exception as e:
+                return AcquireFailure(country, e)
+        return None if error is None else AcquireFailure(country, error)
+
+    with ThreadPoolExecutor(max_concurrency) as executor:
+        results = list(executor.map(lambda _: acquire_one(), range(count)))
+    activations = [r for r in results if isinstance(r, SmsActivation)]
+    failures = [r for r in results if isinstance(r, AcquireFailure)]
+    return AcquireResult(activations, failures, results.count(None))
+
+
+def release_all(activations: Sequence['SmsActivation'],
+                max_concurrency: int = 8) -> list[tuple['SmsActivation', Exception]]:
+    """
+    Release many activations in parallel threads: finish those which got code, cancel the others,
+    see :meth:`SmsActivation.release`. Activations failed to release are reported to `Instrumentation.on_leak`
+    :param activations: Activations, e.g. from :func:`acquire_many`
+    :param max_concurrency: Maximum number of simultaneous requests
+    :return: Activations failed to release with exceptions
+    """
+    with ThreadPoolExecutor(max_concurrency) as executor:
+        errors = list(executor.map(lambda a: a._release_or_leak(), activations))
+    return [(a, e) for a, e in zip(activations, errors) if e is not None]
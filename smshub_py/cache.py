@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable, Optional
+import threading
+import time
+
+FRESH, STALE, MISSING = range(3)
+
+
+class BaseTTLCache:
+    def __init__(self, ttl: float = 60, maxsize: int = 256, stale_ttl: Optional[float] = None):
+        """
+        Storage of responses with time to live and size bound. Least recently used entries are evicted first
+        :param ttl: Time while entry is fresh (Seconds)
+        :param maxsize: Maximum number of entries
+        :param stale_ttl: Time after expiration while stale entry is still returned and refreshed in background
+            (Seconds). Equals to `ttl` by default, 0 disables stale responses
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = ttl if stale_ttl is None else stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def _lookup(self, key: Hashable) -> tuple[int, Any]:
+        item = self._data.get(key)
+        if item is None:
+            return MISSING, None
+        value, stored_at = item
+        age = time.monotonic() - stored_at
+        if age < self.ttl:
+            self._data.move_to_end(key)
+            return FRESH, value
+        if age < self.ttl + self.stale_ttl:
+            return STALE, value
+        del self._data[key]
+        return MISSING, None
+
+    def _store(self, key: Hashable, value: Any):
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """
+        Remove entry from cache
+        :param key: Entry key. All entries are removed if not passed
+        """
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+
+class TTLCache(BaseTTLCache):
+    """
+    Thread-safe response cache for :class:`SmsHubWrapper`.
+    Concurrent requests of the same missing entry share one request
+    """
+
+    def __init__(self, ttl: float = 60, maxsize: int = 256, stale_ttl: Optional[float] = None):
+        super().__init__(ttl, maxsize, stale_ttl)
+        self._lock = threading.Lock()
+        self._inflight: dict[Hashable, Future] = {}
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        with self._lock:
+            super().invalidate(key)
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """
+        :param key: Entry key
+        :param fetch: Function making request if entry is missing or expired
+        :return: Cached or fetched value
+        """
+        with self._lock:
+            state, value = self._lookup(key)
+            if state == FRESH:
+                self.hits += 1
+                return value
+            future = self._inflight.get(key)
+            if state == STALE:
+                self.stale_hits += 1
+                if future is None:
+                    self._inflight[key] = Future()
+                    threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+                return value
+            if future is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                self._inflight[key] = Future()
+        if future is not None:
+            return future.result()
+        return self._fetch(key, fetch)
+
+    def _refresh(self, key: Hashable, fetch: Callable[[], Any]):
+        try:
+            self._fetch(key, fetch)
+        except Exception:
+            pass
+
+    def _fetch(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        future = self._inflight[key]
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._store(key, value)
+            del self._inflight[key]
+        future.set_result(value)
+        return value
@@ -0,0 +1,273 @@
+"""
+Synchronous facade over :class:`AsyncSmsHubWrapper` running on one background event loop.
+Threads using :class:`EngineWrapper` share one connection pool, and their `wait_for_sms`
+are served by one poller on the loop instead of sleeping in each thread
+"""
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Collection, Coroutine, Iterator, Optional, TYPE_CHECKING
+import asyncio
+import threading
+
+from . import responses
+from .asyncio.wrapper import AsyncSmsHubWrapper
+from .asyncio.activation import AsyncSmsActivation
+from .asyncio.poller import AsyncActivationPoller
+from .polling import FixedInterval, PollingPolicy, WaitResult
+
+if TYPE_CHECKING:
+    from .activation import SmsActivation
+
+
+class AsyncEngine:
+    def __init__(self, interval: float = 1, max_rps: Optional[float] = None, policy: Optional[PollingPolicy] = None,
+                 max_concurrency: int = 32):
+        """
+        Event loop running in a daemon thread, with one :class:`AsyncActivationPoller` serving `wait_for_sms`
+        of all threads. May be shared by any number of :class:`EngineWrapper`
+        :param interval: Default interval of status requests for each waiting activation (Seconds)
+        :param max_rps: Maximum status requests per second for all waiting activations together (optional)
+        :param policy: :class:`PollingPolicy` of the poller. Overrides `interval`
+        :param max_concurrency: Maximum number of simultaneous status requests
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        self.poller: AsyncActivationPoller = self.run(self._start_poller(interval, max_rps, policy,
+                                                                         max_concurrency))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        Schedule coroutine on the loop from any thread
+        :return: Future with its result
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine) -> Any:
+        """
+        Run coroutine on the loop and wait for its result. Must not be called from the loop thread
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError('AsyncEngine.run called from its own loop')
+        return self.submit(coro).result()
+
+    def close(self):
+        """
+        Stop the loop. Tasks still running are cancelled
+        """
+        if self.loop.is_closed():
+            return
+        # Threads still waiting for SMS get `CancelledError`
+        self.run(self.poller.stop())
+        self.run(self._shutdown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    @staticmethod
+    async def _start_poller(interval: float, max_rps: Optional[float], policy: Optional[PollingPolicy],
+                            max_concurrency: int) -> AsyncActivationPoller:
+        poller = AsyncActivationPoller(interval, max_rps=max_rps, policy=policy, max_concurrency=max_concurrency)
+        poller.start()
+        return poller
+
+    @staticmethod
+    async def _shutdown():
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _take(iterator: AsyncIterator, count: int) -> list:
+    items = []
+    async for item in iterator:
+        items.append(item)
+        if len(items) == count:
+            break
+    return items
+
+
+class EngineWrapper:
+    def __init__(self, key: str, proxy: Optional[str] = None, engine: Optional[AsyncEngine] = None, **kwargs):
+        """
+        Drop-in replacement of :class:`SmsHubWrapper` for many threads: every call runs on the loop of `engine`
+        through one :class:`AsyncSmsHubWrapper`, and `wait_for_sms` of activations using this wrapper is served
+        by the poller of `engine`, so a blocked thread holds neither a connection nor a polling loop.
+        Polling policy of the engine is used by `wait_for_sms` unless `interval` or `policy` is passed
+        :param key: API Key for SmsHub
+        :param proxy: protocol://ip:port OR protocol://user:password@ip:port
+        :param engine: Shared :class:`AsyncEngine`. Own one is started if not passed and stopped on :meth:`close`
+        :param kwargs: Other :class:`AsyncSmsHubWrapper` parameters, e.g. `limit` of connections
+        """
+        self._own_engine = engine is None
+        self.engine = AsyncEngine() if engine is None else engine
+        self.wrapper = AsyncSmsHubWrapper(key, proxy, **kwargs)
+        # Activations of this wrapper on the engine poller, changed on the loop only
+        self._waiting: set[AsyncSmsActivation] = set()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def instrumentation(self):
+        return self.wrapper.instrumentation
+
+    @property
+    def journal(self):
+        return self.wrapper.journal
+
+    @property
+    def router(self):
+        return self.wrapper.router
+
+    @property
+    def cache(self):
+        return self.wrapper.cache
+
+    @property
+    def ledger(self):
+        return self.wrapper.ledger
+
+    @property
+    def _transient_errors(self) -> tuple:
+        return self.wrapper._transient_errors
+
+    def close(self):
+        """
+        Close connection pool, and stop own engine
+        """
+        self._closed = True
+        # Threads still waiting for SMS get `CancelledError` before the pool is closed
+        if self._own_engine:
+            self.engine.run(self.engine.poller.stop())
+        else:
+            self.engine.run(self._cancel_waits())
+        self.engine.run(self.wrapper.close())
+        if self._own_engine:
+            self.engine.close()
+
+    def get_balance(self) -> float:
+        """
+        :return: Current balance
+        """
+        return self.engine.run(self.wrapper.get_balance())
+
+    def get_number_status(self, country: Optional[int] = None, operator: Optional[str] = None) -> dict[str, int]:
+        """
+        Request for quantity available numbers
+        :param country: Country ID
+        :param operator: Operator code
+        :return: `Dict` service - numbers quantity
+        """
+        return self.engine.run(self.wrapper.get_number_status(_arg(country), _arg(operator)))
+
+    def get_number(self, service: str, operator: Optional[str] = None, country: Optional[int] = None) -> \
+            responses.Number:
+        """
+        Request for using number
+        :param service: Service code
+        :param operator: Operator code
+        :param country: Country ID. Chosen by `router` if not passed
+        :return: Activation ID and phone number
+        """
+        return self.engine.run(self.wrapper.get_number(service, _arg(operator), _arg(country)))
+
+    def _get_number(self, service: str, operator: Optional[str], country: Optional[int]) -> responses.Number:
+        return self.engine.run(self.wrapper._get_number(service, _arg(operator), _arg(country)))
+
+    def set_status(self, id_: int, status: int) -> str:
+        """
+        Set current status of activation
+        :param id_: Activation ID
+        :param status: Status ID
+        :return: Status message
+        """
+        return self.engine.run(self.wrapper.set_status(id_, status))
+
+    def get_status(self, id_: int) -> responses.Status:
+        """
+        Get status of activation
+        :param id_: Activation ID
+        :return: Status message, with code if possible
+        """
+        return self.engine.run(self.wrapper.get_status(id_))
+
+    def get_prices(self, service: str = None, country: int = None) -> dict[str, dict[str, dict[str, int]]]:
+        """
+        Get all prices
+        :param service: Service code
+        :param country: Country ID
+        :return: `Dict` with prices
+        """
+        return self.engine.run(self.wrapper.get_prices(_arg(service), _arg(country)))
+
+    def stream_prices(self, service: Optional[str] = None, country: Optional[int] = None,
+                      services: Optional[Collection[str]] = None, countries: Optional[Collection[int]] = None,
+                      batch: int = 1000) -> Iterator[responses.PriceRecord]:
+        """
+        See :meth:`SmsHubWrapper.stream_prices`
+        :param batch: Number of records passed from the loop at once
+        """
+        records = self.wrapper.stream_prices(_arg(service), _arg(country), services, countries)
+        try:
+            while True:
+                items = self.engine.run(_take(records, batch))
+                yield from items
+                if len(items) < batch:
+                    return
+        finally:
+            self.engine.run(records.aclose())
+
+    def wait_for_sms(self, activation: 'SmsActivation', interval: Optional[float] = None, timeout: float = 120,
+                     policy: Optional[PollingPolicy] = None) -> WaitResult:
+        """
+        Wait until new SMS got on SmsHub for activation using this wrapper. The calling thread is blocked,
+        while requests are made by the poller of `engine`. Called by :meth:`SmsActivation.wait_for_sms`
+        without `poller`
+        :param activation: :class:`SmsActivation` object
+        :param interval: Interval of requests (Seconds). Policy of the engine by default
+        :param timeout: Timeout (Seconds). When time is off :class:`TimeoutException` will be raised
+        :param policy: :class:`PollingPolicy` deciding when to make requests. Overrides `interval`
+        :return: Number of requests made and time spent waiting
+        """
+        if policy is None and interval is not None:
+            policy = FixedInterval(interval)
+        mirror = AsyncSmsActivation.from_number(activation.activation_id, activation.phone, activation.service,
+                                                wrapper=self.wrapper, operator=_arg(activation.operator),
+                                                country=_arg(activation.country_code))
+        mirror.status, mirror.code, mirror.sent_at = activation.status, activation.code, activation.sent_at
+        try:
+            return self.engine.run(self._wait(mirror, timeout, policy))
+        finally:
+            activation.polls += mirror.polls
+            if mirror.status is not None:
+                activation.status, activation.code = mirror.status, mirror.code
+                activation.closed = activation.closed or mirror.closed
+
+    async def _wait(self, mirror: AsyncSmsActivation, timeout: float, policy: Optional[PollingPolicy]) -> WaitResult:
+        if self._closed:
+            raise asyncio.CancelledError
+        self._waiting.add(mirror)
+        try:
+            return await mirror.wait_for_sms(timeout=timeout, poller=self.engine.poller, policy=policy)
+        finally:
+            self._waiting.discard(mirror)
+
+    async def _cancel_waits(self):
+        # Shared poller keeps running for other wrappers
+        await self.engine.poller.discard(*self._waiting)
+
+
+def _arg(value):
+    return '' if value is None else value
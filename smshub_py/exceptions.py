@@ -31,6 +31,20 @@ class TimeoutException(Exception):
     pass
 
 
+class ServerError(Exception):
+    def __init__(self, status: int):
+        super().__init__(f"SmsHub responded with HTTP {status}")
+        self.status = status
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class PoolExhausted(Exception):
+    pass
+
+
 # Country errors
 class NoCountryException(Exception):
     pass
@@ -0,0 +1,185 @@
+"""
+Request instrumentation hooks. Pass :class:`Instrumentation` subclass to a wrapper,
+e.g. :class:`MetricsCollector` which keeps metrics in memory
+"""
+from collections import Counter
+from typing import Optional, Sequence
+import bisect
+import threading
+
+LATENCY_BUCKETS = tuple(round(0.001 * 1.5 ** i, 6) for i in range(28))
+POLL_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+
+class Instrumentation:
+    """
+    Base class with hooks called by wrappers and activations. All hooks do nothing
+    """
+
+    def before_request(self, action: str):
+        """
+        Called before request is sent
+        :param action: API action
+        """
+
+    def after_request(self, action: str, latency: float, size: int, error: Optional[BaseException]):
+        """
+        Called after every request, including failed ones
+        :param action: API action
+        :param latency: Request duration (Seconds)
+        :param size: Response body size (Bytes)
+        :param error: Raised exception, `None` if request succeeded
+        """
+
+    def on_retry(self, action: str, attempt: int, error: BaseException):
+        """
+        Called before failed request is repeated
+        :param action: API action
+        :param attempt: Number of retries already made
+        :param error: Exception of the failed request
+        """
+
+    def on_wait(self, polls: int, elapsed: float, received: bool):
+        """
+        Called when waiting for SMS is over
+        :param polls: Number of status requests made
+        :param elapsed: Time spent waiting (Seconds)
+        :param received: `True` if code received, `False` on timeout
+        """
+
+    def on_leak(self, activation_id: int):
+        """
+        Called when activation context is left with activation neither finished nor cancelled,
+        or when releasing it failed
+        :param activation_id: Activation ID
+        """
+
+
+class Histogram:
+    def __init__(self, bounds: Sequence[float]):
+        """
+        Fixed-bucket histogram
+        :param bounds: Ascending upper bounds of buckets. Values above the last one go to +Inf bucket
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def percentile(self, q: float) -> float:
+        """
+        :param q: Percentile from 0 to 100
+        :return: Upper bound of the bucket containing the percentile, `inf` if it is above all bounds
+        """
+        if not self.count:
+            return 0.
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class MetricsCollector(Instrumentation):
+    def __init__(self, latency_buckets: Sequence[float] = LATENCY_BUCKETS,
+                 poll_buckets: Sequence[float] = POLL_BUCKETS):
+        """
+        In-memory metrics: latency histograms, response sizes, errors and retries by action,
+        requests per activation, leaked activations. Safe to share between threads and wrappers
+        :param latency_buckets: Upper bounds of latency histogram buckets (Seconds)
+        :param poll_buckets: Upper bounds of polls per activation histogram buckets
+        """
+        self.latency_buckets = latency_buckets
+        self.latency: dict[str, Histogram] = {}
+        self.response_bytes: Counter[str] = Counter()
+        self.errors: Counter[tuple[str, str]] = Counter()
+        self.retries: Counter[str] = Counter()
+        self.polls = Histogram(poll_buckets)
+        self.timeouts = 0
+        self.leaked = 0
+        self._lock = threading.Lock()
+
+    def after_request(self, action: str, latency: float, size: int, error: Optional[BaseException]):
+        with self._lock:
+            histogram = self.latency.get(action)
+            if histogram is None:
+                histogram = self.latency[action] = Histogram(self.latency_buckets)
+            histogram.observe(latency)
+            self.response_bytes[action] += size
+            if error is not None:
+                self.errors[action, type(error).__name__] += 1
+
+    def on_retry(self, action: str, attempt: int, error: BaseException):
+        with self._lock:
+            self.retries[action] += 1
+
+    def on_wait(self, polls: int, elapsed: float, received: bool):
+        with self._lock:
+            if received:
+                self.polls.observe(polls)
+            else:
+                self.timeouts += 1
+
+    def on_leak(self, activation_id: int):
+        with self._lock:
+            self.leaked += 1
+
+    def summary(self, percentiles: Sequence[float] = (50, 90, 99)) -> dict[str, dict[str, float]]:
+        """
+        :param percentiles: Latency percentiles to calculate
+        :return: `Dict` action - requests count, mean and percentiles of latency, bytes, errors, retries
+        """
+        with self._lock:
+            result = {}
+            for action, histogram in self.latency.items():
+                item = {'count': histogram.count, 'mean': histogram.sum / histogram.count}
+                item.update({f'p{q:g}': histogram.percentile(q) for q in percentiles})
+                item['bytes'] = self.response_bytes[action]
+                item['errors'] = sum(n for (a, _), n in self.errors.items() if a == action)
+                item['retries'] = self.retries[action]
+                result[action] = item
+            return result
+
+    def to_openmetrics(self, prefix: str = 'smshub') -> str:
+        """
+        :param prefix: Metric names prefix
+        :return: Metrics in Prometheus / OpenMetrics text exposition format
+        """
+        lines = [f'# TYPE {prefix}_request_duration_seconds histogram']
+        with self._lock:
+            for action, histogram in self.latency.items():
+                lines.extend(_histogram_lines(f'{prefix}_request_duration_seconds', histogram, f'action="{action}"'))
+            lines.append(f'# TYPE {prefix}_response_bytes counter')
+            lines.extend(f'{prefix}_response_bytes_total{{action="{a}"}} {n}' for a, n in self.response_bytes.items())
+            lines.append(f'# TYPE {prefix}_errors counter')
+            lines.extend(f'{prefix}_errors_total{{action="{a}",error="{e}"}} {n}' for (a, e), n in self.errors.items())
+            lines.append(f'# TYPE {prefix}_retries counter')
+            lines.extend(f'{prefix}_retries_total{{action="{a}"}} {n}' for a, n in self.retries.items())
+            lines.append(f'# TYPE {prefix}_wait_polls histogram')
+            lines.extend(_histogram_lines(f'{prefix}_wait_polls', self.polls, ''))
+            lines.append(f'# TYPE {prefix}_wait_timeouts counter')
+            lines.append(f'{prefix}_wait_timeouts_total {self.timeouts}')
+            lines.append(f'# TYPE {prefix}_leaked_activations counter')
+            lines.append(f'{prefix}_leaked_activations_total {self.leaked}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(name: str, histogram: Histogram, labels: str) -> list[str]:
+    sep = ',' if labels else ''
+    lines = []
+    cumulative = 0
+    for bound, count in zip((*histogram.bounds, '+Inf'), histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+    suffix = f'{{{labels}}}' if labels else ''
+    lines.append(f'{name}_sum{suffix} {histogram.sum}')
+    lines.append(f'{name}_count{suffix} {histogram.count}')
+    return lines
@@ -0,0 +1,337 @@
+"""
+Durable journal of activations. Pass :class:`FileJournal` or :class:`SqliteJournal` to wrappers, and
+after a crash or restart take over activations neither finished nor cancelled with :func:`recover`,
+or release them with :func:`cancel_open`
+"""
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, NamedTuple, Optional, TYPE_CHECKING
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .status import *
+from .exceptions import IncorrectResponse, NoActivation
+
+if TYPE_CHECKING:
+    from .wrapper import SmsHubWrapper
+    from .activation import SmsActivation
+    from .poller import ActivationPoller
+
+# Event written by `set_status` and response confirming it
+_SET_STATUS_EVENTS = {
+    SMS_SENT: ('sent', ACCESS_READY),
+    SMS_RETRY: ('retry', ACCESS_RETRY_GET),
+    SMS_ACCEPTED: ('finish', ACCESS_ACTIVATION),
+    CANCEL: ('cancel', ACCESS_CANCEL),
+}
+_CLOSING_EVENTS = frozenset(('finish', 'cancel', 'closed'))
+
+_Entry = tuple[float, str, int, Optional[dict]]
+
+
+class JournalRecord(NamedTuple):
+    activation_id: int
+    phone: int
+    service: str
+    country: Optional[int]
+    operator: Optional[str]
+    status: str
+    opened_at: float
+
+
+class CancelResult(NamedTuple):
+    cancelled: list[int]
+    failures: list[tuple[int, Exception]]
+
+
+class Journal(ABC):
+    def __init__(self, flush_interval: float = 1.):
+        """
+        Base class of append-only activation journals. Events are kept in memory and written with fsync
+        by a background thread, so recording costs no I/O. Events of the last `flush_interval` may be lost
+        if the process is killed
+        :param flush_interval: Time between writes (Seconds)
+        """
+        self.flush_interval = flush_interval
+        self._pending: list[_Entry] = []
+        self._statuses: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def opened(self, activation_id: int, phone: int, service: str, country: Optional[int],
+               operator: Optional[str]):
+        """
+        Record number got
+        """
+        data = {'phone': phone, 'service': service, 'country': country, 'operator': operator}
+        with self._lock:
+            self._statuses[activation_id] = STATUS_WAIT_CODE
+            self._pending.append((time.time(), 'number', activation_id, data))
+
+    def status_set(self, activation_id: int, status: int, response: str):
+        """
+        Record `setStatus` request. Ignored if SmsHub didn't confirm it
+        :param activation_id: Activation ID
+        :param status: Status ID
+        :param response: SmsHub response
+        """
+        event, expected = _SET_STATUS_EVENTS.get(status, (None, None))
+        if response != expected:
+            return
+        with self._lock:
+            if event in _CLOSING_EVENTS:
+                self._statuses.pop(activation_id, None)
+            self._pending.append((time.time(), event, activation_id, None))
+
+    def status_got(self, activation_id: int, status: str):
+        """
+        Record status received from SmsHub. Only changes are written
+        """
+        if status == STATUS_CANCEL:
+            self.closed(activation_id)
+            return
+        with self._lock:
+            if self._statuses.get(activation_id) == status:
+                return
+            self._statuses[activation_id] = status
+            self._pending.append((time.time(), 'status', activation_id, {'status': status}))
+
+    def closed(self, activation_id: int):
+        """
+        Record activation no longer existing on SmsHub
+        """
+        with self._lock:
+            self._statuses.pop(activation_id, None)
+            self._pending.append((time.time(), 'closed', activation_id, None))
+
+    def flush(self):
+        """
+        Write and fsync recorded events now
+        """
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+            try:
+                self._write(pending)
+            except BaseException:
+                with self._lock:
+                    self._pending[:0] = pending
+                raise
+
+    def close(self):
+        """
+        Stop background thread and write remaining events
+        """
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        self._close()
+
+    def open_activations(self) -> list[JournalRecord]:
+        """
+        :return: Activations neither finished nor cancelled, in order of getting number
+        """
+        self.flush()
+        with self._write_lock:
+            return list(_replay(self._read()).values())
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # Events stay pending until the next attempt
+                pass
+
+    @abstractmethod
+    def _write(self, entries: list[_Entry]):
+        pass
+
+    @abstractmethod
+    def _read(self) -> Iterable[_Entry]:
+        pass
+
+    def _close(self):
+        pass
+
+
+class FileJournal(Journal):
+    def __init__(self, path: str, flush_interval: float = 1.):
+        """
+        Journal in JSON lines file
+        :param path: Path to the file. Created if missing
+        :param flush_interval: Time between writes (Seconds)
+        """
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        if self._file.tell():
+            # Terminate the last line, which may be torn by crash
+            self._file.write('\n')
+        super().__init__(flush_interval)
+
+    def _write(self, entries: list[_Entry]):
+        self._file.write(''.join(json.dumps(e, separators=(',', ':')) + '\n' for e in entries))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _read(self) -> Iterable[_Entry]:
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield tuple(json.loads(line))
+                except ValueError:
+                    # Line torn by crash
+                    continue
+
+    def _close(self):
+        self._file.close()
+
+    def compact(self):
+        """
+        Rewrite the file keeping only open activations
+        """
+        self.flush()
+        with self._write_lock:
+            entries = _snapshot(_replay(self._read()).values())
+            tmp = f'{self.path}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(e, separators=(',', ':')) + '\n' for e in entries))
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp, self.path)
+            self._file = open(self.path, 'a', encoding='utf-8')
+
+
+class SqliteJournal(Journal):
+    def __init__(self, path: str, flush_interval: float = 1.):
+        """
+        Journal in SQLite database
+        :param path: Path to the database. Created if missing
+        :param flush_interval: Time between writes (Seconds)
+        """
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=FULL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS events '
+                         '(ts REAL, event TEXT, activation_id INTEGER, data TEXT)')
+        self._db.commit()
+        super().__init__(flush_interval)
+
+    def _write(self, entries: list[_Entry]):
+        with self._db:
+            self._db.executemany('INSERT INTO events VALUES (?, ?, ?, ?)',
+                                 ((ts, event, id_, None if data is None else json.dumps(data))
+                                  for ts, event, id_, data in entries))
+
+    def _read(self) -> Iterable[_Entry]:
+        for ts, event, id_, data in self._db.execute('SELECT * FROM events ORDER BY rowid'):
+            yield ts, event, id_, None if data is None else json.loads(data)
+
+    def _close(self):
+        self._db.close()
+
+    def compact(self):
+        """
+        Delete events of finished and cancelled activations
+        """
+        self.flush()
+        with self._write_lock, self._db:
+            self._db.execute('CREATE TEMP TABLE open_ids (id INTEGER PRIMARY KEY)')
+            self._db.executemany('INSERT INTO open_ids VALUES (?)', ((id_,) for id_ in _replay(self._read())))
+            self._db.execute('DELETE FROM events WHERE activation_id NOT IN (SELECT id FROM open_ids)')
+            self._db.execute('DROP TABLE open_ids')
+
+
+def _replay(entries: Iterable[_Entry]) -> dict[int, JournalRecord]:
+    records: dict[int, JournalRecord] = {}
+    for ts, event, id_, data in entries:
+        if event == 'number':
+            records[id_] = JournalRecord(id_, data['phone'], data['service'], data['country'], data['operator'],
+                                         STATUS_WAIT_CODE, ts)
+        elif event in _CLOSING_EVENTS:
+            records.pop(id_, None)
+        elif id_ in records:
+            if event == 'status':
+                records[id_] = records[id_]._replace(status=data['status'])
+            elif event == 'retry':
+                records[id_] = records[id_]._replace(status=STATUS_WAIT_RETRY)
+    return records
+
+
+def _snapshot(records: Iterable[JournalRecord]) -> list[_Entry]:
+    entries = []
+    for r in records:
+        entries.append((r.opened_at, 'number', r.activation_id,
+                        {'phone': r.phone, 'service': r.service, 'country': r.country, 'operator': r.operator}))
+        if r.status != STATUS_WAIT_CODE:
+            entries.append((r.opened_at, 'status', r.activation_id, {'status': r.status}))
+    return entries
+
+
+def recover(journal: Journal, wrapper: 'SmsHubWrapper', poller: Optional['ActivationPoller'] = None,
+            callback: Optional[Callable[['SmsActivation'], None]] = None) -> list['SmsActivation']:
+    """
+    Take over activations left open by a previous run. No requests are made
+    :param journal: Journal of the previous run
+    :param wrapper: :class:`SmsHubWrapper` for the activations
+    :param poller: Started :class:`ActivationPoller` to wait for SMS on all activations (optional)
+    :param callback: Called by `poller` with activation when code received (optional)
+    :return: Activations with their last known status
+    """
+    from .activation import SmsActivation
+
+    activations = []
+    for r in journal.open_activations():
+        activation = SmsActivation.from_number(r.activation_id, r.phone, r.service, wrapper=wrapper,
+                                               operator=r.operator, country=r.country)
+        activation.status = r.status
+        if poller is not None:
+            poller.add(activation, callback)
+        activations.append(activation)
+    return activations
+
+
+def cancel_open(journal: Journal, wrapper: 'SmsHubWrapper', max_concurrency: int = 8) -> CancelResult:
+    """
+    Cancel activations left open by a previous run in parallel threads.
+    Activations already gone from SmsHub are counted as cancelled
+    :param journal: Journal of the previous run
+    :param wrapper: :class:`SmsHubWrapper` of the same account
+    :param max_concurrency: Maximum number of simultaneous requests
+    :return: Cancelled activation IDs and failures, e.g. of activations which already got code
+    """
+    def cancel(id_: int):
+        try:
+            r = wrapper.set_status(id_, CANCEL)
+            if r != ACCESS_CANCEL:
+                raise IncorrectResponse(ACCESS_CANCEL, r)
+        except NoActivation:
+            # Repeated closing event of the wrapper journal is ignored on replay
+            journal.closed(id_)
+            return None
+        except Exception as e:
+            return e
+        if wrapper.journal is not journal:
+            journal.closed(id_)
+
+    ids = [r.activation_id for r in journal.open_activations()]
+    with ThreadPoolExecutor(max_concurrency) as executor:
+        errors = list(executor.map(cancel, ids))
+    return CancelResult([id_ for id_, e in zip(ids, errors) if e is None],
+                        [(id_, e) for id_, e in zip(ids, errors) if e is not None])
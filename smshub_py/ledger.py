@@ -0,0 +1,125 @@
+"""
+Local balance of one API key. Pass :class:`BalanceLedger` to a wrapper, and `get_balance` is answered
+locally between occasional `getBalance` requests
+"""
+from collections import OrderedDict
+from typing import Optional
+import threading
+import time
+
+
+class BalanceLedger:
+    def __init__(self, sync_interval: float = 300, track: int = 100000):
+        """
+        Balance kept up to date by the wrapper: price of every got number is subtracted, and added back when
+        the activation is cancelled. Prices are taken from the last `get_prices` responses of the wrapper,
+        so keep them fresh, e.g. with wrapper cache. `get_balance` requests SmsHub only every `sync_interval`,
+        after :class:`NoBalance`, or after getting a number of unknown price, and the difference found
+        is kept in `drift`
+        :param sync_interval: Time between `getBalance` requests (Seconds)
+        :param track: Number of last activations whose price is remembered for refund
+        """
+        self.sync_interval = sync_interval
+        self.track = track
+        self.balance: Optional[float] = None
+        self.drift = 0.
+        self.syncs = 0
+        self._synced_at = 0.
+        self._stale = True
+        self._prices: dict[tuple[Optional[str], Optional[str]], dict] = {}
+        self._charged: OrderedDict[int, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def due(self) -> bool:
+        """
+        :return: `True` if balance must be requested from SmsHub
+        """
+        return self._stale or time.monotonic() - self._synced_at >= self.sync_interval
+
+    def synced(self, balance: float):
+        """
+        Record balance received from SmsHub
+        """
+        with self._lock:
+            if self.balance is not None:
+                self.drift = balance - self.balance
+            self.balance = balance
+            self.syncs += 1
+            self._synced_at = time.monotonic()
+            self._stale = False
+
+    def invalidate(self):
+        """
+        Request balance from SmsHub on the next `get_balance`
+        """
+        self._stale = True
+
+    def prices_received(self, service: Optional[str], country: Optional[int], prices: dict):
+        """
+        Record `get_prices` response. Only the reference is kept
+        """
+        self._prices[service or None, None if country in (None, '') else str(country)] = prices
+
+    def price_of(self, service: str, country: Optional[int]) -> Optional[float]:
+        """
+        :param service: Service code
+        :param country: Country ID
+        :return: The lowest price of available numbers, `None` if unknown
+        """
+        if country in (None, ''):
+            return None
+        country = str(country)
+        for key in ((service, country), (service, None), (None, country), (None, None)):
+            prices = self._prices.get(key)
+            # Country without offers is `[]` in getPrices response
+            services = prices.get(country) if prices else None
+            offers = services.get(service) if services else None
+            if offers:
+                available = [float(price) for price, count in offers.items() if int(count) > 0]
+                if available:
+                    return min(available)
+        return None
+
+    def can_afford(self, service: str, country: Optional[int] = None) -> bool:
+        """
+        Local check before getting number. `True` when balance or price is unknown
+        :param service: Service code
+        :param country: Country ID
+        """
+        price = self.price_of(service, country)
+        return self.balance is None or price is None or self.balance >= price
+
+    def debit(self, activation_id: int, service: str, country: Optional[int]):
+        """
+        Record number got. Never raises, as the number is already paid for
+        """
+        try:
+            price = self.price_of(service, country)
+        except Exception:
+            # Malformed prices response, balance is requested on the next `get_balance`
+            price = None
+        if price is None:
+            self.invalidate()
+            return
+        with self._lock:
+            if self.balance is not None:
+                self.balance -= price
+            self._charged[activation_id] = price
+            if len(self._charged) > self.track:
+                self._charged.popitem(last=False)
+
+    def refund(self, activation_id: int):
+        """
+        Record activation cancelled. Price is added back once
+        """
+        with self._lock:
+            price = self._charged.pop(activation_id, None)
+            if price is not None and self.balance is not None:
+                self.balance += price
+
+    def settle(self, activation_id: int):
+        """
+        Record activation finished or gone, its price is not refunded
+        """
+        with self._lock:
+            self._charged.pop(activation_id, None)
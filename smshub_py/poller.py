@@ -0,0 +1,175 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from .activation import SmsActivation
+from .status import STATUS_OK
+from .exceptions import TimeoutException
+from .polling import PollingPolicy, FixedInterval
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ('activation', 'future', 'callback', 'policy', 'deadline', 'origin', 'started', 'polls')
+
+    def __init__(self, activation, future: Future, callback: Optional[Callable], policy: PollingPolicy,
+                 deadline: float, origin: float, started: float):
+        self.activation = activation
+        self.future = future
+        self.callback = callback
+        self.policy = policy
+        self.deadline = deadline
+        self.origin = origin
+        self.started = started
+        self.polls = 0
+
+    def report(self, now: float, received: bool):
+        self.activation._report_wait(self.polls, now - self.started, received)
+
+
+class ActivationPoller:
+    def __init__(self, interval: float = 1, timeout: float = 120, max_rps: Optional[float] = None,
+                 policy: Optional[PollingPolicy] = None, workers: int = 8):
+        """
+        Polls status of many activations from one thread, ordered by time of the next request.
+        Use it instead of :meth:`SmsActivation.wait_for_sms` on every activation
+        :param interval: Interval of requests for each activation (Seconds)
+        :param timeout: Default timeout for each activation (Seconds)
+        :param max_rps: Maximum requests per second for all activations together (optional)
+        :param policy: :class:`PollingPolicy` deciding when to make requests. Overrides `interval`
+        :param workers: Number of threads making requests
+        """
+        self.policy = policy if policy is not None else FixedInterval(interval)
+        self.timeout = timeout
+        self.max_rps = max_rps
+        self.workers = workers
+        self._heap: list[tuple[float, int, _Entry]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._next_slot = 0.
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._free_workers = threading.Semaphore(workers)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, activation: SmsActivation, callback: Optional[Callable[[SmsActivation], None]] = None,
+            timeout: Optional[float] = None, policy: Optional[PollingPolicy] = None) -> Future:
+        """
+        Start polling activation until SMS code received
+        :param activation: :class:`SmsActivation` object
+        :param callback: Called with activation when code received (optional)
+        :param timeout: Timeout (Seconds). When time is off :class:`TimeoutException` will be set to the future
+        :param policy: :class:`PollingPolicy` for this activation. Policy of the poller by default
+        :return: Future with SMS code
+        """
+        future = Future()
+        now = time.monotonic()
+        origin = activation.sent_at if activation.sent_at is not None else now
+        entry = _Entry(activation, future, callback, self.policy if policy is None else policy,
+                       now + (self.timeout if timeout is None else timeout), origin, now)
+        self._push(now, entry)
+        return future
+
+    def start(self):
+        """
+        Start polling in background thread
+        """
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='ActivationPoller')
+        self._thread = threading.Thread(target=self._run, name='ActivationPoller', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop polling. Futures of activations left in queue are cancelled, the activations are not cancelled
+        on SmsHub
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            # Requests in progress finish and put their activations back to queue
+            self._executor.shutdown()
+            self._thread = self._executor = None
+        with self._cond:
+            entries, self._heap = [item[2] for item in self._heap], []
+        for entry in entries:
+            entry.future.cancel()
+
+    def _push(self, due: float, entry: _Entry):
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._seq), entry))
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now and self._next_slot <= now:
+                        break
+                    self._cond.wait(max(self._heap[0][0], self._next_slot) - now if self._heap else None)
+                else:
+                    return
+                entry = heapq.heappop(self._heap)[2]
+                if self.max_rps:
+                    self._next_slot = now + 1 / self.max_rps
+            if entry.future.cancelled():
+                continue
+            self._free_workers.acquire()
+            self._executor.submit(self._poll, entry)
+
+    def _poll(self, entry: _Entry):
+        try:
+            entry.activation.update_status()
+        except Exception as e:
+            # Future may be cancelled by its owner or `stop` from another thread at any moment
+            if entry.future.set_running_or_notify_cancel():
+                entry.future.set_exception(e)
+            return
+        finally:
+            self._free_workers.release()
+        if entry.future.cancelled():
+            return
+        entry.polls += 1
+        now = time.monotonic()
+        if entry.activation.status == STATUS_OK:
+            entry.policy.record(entry.activation, now - entry.origin)
+            entry.report(now, True)
+            if entry.future.set_running_or_notify_cancel():
+                entry.future.set_result(entry.activation.code)
+                if entry.callback is not None:
+                    _call(entry)
+            return
+        if now >= entry.deadline:
+            entry.report(now, False)
+            if entry.future.set_running_or_notify_cancel():
+                entry.future.set_exception(TimeoutException())
+            return
+        delay = entry.policy.next_delay(entry.activation, entry.polls, now - entry.origin)
+        self._push(min(now + delay, entry.deadline), entry)
+
+
+def _call(entry):
+    try:
+        entry.callback(entry.activation)
+    except Exception:
+        logger.exception('Callback for activation %s failed', entry.activation.activation_id)
@@ -0,0 +1,144 @@
+"""
+Polling policies for `wait_for_sms`. One policy object may be shared by any number of
+:class:`SmsActivation` and :class:`AsyncSmsActivation` objects and pollers
+"""
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import NamedTuple, Optional
+import random
+import threading
+
+
+class WaitResult(NamedTuple):
+    polls: int
+    elapsed: float
+
+
+class PollingPolicy(ABC):
+    """
+    Base polling policy. Subclasses override :meth:`next_delay`
+    """
+
+    @abstractmethod
+    def next_delay(self, activation, polls: int, elapsed: float) -> float:
+        """
+        :param activation: Activation waiting for SMS
+        :param polls: Number of requests already made while waiting
+        :param elapsed: Time since SMS was sent, or since waiting started (Seconds)
+        :return: Delay from the previous request to the next one (Seconds)
+        """
+
+    def record(self, activation, elapsed: float):
+        """
+        Called when SMS code received
+        :param activation: Activation which got code
+        :param elapsed: Time since SMS was sent, or since waiting started (Seconds)
+        """
+
+
+class FixedInterval(PollingPolicy):
+    def __init__(self, interval: float = 1):
+        """
+        Requests at a fixed rate
+        :param interval: Interval of requests (Seconds)
+        """
+        self.interval = interval
+
+    def next_delay(self, activation, polls: int, elapsed: float) -> float:
+        return self.interval
+
+
+class ExponentialBackoff(PollingPolicy):
+    def __init__(self, initial: float = 1, factor: float = 1.5, maximum: float = 15, jitter: float = 0.1):
+        """
+        Interval grows after every request
+        :param initial: First interval (Seconds)
+        :param factor: Multiplier of interval after every request
+        :param maximum: Maximum interval (Seconds)
+        :param jitter: Random deviation of interval, fraction of it
+        """
+        self.initial = initial
+        self.factor = factor
+        self.maximum = maximum
+        self.jitter = jitter
+
+    def next_delay(self, activation, polls: int, elapsed: float) -> float:
+        delay = min(self.initial * self.factor ** max(polls - 1, 0), self.maximum)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class FastThenSlow(PollingPolicy):
+    def __init__(self, fast: float = 1, fast_for: float = 30, slow: float = 5):
+        """
+        Frequent requests while SMS is most likely to arrive, rare ones after
+        :param fast: Interval of requests at the beginning (Seconds)
+        :param fast_for: Duration of frequent requests (Seconds)
+        :param slow: Interval of requests after that (Seconds)
+        """
+        self.fast = fast
+        self.fast_for = fast_for
+        self.slow = slow
+
+    def next_delay(self, activation, polls: int, elapsed: float) -> float:
+        return self.fast if elapsed < self.fast_for else self.slow
+
+
+class HistoricalPolicy(PollingPolicy):
+    def __init__(self, fallback: Optional[PollingPolicy] = None, fast: float = 1, slow: float = 5,
+                 window: int = 200, min_samples: int = 10, low: float = 0.1, high: float = 0.9):
+        """
+        Schedule based on past SMS arrival times of the same service and country.
+        Requests are rare before the `low` quantile of arrival time, frequent until the `high` one and rare after
+        :param fallback: Policy used until `min_samples` arrivals recorded. :class:`FastThenSlow` by default
+        :param fast: Interval of requests inside arrival window (Seconds)
+        :param slow: Interval of requests after arrival window (Seconds)
+        :param window: Number of last arrivals kept for each service and country
+        :param min_samples: Minimal number of arrivals to use history
+        :param low: Quantile of arrival time where arrival window starts
+        :param high: Quantile of arrival time where arrival window ends
+        """
+        self.fallback = fallback if fallback is not None else FastThenSlow(fast=fast, slow=slow)
+        self.fast = fast
+        self.slow = slow
+        self.window = window
+        self.min_samples = min_samples
+        self.low = low
+        self.high = high
+        self._history: dict[tuple, deque] = {}
+        self._windows: dict[tuple, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(activation) -> tuple:
+        return activation.service, activation.country_code
+
+    def arrival_window(self, service: str, country: Optional[int]) -> Optional[tuple[float, float]]:
+        """
+        :param service: Service code
+        :param country: Country ID
+        :return: Time range (Seconds) where most SMS arrive, `None` if not enough data
+        """
+        return self._windows.get((service, country))
+
+    def record(self, activation, elapsed: float):
+        key = self._key(activation)
+        with self._lock:
+            history = self._history.get(key)
+            if history is None:
+                history = self._history[key] = deque(maxlen=self.window)
+            history.append(elapsed)
+            if len(history) >= self.min_samples:
+                ordered = sorted(history)
+                self._windows[key] = (ordered[int(self.low * (len(ordered) - 1))],
+                                      ordered[int(self.high * (len(ordered) - 1))])
+
+    def next_delay(self, activation, polls: int, elapsed: float) -> float:
+        window = self._windows.get(self._key(activation))
+        if window is None:
+            return self.fallback.next_delay(activation, polls, elapsed)
+        start, end = window
+        if elapsed < start:
+            return max(min(start - elapsed, self.slow), self.fast)
+        if elapsed < end:
+            return self.fast
+        return self.slow
@@ -0,0 +1,286 @@
+"""
+Pools of wrappers with different API keys and proxies behind the usual wrapper methods
+"""
+from collections import OrderedDict
+from typing import Callable, Collection, Iterable, Iterator, Optional
+import threading
+import time
+
+import httpx
+
+from . import exceptions, responses
+from .wrapper import SmsHubWrapper
+
+
+class _Member:
+    __slots__ = ('wrapper', 'latency', 'error_rate', 'in_flight', 'failures', 'ejected_until', 'ejected_by')
+
+    def __init__(self, wrapper):
+        self.wrapper = wrapper
+        self.latency = 0.
+        self.error_rate = 0.
+        self.in_flight = 0
+        self.failures = 0
+        self.ejected_until = 0.
+        self.ejected_by: Optional[BaseException] = None
+
+    def score(self) -> float:
+        return (self.in_flight + 1) * self.latency / max(1 - self.error_rate, 0.05)
+
+
+class _Balancer:
+    """
+    Health and load of pool members, shared by synchronous and asynchronous pools
+    """
+
+    def __init__(self, wrappers: list, connection_errors: tuple, alpha: float, cooldown: float,
+                 failure_threshold: int, track: int):
+        self.members = [_Member(w) for w in wrappers]
+        self.connection_errors = (*connection_errors, exceptions.CircuitOpen)
+        self.alpha = alpha
+        self.cooldown = cooldown
+        self.failure_threshold = failure_threshold
+        self.track = track
+        self._sticky: OrderedDict[int, _Member] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def pick(self, exclude: Collection[_Member] = ()) -> _Member:
+        now = time.monotonic()
+        with self._lock:
+            healthy = [m for m in self.members if m.ejected_until <= now and m not in exclude]
+            if not healthy:
+                raise exceptions.PoolExhausted
+            return min(healthy, key=_Member.score)
+
+    def candidates(self) -> list[_Member]:
+        """
+        Members able to answer for activations, including rested ones, best first
+        """
+        with self._lock:
+            return sorted((m for m in self.members if m.ejected_until != float('inf')), key=_Member.score)
+
+    def healthy(self) -> list[_Member]:
+        now = time.monotonic()
+        return [m for m in self.members if m.ejected_until <= now]
+
+    def stick(self, activation_id: int) -> Optional[_Member]:
+        with self._lock:
+            return self._sticky.get(activation_id)
+
+    def begin(self, member: _Member):
+        with self._lock:
+            member.in_flight += 1
+
+    def remember(self, activation_id: int, member: _Member):
+        with self._lock:
+            self._sticky[activation_id] = member
+            if len(self._sticky) > self.track:
+                self._sticky.popitem(last=False)
+
+    def done(self, member: _Member, latency: float, error: Optional[BaseException]):
+        with self._lock:
+            member.in_flight -= 1
+            failed = isinstance(error, (*self.connection_errors, exceptions.SqlError, exceptions.ServerError))
+            member.latency += self.alpha * (latency - member.latency) if member.latency else latency
+            member.error_rate += self.alpha * (failed - member.error_rate)
+            if isinstance(error, exceptions.BadApiKey):
+                self._eject(member, error, float('inf'))
+            elif isinstance(error, exceptions.NoBalance):
+                self._eject(member, error, time.monotonic() + self.cooldown)
+            elif isinstance(error, self.connection_errors):
+                member.failures += 1
+                if member.failures >= self.failure_threshold:
+                    self._eject(member, error, time.monotonic() + self.cooldown)
+            else:
+                member.failures = 0
+
+    @staticmethod
+    def _eject(member: _Member, error: BaseException, until: float):
+        member.ejected_until = until
+        member.ejected_by = error
+        member.failures = 0
+
+
+def _member_kwargs(kwargs: dict, per_member: Optional[Callable[[str, Optional[str]], dict]], key: str,
+                   proxy: Optional[str]) -> dict:
+    """
+    Wrapper parameters of one pool member: shared `kwargs` updated by own parameters from `per_member`
+    """
+    if per_member is None:
+        return kwargs
+    return {**kwargs, **per_member(key, proxy)}
+
+
+class WrapperPool:
+    _transient_errors = SmsHubWrapper._transient_errors
+    _read_failover = (exceptions.BadApiKey, exceptions.CircuitOpen, httpx.TransportError)
+
+    def __init__(self, credentials: Iterable[tuple[str, Optional[str]]], alpha: float = 0.2, cooldown: float = 60,
+                 failure_threshold: int = 3, track: int = 100000,
+                 per_member: Optional[Callable[[str, Optional[str]], dict]] = None, **kwargs):
+        """
+        Spreads requests over wrappers with different API keys and proxies. Every request goes to the healthy
+        wrapper with the least in-flight requests weighted by EWMA of latency and error rate.
+        `getStatus` and `setStatus` go to the wrapper which got the number. For numbers got elsewhere, e.g.
+        by a previous run, the wrapper is found by asking each one and remembered.
+        Wrapper is taken out of rotation forever on :class:`BadApiKey`, and for `cooldown` on :class:`NoBalance`
+        or `failure_threshold` consecutive connection errors. May be passed to activations instead of wrapper
+        :param credentials: Pairs (API key, proxy), proxy may be `None`
+        :param alpha: Weight of the newest request in EWMA
+        :param cooldown: Time a wrapper stays out of rotation (Seconds)
+        :param failure_threshold: Consecutive connection errors taking a wrapper out of rotation
+        :param track: Number of last activations whose wrapper is remembered
+        :param per_member: Called with API key and proxy of each wrapper, returns its own parameters,
+            e.g. `lambda key, proxy: {'breaker': CircuitBreaker(), 'limiter': RateLimiter(10)}` for a circuit
+            and a rate limit per key
+        :param kwargs: Other :class:`SmsHubWrapper` parameters. `router` is applied by the pool,
+            other objects, including `breaker` and `limiter`, are shared by all wrappers
+        """
+        if kwargs.get('ledger') is not None:
+            raise ValueError('BalanceLedger tracks one API key and cannot be shared by the pool')
+        self.router = kwargs.pop('router', None)
+        self.ledger = None
+        self.instrumentation = kwargs.get('instrumentation')
+        self.journal = kwargs.get('journal')
+        self.cache = kwargs.get('cache')
+        wrappers = [SmsHubWrapper(key, proxy, **_member_kwargs(kwargs, per_member, key, proxy))
+                    for key, proxy in credentials]
+        if not wrappers:
+            raise ValueError('At least one API key is required')
+        self._balancer = _Balancer(wrappers, (httpx.TransportError,), alpha, cooldown, failure_threshold, track)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def wrappers(self) -> list[SmsHubWrapper]:
+        return [m.wrapper for m in self._balancer.members]
+
+    def close(self):
+        """
+        Close connection pools of all wrappers
+        """
+        for member in self._balancer.members:
+            member.wrapper.close()
+
+    def _call(self, member: _Member, method: str, *args):
+        self._balancer.begin(member)
+        start = time.perf_counter()
+        error = None
+        try:
+            return getattr(member.wrapper, method)(*args)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._balancer.done(member, time.perf_counter() - start, error)
+
+    def _balanced(self, method: str, failover: tuple, *args):
+        tried, error = [], None
+        while True:
+            try:
+                member = self._balancer.pick(tried)
+            except exceptions.PoolExhausted:
+                if error is not None:
+                    raise error
+                raise
+            try:
+                return member, self._call(member, method, *args)
+            except failover as e:
+                tried.append(member)
+                error = e
+
+    def _owner(self, activation_id: int) -> Optional[_Member]:
+        # Plain request, as `get_status` of a wrong key would close the activation in journal
+        error = None
+        for member in self._balancer.candidates():
+            try:
+                self._call(member, '_request', {'action': 'getStatus', 'id': activation_id})
+            except exceptions.NoActivation:
+                continue
+            except Exception as e:
+                error = error or e
+                continue
+            self._balancer.remember(activation_id, member)
+            return member
+        if error is not None:
+            raise error
+        return None
+
+    def _sticky(self, activation_id: int, method: str, *args):
+        member = self._balancer.stick(activation_id) or self._owner(activation_id)
+        if member is None:
+            # Unknown to every key
+            return self._balanced(method, (), activation_id, *args)[1]
+        return self._call(member, method, activation_id, *args)
+
+    def get_balance(self) -> float:
+        """
+        :return: Total balance of all API keys in rotation
+        """
+        return sum(m.wrapper.get_balance() for m in self._balancer.healthy())
+
+    def get_number_status(self, country: Optional[int] = None, operator: Optional[str] = None) -> dict[str, int]:
+        """
+        Request for quantity available numbers
+        :param country: Country ID
+        :param operator: Operator code
+        :return: `Dict` service - numbers quantity
+        """
+        return self._balanced('get_number_status', self._read_failover, country, operator)[1]
+
+    def get_number(self, service: str, operator: Optional[str] = None, country: Optional[int] = None) -> \
+            responses.Number:
+        """
+        Request for using number. Other wrappers are tried on :class:`NoBalance` and :class:`BadApiKey`
+        :param service: Service code
+        :param operator: Operator code
+        :param country: Country ID. Chosen by `router` if not passed
+        :return: Activation ID and phone number
+        """
+        if self.router is not None and country in (None, ''):
+            return self.router.get_number(self, service, operator)
+        return self._get_number(service, operator, country)
+
+    def _get_number(self, service: str, operator: Optional[str], country: Optional[int]) -> responses.Number:
+        member, number = self._balanced('_get_number', (exceptions.NoBalance, exceptions.BadApiKey),
+                                        service, operator, country)
+        self._balancer.remember(number.activation_id, member)
+        return number
+
+    def set_status(self, id_: int, status: int) -> str:
+        """
+        Set current status of activation through the wrapper which got it
+        :param id_: Activation ID
+        :param status: Status ID
+        :return: Status message
+        """
+        return self._sticky(id_, 'set_status', status)
+
+    def get_status(self, id_: int) -> responses.Status:
+        """
+        Get status of activation through the wrapper which got it
+        :param id_: Activation ID
+        :return: Status message, with code if possible
+        """
+        return self._sticky(id_, 'get_status')
+
+    def get_prices(self, service: str = None, country: int = None) -> dict[str, dict[str, dict[str, int]]]:
+        """
+        Get all prices
+        :param service: Service code
+        :param country: Country ID
+        :return: `Dict` with prices
+        """
+        return self._balanced('get_prices', self._read_failover, service, country)[1]
+
+    def stream_prices(self, service: Optional[str] = None, country: Optional[int] = None,
+                      services: Optional[Collection[str]] = None,
+                      countries: Optional[Collection[int]] = None) -> Iterator[responses.PriceRecord]:
+        """
+        See :meth:`SmsHubWrapper.stream_prices`
+        """
+        return self._balancer.pick().wrapper.stream_prices(service, country, services, countries)
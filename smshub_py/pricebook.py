@@ -0,0 +1,129 @@
+from array import array
+from typing import Collection, Iterator, NamedTuple, Optional
+import heapq
+import itertools
+
+
+class Offer(NamedTuple):
+    price: float
+    country: int
+    count: int
+    service: str
+
+
+class _Offers:
+    """
+    Offers of one service sorted by price, stored in parallel arrays
+    """
+    __slots__ = ('prices', 'countries', 'counts')
+
+    def __init__(self, rows: list[tuple[float, int, int]]):
+        rows.sort()
+        self.prices = array('d', [r[0] for r in rows])
+        self.countries = array('i', [r[1] for r in rows])
+        self.counts = array('q', [r[2] for r in rows])
+
+    def __len__(self):
+        return len(self.prices)
+
+    def rows(self) -> Iterator[tuple[float, int, int]]:
+        return zip(self.prices, self.countries, self.counts)
+
+
+class PriceBook:
+    def __init__(self, prices: Optional[dict[str, dict[str, dict[str, int]]]] = None):
+        """
+        Offers from `get_prices` response indexed by service, sorted by price.
+        Takes much less memory than the response and answers cheapest offers queries without sorting
+        :param prices: Response of `get_prices` (optional)
+        """
+        self._services: dict[str, _Offers] = {}
+        if prices:
+            self.update(prices)
+
+    def __len__(self):
+        return sum(len(o) for o in self._services.values())
+
+    def __contains__(self, service: str):
+        return service in self._services
+
+    @property
+    def services(self) -> list[str]:
+        """
+        Services having at least one offer
+        """
+        return list(self._services)
+
+    def update(self, prices: dict[str, dict[str, dict[str, int]]], service: Optional[str] = None,
+               country: Optional[int] = None):
+        """
+        Replace offers with a new `get_prices` response.
+        Pass the same `service` and `country` as to `get_prices`: offers outside of them are kept,
+        offers inside of them missing in the new response are removed
+        :param prices: Response of `get_prices`
+        :param service: Service code the response is filtered by (optional)
+        :param country: Country ID the response is filtered by (optional)
+        """
+        fresh: dict[str, list[tuple[float, int, int]]] = {}
+        for country_id, services in prices.items():
+            if not services:
+                continue
+            country_id = int(country_id)
+            for service_code, offers in services.items():
+                rows = fresh.setdefault(service_code, [])
+                rows.extend((float(price), country_id, int(count)) for price, count in offers.items())
+        scope_country = None if country in (None, '') else int(country)
+        for service_code in {*([service] if service else self._services), *fresh}:
+            rows = fresh.get(service_code, [])
+            current = self._services.get(service_code)
+            if current is not None and scope_country is not None:
+                rows.extend(r for r in current.rows() if r[1] != scope_country)
+            self._replace(service_code, rows)
+
+    def _replace(self, service: str, rows: list[tuple[float, int, int]]):
+        if rows:
+            self._services[service] = _Offers(rows)
+        else:
+            self._services.pop(service, None)
+
+    def _iter(self, service: str, min_count: int, countries: Optional[Collection[int]],
+              exclude: Optional[Collection[int]]) -> Iterator[Offer]:
+        offers = self._services.get(service)
+        if offers is None:
+            return
+        for price, country, count in offers.rows():
+            if count < min_count:
+                continue
+            if countries is not None and country not in countries:
+                continue
+            if exclude is not None and country in exclude:
+                continue
+            yield Offer(price, country, count, service)
+
+    def cheapest(self, service: str, count: Optional[int] = None, min_count: int = 1,
+                 countries: Optional[Collection[int]] = None,
+                 exclude: Optional[Collection[int]] = None) -> list[Offer]:
+        """
+        :param service: Service code
+        :param count: Results count (optional)
+        :param min_count: Minimal numbers quantity
+        :param countries: Only these country IDs (optional)
+        :param exclude: Except these country IDs (optional)
+        :return: Offers sorted by price
+        """
+        return list(itertools.islice(self._iter(service, min_count, countries, exclude), count))
+
+    def cheapest_any(self, services: Collection[str], count: Optional[int] = None, min_count: int = 1,
+                     countries: Optional[Collection[int]] = None,
+                     exclude: Optional[Collection[int]] = None) -> list[Offer]:
+        """
+        Cheapest offers of several services together
+        :param services: Service codes
+        :param count: Results count (optional)
+        :param min_count: Minimal numbers quantity
+        :param countries: Only these country IDs (optional)
+        :param exclude: Except these country IDs (optional)
+        :return: Offers sorted by price
+        """
+        merged = heapq.merge(*(self._iter(s, min_count, countries, exclude) for s in services))
+        return list(itertools.islice(merged, count))
@@ -0,0 +1,182 @@
+"""
+Client-side token bucket rate limiting. One :class:`RateLimiter` may be shared by any number of
+:class:`SmsHubWrapper` and :class:`AsyncSmsHubWrapper` objects, and with :class:`FileBackend`
+by processes on one host
+"""
+from typing import Optional
+import asyncio
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+DEFAULT = '*'
+
+
+def _take(bucket, now: float, rate: float, burst: float) -> float:
+    """
+    :return: Tokens left in bucket `(tokens, updated)` after taking one
+    """
+    try:
+        tokens, updated = bucket
+        tokens, updated = float(tokens), float(updated)
+    except (TypeError, ValueError):
+        # New bucket, or broken state
+        return burst - 1
+    # Clock stepped backwards adds nothing instead of draining the bucket
+    return min(burst, tokens + max(0., now - updated) * rate) - 1
+
+
+def _load(raw: bytes) -> dict:
+    """
+    Buckets from state file. Empty, torn or corrupt state is an empty set of buckets
+    """
+    try:
+        buckets = json.loads(raw)
+    except ValueError:
+        return {}
+    return buckets if isinstance(buckets, dict) else {}
+
+
+def _read_all(fd: int) -> bytes:
+    chunks = []
+    while True:
+        chunk = os.read(fd, 1 << 16)
+        if not chunk:
+            return b''.join(chunks)
+        chunks.append(chunk)
+
+
+def _write_all(fd: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+class LocalBackend:
+    """
+    Buckets stored in memory of the current process. Safe for threads and asyncio
+    """
+
+    def __init__(self):
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """
+        Take one token from bucket, going into debt if it is empty
+        :param key: Bucket name
+        :param rate: Tokens added per second
+        :param burst: Bucket capacity
+        :return: Time until taken token is available (Seconds)
+        """
+        with self._lock:
+            now = time.monotonic()
+            tokens = _take(self._buckets.get(key), now, rate, burst)
+            self._buckets[key] = (tokens, now)
+        return max(0., -tokens / rate)
+
+
+class FileBackend(LocalBackend):
+    def __init__(self, path: str):
+        """
+        Buckets stored in a file locked on every access. Shares limits between processes on one host.
+        Unreadable state, e.g. of a torn write, starts buckets anew. Not available on Windows
+        :param path: Path to the state file. Created if missing
+        """
+        if fcntl is None:
+            raise RuntimeError('FileBackend requires fcntl')
+        super().__init__()
+        self.path = path
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                buckets = _load(_read_all(fd))
+                # Wall clock, as monotonic clocks of processes are not comparable on every platform
+                now = time.time()
+                tokens = _take(buckets.get(key), now, rate, burst)
+                buckets[key] = (tokens, now)
+                data = json.dumps(buckets).encode()
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                _write_all(fd, data)
+            finally:
+                os.close(fd)
+        return max(0., -tokens / rate)
+
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 per_action: Optional[dict[str, tuple[float, float]]] = None,
+                 backend: Optional[LocalBackend] = None):
+        """
+        Token bucket limiting requests rate. Actions without own budget share the default one
+        :param rate: Default requests per second
+        :param burst: Default maximum requests at once. Equals to `rate` by default
+        :param per_action: `Dict` action - (requests per second, burst), e.g. `{'getStatus': (20, 40)}`
+        :param backend: :class:`LocalBackend` (default) or :class:`FileBackend`
+        """
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self.per_action = per_action or {}
+        self.backend = backend if backend is not None else LocalBackend()
+        self.requests: dict[str, int] = {}
+        self.delays: dict[str, float] = {}
+        self.max_delays: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, action: str) -> float:
+        """
+        Reserve request without waiting
+        :param action: API action
+        :return: Time until request is allowed (Seconds)
+        """
+        budget = self.per_action.get(action)
+        if budget is None:
+            delay = self.backend.take(DEFAULT, self.rate, self.burst)
+        else:
+            delay = self.backend.take(action, *budget)
+        with self._lock:
+            self.requests[action] = self.requests.get(action, 0) + 1
+            self.delays[action] = self.delays.get(action, 0.) + delay
+            if delay > self.max_delays.get(action, 0.):
+                self.max_delays[action] = delay
+        return delay
+
+    def acquire(self, action: str) -> float:
+        """
+        Wait until request is allowed
+        :param action: API action
+        :return: Queueing delay (Seconds)
+        """
+        delay = self.reserve(action)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def async_acquire(self, action: str) -> float:
+        """
+        Asynchronous wait until request is allowed
+        :param action: API action
+        :return: Queueing delay (Seconds)
+        """
+        delay = self.reserve(action)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def mean_delay(self, action: str) -> float:
+        """
+        :param action: API action
+        :return: Mean queueing delay of the action (Seconds)
+        """
+        requests = self.requests.get(action)
+        return self.delays[action] / requests if requests else 0.
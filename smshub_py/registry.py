@@ -0,0 +1,285 @@
+"""
+Compact in-memory registry of many in-flight activations. Activations are kept in parallel arrays with
+integer statuses and indexes of shared wrappers and strings, so they cost no Python objects to allocate
+or for GC to traverse. Indexes by status and deadline make queries like "waiting for code longer than
+a minute" proportional to the result, not to the number of activations
+"""
+from array import array
+from typing import Any, Iterator, NamedTuple, Optional
+import heapq
+import threading
+import time
+
+from .exceptions import IncorrectResponse
+from .status import STATUS_WAIT_CODE, STATUS_WAIT_RETRY, STATUS_OK, STATUS_CANCEL
+
+# Integer codes of statuses for compact storage
+_STATE_WAIT_CODE = 0
+_STATE_WAIT_RETRY = 1
+_STATE_OK = 2
+_STATE_CANCEL = 3
+_STATE_STATUSES = (STATUS_WAIT_CODE, STATUS_WAIT_RETRY, STATUS_OK, STATUS_CANCEL)
+_STATUS_STATES = {status: state for state, status in enumerate(_STATE_STATUSES)}
+
+_NO_COUNTRY = -1
+_NO_DEADLINE = float('inf')
+
+
+def _state(status: str) -> int:
+    state = _STATUS_STATES.get(status)
+    if state is None:
+        raise IncorrectResponse(' | '.join(_STATE_STATUSES), status)
+    return state
+
+
+class ActivationRecord(NamedTuple):
+    activation_id: int
+    phone: int
+    service: str
+    country: Optional[int]
+    operator: Optional[str]
+    wrapper: Any
+    status: str
+    code: Optional[str]
+    since: float
+    deadline: Optional[float]
+
+
+class ActivationRegistry:
+    def __init__(self, wrapper=None):
+        """
+        Registry of activations neither finished nor cancelled. Returned records are snapshots.
+        Safe to share between threads
+        :param wrapper: Default wrapper of added activations (optional)
+        """
+        self.wrapper = wrapper
+        self._slots: dict[int, int] = {}
+        self._free: list[int] = []
+        self._ids = array('q')
+        self._phones = array('q')
+        self._states = array('b')
+        self._since = array('d')
+        self._deadlines = array('d')
+        self._countries = array('i')
+        self._services = array('I')
+        self._operators = array('I')
+        self._wrappers = array('I')
+        # Distinct services, operators and wrappers referenced by index
+        self._refs: list = [None]
+        self._ref_index: dict = {None: 0}
+        self._codes: dict[int, str] = {}
+        # Status -> IDs in order of entering it
+        self._by_state: list[dict[int, None]] = [{} for _ in _STATE_STATUSES]
+        self._heap: list[tuple[float, int]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, activation_id: int):
+        return activation_id in self._slots
+
+    def __iter__(self) -> Iterator[ActivationRecord]:
+        with self._lock:
+            return iter([self._record(id_, slot) for id_, slot in self._slots.items()])
+
+    def add(self, activation_id: int, phone: int, service: str, country: Optional[int] = None,
+            operator: Optional[str] = None, wrapper=None, status: Optional[str] = None,
+            timeout: Optional[float] = None):
+        """
+        Register activation. Registering the same ID again replaces it
+        :param activation_id: Activation ID
+        :param phone: Phone number
+        :param service: Service code
+        :param country: Country ID
+        :param operator: Operator name
+        :param wrapper: Wrapper of the activation. Registry default if not passed
+        :param status: Current status, `STATUS_WAIT_CODE` if not passed
+        :param timeout: Time from now after which activation is returned by :meth:`pop_expired` (Seconds)
+        """
+        state = _STATE_WAIT_CODE if status is None else _state(status)
+        now = time.monotonic()
+        deadline = _NO_DEADLINE if timeout is None else now + timeout
+        with self._lock:
+            self._discard(activation_id)
+            values = (activation_id, phone, state, now, deadline,
+                      _NO_COUNTRY if country in (None, '') else country, self._ref(service),
+                      self._ref(operator or None), self._ref(self.wrapper if wrapper is None else wrapper))
+            columns = (self._ids, self._phones, self._states, self._since, self._deadlines, self._countries,
+                       self._services, self._operators, self._wrappers)
+            if self._free:
+                slot = self._free.pop()
+                for column, value in zip(columns, values):
+                    column[slot] = value
+            else:
+                slot = len(self._ids)
+                for column, value in zip(columns, values):
+                    column.append(value)
+            self._slots[activation_id] = slot
+            self._by_state[state][activation_id] = None
+            if timeout is not None:
+                heapq.heappush(self._heap, (deadline, activation_id))
+
+    def track(self, activation, timeout: Optional[float] = None):
+        """
+        Register :class:`SmsActivation` or :class:`AsyncSmsActivation` with number.
+        The activation object itself is not kept
+        :param activation: Activation
+        :param timeout: Time from now after which activation is returned by :meth:`pop_expired` (Seconds)
+        """
+        self.add(activation.activation_id, activation.phone, activation.service, activation.country_code,
+                 activation.operator, activation.wrapper, activation.status, timeout)
+        if activation.code is not None and activation.status in (STATUS_OK, STATUS_WAIT_RETRY):
+            with self._lock:
+                self._codes[activation.activation_id] = activation.code
+
+    def get(self, activation_id: int) -> Optional[ActivationRecord]:
+        """
+        :return: Record of activation, `None` if not registered
+        """
+        with self._lock:
+            slot = self._slots.get(activation_id)
+            return None if slot is None else self._record(activation_id, slot)
+
+    def update(self, activation_id: int, status: str, code: Optional[str] = None) -> bool:
+        """
+        Record status received from SmsHub, e.g. `registry.update(id_, *wrapper.get_status(id_))`.
+        Cancelled activations are removed, unknown status raises :class:`IncorrectResponse`
+        :param activation_id: Activation ID
+        :param status: Status string
+        :param code: SMS code of `STATUS_OK` and `STATUS_WAIT_RETRY`
+        :return: `False` if activation is not registered
+        """
+        state = _state(status)
+        with self._lock:
+            slot = self._slots.get(activation_id)
+            if slot is None:
+                return False
+            if state == _STATE_CANCEL:
+                self._discard(activation_id)
+                return True
+            if state == _STATE_OK or state == _STATE_WAIT_RETRY:
+                self._codes[activation_id] = code
+            if state != self._states[slot]:
+                del self._by_state[self._states[slot]][activation_id]
+                self._states[slot] = state
+                self._since[slot] = time.monotonic()
+                self._by_state[state][activation_id] = None
+            return True
+
+    def remove(self, activation_id: int) -> bool:
+        """
+        Unregister activation, e.g. finished or cancelled
+        :return: `False` if activation is not registered
+        """
+        with self._lock:
+            return self._discard(activation_id)
+
+    def count(self, status: str) -> int:
+        """
+        :return: Number of activations with status
+        """
+        return len(self._by_state[_state(status)])
+
+    def with_status(self, status: str) -> list[ActivationRecord]:
+        """
+        :param status: Status string, e.g. `STATUS_OK` for codes not finished yet
+        :return: Records with status, longest in it first
+        """
+        with self._lock:
+            return [self._record(id_, self._slots[id_]) for id_ in self._by_state[_state(status)]]
+
+    def older_than(self, status: str, seconds: float) -> list[ActivationRecord]:
+        """
+        Activations with status for longer than `seconds`, e.g. `older_than(STATUS_WAIT_CODE, 60)`
+        :param status: Status string
+        :param seconds: Minimal time in status (Seconds)
+        :return: Records, longest in status first
+        """
+        cutoff = time.monotonic() - seconds
+        records = []
+        with self._lock:
+            for id_ in self._by_state[_state(status)]:
+                slot = self._slots[id_]
+                if self._since[slot] > cutoff:
+                    break
+                records.append(self._record(id_, slot))
+        return records
+
+    def set_timeout(self, activation_id: int, timeout: Optional[float]):
+        """
+        :param activation_id: Activation ID
+        :param timeout: Time from now after which activation is returned by :meth:`pop_expired` (Seconds),
+            `None` for no deadline
+        """
+        with self._lock:
+            slot = self._slots.get(activation_id)
+            if slot is None:
+                return
+            deadline = _NO_DEADLINE if timeout is None else time.monotonic() + timeout
+            self._deadlines[slot] = deadline
+            if timeout is not None:
+                if len(self._heap) > 2 * len(self._slots) + 64:
+                    # Drop entries of removed activations and changed deadlines
+                    self._heap = [e for e in self._heap if self._deadline_of(e[1]) == e[0]]
+                    heapq.heapify(self._heap)
+                heapq.heappush(self._heap, (deadline, activation_id))
+
+    def pop_expired(self, now: Optional[float] = None) -> list[ActivationRecord]:
+        """
+        Activations whose deadline passed. Each one is returned once and stays registered
+        :param now: Time to compare deadlines with, `time.monotonic()` by default
+        :return: Records, earliest deadline first
+        """
+        now = time.monotonic() if now is None else now
+        records = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, id_ = heapq.heappop(self._heap)
+                # Entries of removed activations and changed deadlines are skipped here
+                if self._deadline_of(id_) == deadline:
+                    slot = self._slots[id_]
+                    records.append(self._record(id_, slot))
+                    self._deadlines[slot] = _NO_DEADLINE
+        return records
+
+    def next_deadline(self) -> Optional[float]:
+        """
+        :return: Earliest deadline in `time.monotonic()` terms, `None` if there are none
+        """
+        with self._lock:
+            while self._heap:
+                deadline, id_ = self._heap[0]
+                if self._deadline_of(id_) == deadline:
+                    return deadline
+                heapq.heappop(self._heap)
+        return None
+
+    def _ref(self, value) -> int:
+        index = self._ref_index.get(value)
+        if index is None:
+            index = self._ref_index[value] = len(self._refs)
+            self._refs.append(value)
+        return index
+
+    def _deadline_of(self, activation_id: int) -> Optional[float]:
+        slot = self._slots.get(activation_id)
+        return None if slot is None else self._deadlines[slot]
+
+    def _record(self, activation_id: int, slot: int) -> ActivationRecord:
+        country, deadline = self._countries[slot], self._deadlines[slot]
+        return ActivationRecord(activation_id, self._phones[slot], self._refs[self._services[slot]],
+                                None if country == _NO_COUNTRY else country, self._refs[self._operators[slot]],
+                                self._refs[self._wrappers[slot]], _STATE_STATUSES[self._states[slot]],
+                                self._codes.get(activation_id), self._since[slot],
+                                None if deadline == _NO_DEADLINE else deadline)
+
+    def _discard(self, activation_id: int) -> bool:
+        slot = self._slots.pop(activation_id, None)
+        if slot is None:
+            return False
+        del self._by_state[self._states[slot]][activation_id]
+        self._codes.pop(activation_id, None)
+        self._deadlines[slot] = _NO_DEADLINE
+        self._free.append(slot)
+        return True
@@ -0,0 +1,169 @@
+"""
+Parsing of SmsHub API responses shared by synchronous and asynchronous wrappers
+"""
+from typing import Collection, NamedTuple, Optional, Union
+import codecs
+import re
+
+from . import exceptions
+from .status import STATUS_OK, STATUS_WAIT_RETRY
+
+ERRORS = {
+    'BAD_KEY': exceptions.BadApiKey,
+    'ERROR_SQL': exceptions.SqlError,
+    'NO_NUMBERS': exceptions.NoNumbers,
+    'NO_BALANCE': exceptions.NoBalance,
+    'WRONG_SERVICE': exceptions.WrongService,
+    'NO_ACTIVATION': exceptions.NoActivation,
+}
+
+ACCESS_BALANCE = 'ACCESS_BALANCE'
+ACCESS_NUMBER = 'ACCESS_NUMBER'
+
+_CODE_STATUSES = frozenset((STATUS_OK, STATUS_WAIT_RETRY))
+
+# `"service": {"price": count, ...}` | `"key": {` or `"key": [` | closing bracket | opening bracket
+_PRICE_TOKEN = re.compile(r'"([^"]*)"\s*:\s*\{([^{}]*)\}|"([^"]*)"\s*:\s*[{\[]|([}\]])|[{\[]')
+_PRICE_PAIR = re.compile(r'"([^"]*)"\s*:\s*"?(\d+)')
+
+
+class Number(NamedTuple):
+    activation_id: int
+    phone: int
+
+
+class Status(NamedTuple):
+    status: str
+    code: Union[str, int]
+
+
+class PriceRecord(NamedTuple):
+    country: int
+    service: str
+    price: float
+    count: int
+
+
+def check(text: str) -> str:
+    """
+    Raise exception from :mod:`smshub_py.exceptions` if response is an error
+    :param text: Decoded response body
+    :return: The same response body
+    """
+    error = ERRORS.get(text)
+    if error is not None:
+        raise error
+    return text
+
+
+def parse_balance(text: str) -> float:
+    """
+    :param text: `ACCESS_BALANCE:<balance>`
+    :return: Balance value
+    """
+    prefix, _, balance = text.partition(':')
+    try:
+        if prefix == ACCESS_BALANCE:
+            return float(balance)
+    except ValueError:
+        pass
+    raise exceptions.IncorrectResponse(ACCESS_BALANCE, text)
+
+
+def parse_number(text: str) -> Number:
+    """
+    :param text: `ACCESS_NUMBER:<activation id>:<phone>`
+    :return: Activation ID and phone number
+    """
+    parts = text.split(':')
+    try:
+        if len(parts) == 3 and parts[0] == ACCESS_NUMBER:
+            return Number(int(parts[1]), int(parts[2]))
+    except ValueError:
+        pass
+    raise exceptions.IncorrectResponse(ACCESS_NUMBER, text)
+
+
+def parse_status(text: str) -> Status:
+    """
+    :param text: `STATUS_*` or `STATUS_*:<code>`
+    :return: Status message, with code if possible
+    """
+    status, _, code = text.partition(':')
+    if status in _CODE_STATUSES:
+        return Status(status, code)
+    return Status(text, 0)
+
+
+class PriceParser:
+    def __init__(self, services: Optional[Collection[str]] = None, countries: Optional[Collection[int]] = None):
+        """
+        Incremental parser of `getPrices` response. Feed body chunks as they arrive and get offers
+        without building the whole response in memory
+        :param services: Only offers of these service codes (optional)
+        :param countries: Only offers of these country IDs (optional)
+        """
+        self.services = services
+        self.countries = countries
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._json: Optional[bool] = None
+        self._depth = 0
+        self._country: Optional[int] = None
+
+    def feed(self, chunk: bytes) -> list[PriceRecord]:
+        """
+        :param chunk: Next part of response body
+        :return: Offers completed by this chunk
+        """
+        self._buffer += self._decoder.decode(chunk)
+        if self._json is None:
+            head = self._buffer.lstrip()
+            if not head:
+                return []
+            # Response without offers may be `[]`
+            self._json = head[0] in '{['
+        if not self._json:
+            return []
+        # Service objects contain no brackets, so everything up to the last closing one is complete
+        end = max(self._buffer.rfind('}'), self._buffer.rfind(']')) + 1
+        if not end:
+            return []
+        text, self._buffer = self._buffer[:end], self._buffer[end:]
+        return self._parse(text)
+
+    def close(self) -> list[PriceRecord]:
+        """
+        Finish parsing after the last chunk
+        :return: Remaining offers
+        """
+        self._buffer += self._decoder.decode(b'', final=True)
+        if not self._json:
+            text = check(self._buffer)
+            raise exceptions.IncorrectResponse('JSON', text)
+        records = self._parse(self._buffer)
+        self._buffer = ''
+        if self._depth:
+            raise exceptions.IncorrectResponse('JSON', 'truncated getPrices response')
+        return records
+
+    def _parse(self, text: str) -> list[PriceRecord]:
+        records = []
+        depth, country = self._depth, self._country
+        services, countries = self.services, self.countries
+        for service, offers, key, close in _PRICE_TOKEN.findall(text):
+            if service:
+                if depth != 2 or country is None or (services is not None and service not in services):
+                    continue
+                records.extend(PriceRecord(country, service, float(price), int(count))
+                               for price, count in _PRICE_PAIR.findall(offers))
+            elif close:
+                depth -= 1
+            else:
+                depth += 1
+                if depth == 2:
+                    country = int(key) if key.isdigit() else None
+                    if countries is not None and country not in countries:
+                        country = None
+        self._depth, self._country = depth, country
+        return records
@@ -0,0 +1,76 @@
+from typing import Collection
+import random
+import threading
+import time
+
+from .exceptions import CircuitOpen
+
+IDEMPOTENT_ACTIONS = frozenset(('getStatus', 'getBalance', 'getPrices', 'getNumbersStatus'))
+
+
+class RetryPolicy:
+    def __init__(self, attempts: int = 3, base: float = 0.5, cap: float = 10,
+                 actions: Collection[str] = IDEMPOTENT_ACTIONS):
+        """
+        Retrying of requests failed with :class:`SqlError`, :class:`ServerError`, timeouts and connection errors.
+        Delays grow exponentially with full jitter
+        :param attempts: Maximum retries of one request
+        :param base: Delay before the first retry is up to this value (Seconds)
+        :param cap: Maximum delay (Seconds)
+        :param actions: Actions safe to repeat. `getNumber` and `setStatus` are not by default
+        """
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.actions = frozenset(actions)
+
+    def should_retry(self, action: str, attempt: int) -> bool:
+        """
+        :param action: API action
+        :param attempt: Number of retries already made
+        """
+        return action in self.actions and attempt < self.attempts
+
+    def backoff(self, attempt: int) -> float:
+        """
+        :param attempt: Number of retries already made
+        :return: Delay before the next retry (Seconds)
+        """
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = 5, cooldown: float = 30):
+        """
+        Fails requests fast with :class:`CircuitOpen` after many consecutive transient errors.
+        After cooldown one failure opens it again, one success closes it
+        :param threshold: Consecutive errors opening the circuit
+        :param cooldown: Time while circuit is open (Seconds)
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_until = 0.
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self.opened_until
+
+    def check(self):
+        """
+        Raise :class:`CircuitOpen` if requests are not allowed now
+        """
+        if self.is_open:
+            raise CircuitOpen
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_until = time.monotonic() + self.cooldown
+                self.failures = self.threshold - 1
@@ -0,0 +1,256 @@
+"""
+Choosing country for `get_number` by expected cost per received code. Pass :class:`Router` to a wrapper,
+and `get_number` without country uses the best ranked one, falling back to the next when it runs out of numbers
+"""
+from array import array
+from collections import OrderedDict
+from typing import Collection, NamedTuple, Optional, TYPE_CHECKING
+import threading
+
+from . import responses
+from .exceptions import NoNumbers
+
+if TYPE_CHECKING:
+    from .wrapper import SmsHubWrapper
+    from .asyncio.wrapper import AsyncSmsHubWrapper
+
+
+class Route(NamedTuple):
+    country: int
+    price: float
+    count: int
+    success_rate: float
+    arrival_time: float
+    score: float
+
+
+class _Series:
+    """
+    Ring buffers of last outcomes and arrival times of one service and country
+    """
+    __slots__ = ('outcomes', 'times', 'outcome_pos', 'time_pos', 'size', 'successes')
+
+    def __init__(self, window: int):
+        self.outcomes = array('b', bytes(window))
+        self.times = array('d', bytes(8 * window))
+        self.outcome_pos = 0
+        self.time_pos = 0
+        self.size = 0
+        self.successes = 0
+
+    def add(self, elapsed: float, received: bool):
+        window = len(self.outcomes)
+        if self.size == window:
+            self.successes -= self.outcomes[self.outcome_pos]
+        else:
+            self.size += 1
+        self.outcomes[self.outcome_pos] = received
+        self.outcome_pos = (self.outcome_pos + 1) % window
+        self.successes += received
+        if received:
+            self.times[self.time_pos % window] = elapsed
+            self.time_pos += 1
+
+    def arrival_times(self) -> array:
+        return self.times[:min(self.time_pos, len(self.times))]
+
+
+class DeliveryStats:
+    def __init__(self, window: int = 200):
+        """
+        Rolling success rate and SMS arrival time for each service and country,
+        kept in fixed-size arrays. Safe to share between threads
+        :param window: Number of last outcomes kept for each service and country
+        """
+        self.window = window
+        self._series: dict[tuple[str, int], _Series] = {}
+        self._lock = threading.Lock()
+
+    def record(self, service: str, country: int, elapsed: float, received: bool):
+        """
+        :param service: Service code
+        :param country: Country ID
+        :param elapsed: Time spent waiting for SMS (Seconds)
+        :param received: `True` if code received, `False` on timeout
+        """
+        with self._lock:
+            series = self._series.get((service, country))
+            if series is None:
+                series = self._series[service, country] = _Series(self.window)
+            series.add(elapsed, received)
+
+    def samples(self, service: str, country: int) -> int:
+        """
+        :return: Number of outcomes kept
+        """
+        series = self._series.get((service, country))
+        return 0 if series is None else series.size
+
+    def success_rate(self, service: str, country: int, prior: float = 0.8, prior_weight: float = 5) -> float:
+        """
+        :param service: Service code
+        :param country: Country ID
+        :param prior: Rate assumed without data
+        :param prior_weight: Number of outcomes `prior` weighs as
+        :return: Share of waits which received code, smoothed towards `prior`
+        """
+        series = self._series.get((service, country))
+        if series is None:
+            return prior
+        with self._lock:
+            return (series.successes + prior * prior_weight) / (series.size + prior_weight)
+
+    def arrival_time(self, service: str, country: int, q: float = 0.5) -> Optional[float]:
+        """
+        :param service: Service code
+        :param country: Country ID
+        :param q: Quantile from 0 to 1
+        :return: Quantile of SMS arrival time (Seconds), `None` if no code received yet
+        """
+        series = self._series.get((service, country))
+        if series is None:
+            return None
+        with self._lock:
+            times = sorted(series.arrival_times())
+        if not times:
+            return None
+        return times[int(q * (len(times) - 1))]
+
+
+class Router:
+    def __init__(self, stats: Optional[DeliveryStats] = None, time_value: float = 0.01, default_time: float = 60,
+                 prior: float = 0.8, prior_weight: float = 5, min_count: int = 1, max_attempts: int = 3,
+                 countries: Optional[Collection[int]] = None, exclude: Optional[Collection[int]] = None,
+                 track: int = 10000):
+        """
+        Ranks countries by expected cost per received code:
+        `(price + time_value * median arrival time) / success rate`.
+        Prices and numbers quantity come from `get_prices` (use wrapper cache to avoid a request every time),
+        success rates and arrival times from past `wait_for_sms` and pollers of activations using the wrapper
+        :param stats: :class:`DeliveryStats` (optional). May be shared between routers
+        :param time_value: Cost of one second of waiting, in price units
+        :param default_time: Arrival time assumed without data (Seconds)
+        :param prior: Success rate assumed without data
+        :param prior_weight: Number of outcomes `prior` weighs as
+        :param min_count: Minimal numbers quantity of a country to use it
+        :param max_attempts: Number of best countries to try before giving up
+        :param countries: Only these country IDs (optional)
+        :param exclude: Never these country IDs (optional)
+        :param track: Number of last routed activations whose country is remembered
+        """
+        self.stats = stats if stats is not None else DeliveryStats()
+        self.time_value = time_value
+        self.default_time = default_time
+        self.prior = prior
+        self.prior_weight = prior_weight
+        self.min_count = min_count
+        self.max_attempts = max_attempts
+        self.countries = countries
+        self.exclude = exclude
+        self.track = track
+        self._routed: OrderedDict[int, int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def rank(self, service: str, prices: dict[str, dict[str, dict[str, int]]]) -> list[Route]:
+        """
+        :param service: Service code
+        :param prices: Response of `get_prices`
+        :return: Countries having numbers, best first
+        """
+        routes = []
+        for country, services in prices.items():
+            offers = services.get(service) if services else None
+            if not offers:
+                continue
+            country = int(country)
+            if self.countries is not None and country not in self.countries:
+                continue
+            if self.exclude is not None and country in self.exclude:
+                continue
+            available = [(float(price), int(count)) for price, count in offers.items() if int(count) >= self.min_count]
+            if not available:
+                continue
+            price, count = min(available)
+            rate = self.stats.success_rate(service, country, self.prior, self.prior_weight)
+            arrival = self.stats.arrival_time(service, country)
+            arrival = self.default_time if arrival is None else arrival
+            score = (price + self.time_value * arrival) / rate if rate > 0 else float('inf')
+            routes.append(Route(country, price, count, rate, arrival, score))
+        routes.sort(key=lambda r: r.score)
+        return routes
+
+    def get_number(self, wrapper: 'SmsHubWrapper', service: str, operator: Optional[str] = None) -> \
+            responses.Number:
+        """
+        Get number in the best country, trying the next ones if it has no numbers.
+        Without price data SmsHub chooses country
+        :param wrapper: :class:`SmsHubWrapper`
+        :param service: Service code
+        :param operator: Operator code
+        :return: Activation ID and phone number
+        """
+        routes = self.rank(service, wrapper.get_prices(service=service))
+        if not routes:
+            return wrapper._get_number(service, operator, None)
+        error = None
+        for route in routes[:self.max_attempts]:
+            try:
+                number = wrapper._get_number(service, operator, route.country)
+            except NoNumbers as e:
+                error = e
+                continue
+            self._remember(number.activation_id, route.country)
+            return number
+        raise error
+
+    async def async_get_number(self, wrapper: 'AsyncSmsHubWrapper', service: str, operator: Optional[str] = '') -> \
+            responses.Number:
+        """
+        Get number in the best country, trying the next ones if it has no numbers.
+        Without price data SmsHub chooses country
+        :param wrapper: :class:`AsyncSmsHubWrapper`
+        :param service: Service code
+        :param operator: Operator code
+        :return: Activation ID and phone number
+        """
+        routes = self.rank(service, await wrapper.get_prices(service=service))
+        if not routes:
+            return await wrapper._get_number(service, operator, '')
+        error = None
+        for route in routes[:self.max_attempts]:
+            try:
+                number = await wrapper._get_number(service, operator, route.country)
+            except NoNumbers as e:
+                error = e
+                continue
+            self._remember(number.activation_id, route.country)
+            return number
+        raise error
+
+    def country_of(self, activation_id: int) -> Optional[int]:
+        """
+        :param activation_id: Activation ID got through this router
+        :return: Country ID chosen for it, `None` if unknown
+        """
+        with self._lock:
+            return self._routed.get(activation_id)
+
+    def record(self, activation, elapsed: float, received: bool):
+        """
+        Called when activation stops waiting for SMS
+        :param activation: Activation
+        :param elapsed: Time spent waiting (Seconds)
+        :param received: `True` if code received, `False` on timeout
+        """
+        country = activation.country_code
+        if country in (None, ''):
+            country = self.country_of(activation.activation_id)
+            if country is None:
+                return
+        self.stats.record(activation.service, int(country), elapsed, received)
+
+    def _remember(self, activation_id: int, country: int):
+        with self._lock:
+            self._routed[activation_id] = country
+            if len(self._routed) > self.track:
+                self._routed.popitem(last=False)
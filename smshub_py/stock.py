@@ -0,0 +1,258 @@
+"""
+Watching numbers quantity from `getNumbersStatus`. Subscribers are notified when stock of a service crosses
+their threshold, and purchase workers may wait for numbers instead of retrying `getNumber` on `NO_NUMBERS`
+"""
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Collection, Iterable, NamedTuple, Optional
+import threading
+import time
+
+from .exceptions import CircuitOpen, TimeoutException
+
+_Pair = tuple[Optional[int], Optional[str]]
+
+
+class StockChange(NamedTuple):
+    country: Optional[int]
+    operator: Optional[str]
+    service: str
+    previous: Optional[int]
+    count: int
+
+    @property
+    def delta(self) -> int:
+        return self.count - (self.previous or 0)
+
+
+class _Subscription:
+    __slots__ = ('callback', 'services', 'threshold')
+
+    def __init__(self, callback: Callable[[StockChange], None], services: Optional[Collection[str]],
+                 threshold: int):
+        self.callback = callback
+        self.services = services
+        self.threshold = threshold
+
+    def wants(self, change: StockChange) -> bool:
+        if self.services is not None and change.service not in self.services:
+            return False
+        if change.previous is None:
+            return change.count >= self.threshold
+        return (change.previous < self.threshold) != (change.count < self.threshold)
+
+
+class StockBook:
+    def __init__(self):
+        """
+        Last numbers quantity of each (country, operator) pair, kept as arrays indexed by service,
+        and changes between responses. Shared by :class:`StockWatcher` and :class:`AsyncStockWatcher`
+        """
+        self._index: dict[str, int] = {}
+        self._services: list[str] = []
+        self._counts: dict[_Pair, array] = {}
+        self._lock = threading.Lock()
+
+    def apply(self, pair: _Pair, status: dict[str, int]) -> list[StockChange]:
+        """
+        Record `get_number_status` response
+        :param pair: Country ID and operator code of the request
+        :param status: Response
+        :return: Services whose quantity changed. `previous` is `None` in the first response of the pair
+        """
+        with self._lock:
+            for service in status:
+                if service not in self._index:
+                    self._index[service] = len(self._services)
+                    self._services.append(service)
+            counts = array('l', bytes(array('l').itemsize * len(self._services)))
+            for service, count in status.items():
+                counts[self._index[service]] = int(count)
+            old = self._counts.get(pair)
+            self._counts[pair] = counts
+        changes = []
+        for i, count in enumerate(counts):
+            previous = None if old is None else old[i] if i < len(old) else 0
+            if previous != count and (previous is not None or count):
+                changes.append(StockChange(pair[0], pair[1], self._services[i], previous, count))
+        return changes
+
+    def count(self, pair: _Pair, service: str) -> Optional[int]:
+        """
+        :return: Last known quantity, `None` if the pair was not received yet
+        """
+        counts = self._counts.get(pair)
+        if counts is None:
+            return None
+        i = self._index.get(service)
+        return 0 if i is None or i >= len(counts) else counts[i]
+
+    def snapshot(self, pair: _Pair) -> dict[str, int]:
+        """
+        :return: `Dict` service - numbers quantity of services in stock, empty if not received yet
+        """
+        counts = self._counts.get(pair, ())
+        return {self._services[i]: count for i, count in enumerate(counts) if count}
+
+
+class _BaseStockWatcher:
+    def __init__(self, wrapper, pairs: Iterable[_Pair], interval: float, threshold: int, max_concurrency: int):
+        self.wrapper = wrapper
+        self.pairs: list[_Pair] = list(dict.fromkeys(pairs))
+        self.interval = interval
+        self.threshold = threshold
+        self.max_concurrency = max_concurrency
+        self.book = StockBook()
+        self.errors: dict[_Pair, Exception] = {}
+        # The last error raised by callback of each subscription
+        self.callback_errors: dict[_Subscription, Exception] = {}
+        self._subscriptions: list[_Subscription] = []
+
+    def subscribe(self, callback: Callable[[StockChange], None], services: Optional[Collection[str]] = None,
+                  threshold: Optional[int] = None) -> _Subscription:
+        """
+        Call `callback` with :class:`StockChange` when quantity of a service crosses `threshold`,
+        in either direction
+        :param callback: Function called from polling threads or task. Its errors are kept in `callback_errors`
+        :param services: Only these service codes (optional)
+        :param threshold: Quantity to watch. Watcher default if not passed
+        :return: Subscription for :meth:`unsubscribe`
+        """
+        subscription = _Subscription(callback, None if services is None else frozenset(services),
+                                     self.threshold if threshold is None else threshold)
+        self._subscriptions = [*self._subscriptions, subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: _Subscription):
+        self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+        self.callback_errors.pop(subscription, None)
+
+    def add(self, country: Optional[int], operator: Optional[str]):
+        """
+        Watch one more (country, operator) pair. It is polled at once
+        """
+        if (country, operator) not in self.pairs:
+            self.pairs = [*self.pairs, (country, operator)]
+            self._wake()
+
+    def count(self, service: str, country: Optional[int], operator: Optional[str]) -> Optional[int]:
+        """
+        :return: Last known quantity, `None` if not received yet
+        """
+        return self.book.count((country, operator), service)
+
+    def snapshot(self, country: Optional[int], operator: Optional[str]) -> dict[str, int]:
+        """
+        :return: `Dict` service - numbers quantity of services in stock
+        """
+        return self.book.snapshot((country, operator))
+
+    def _wake(self):
+        pass
+
+    def _publish(self, pair: _Pair, status: dict[str, int]):
+        self.errors.pop(pair, None)
+        for change in self.book.apply(pair, status):
+            for subscription in self._subscriptions:
+                if subscription.wants(change):
+                    try:
+                        subscription.callback(change)
+                    except Exception as e:
+                        # Polling goes on for other subscribers and waiters
+                        self.callback_errors[subscription] = e
+
+    def _failed(self, pair: _Pair, error: Exception):
+        # Transient errors keep the last snapshot and are retried next round
+        if not isinstance(error, (*self.wrapper._transient_errors, CircuitOpen)):
+            self.errors[pair] = error
+
+
+class StockWatcher(_BaseStockWatcher):
+    def __init__(self, wrapper, pairs: Iterable[_Pair] = (), interval: float = 5, threshold: int = 1,
+                 max_concurrency: int = 4):
+        """
+        Polls `getNumbersStatus` of (country, operator) pairs every `interval` from a background thread
+        :param wrapper: :class:`SmsHubWrapper`
+        :param pairs: Pairs of country ID and operator code, `None` for SmsHub default
+        :param interval: Interval of requests for each pair (Seconds)
+        :param threshold: Default quantity subscribers are notified about
+        :param max_concurrency: Maximum number of simultaneous requests
+        """
+        super().__init__(wrapper, pairs, interval, threshold, max_concurrency)
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        """
+        Start polling in background thread
+        """
+        if self._thread is None:
+            self._stop.clear()
+            self._wakeup.clear()
+            self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop polling
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._wakeup.set()
+            self._thread.join()
+            self._thread = None
+
+    def wait_for(self, service: str, country: Optional[int] = None, operator: Optional[str] = None,
+                 min_count: int = 1, timeout: Optional[float] = None) -> int:
+        """
+        Wait until numbers of service are in stock. The pair is watched if it was not
+        :param service: Service code
+        :param country: Country ID
+        :param operator: Operator code
+        :param min_count: Minimal numbers quantity
+        :param timeout: Timeout (Seconds). When time is off :class:`TimeoutException` will be raised
+        :return: Numbers quantity
+        """
+        pair = (country, operator)
+        self.add(country, operator)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if pair in self.errors:
+                    raise self.errors[pair]
+                count = self.book.count(pair, service)
+                if count is not None and count >= min_count:
+                    return count
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutException
+                self._cond.wait(remaining)
+
+    def _wake(self):
+        self._wakeup.set()
+
+    def _poll(self, pair: _Pair):
+        try:
+            self._publish(pair, self.wrapper.get_number_status(*pair))
+        except Exception as e:
+            self._failed(pair, e)
+        with self._cond:
+            self._cond.notify_all()
+
+    def _run(self):
+        with ThreadPoolExecutor(self.max_concurrency) as executor:
+            while not self._stop.is_set():
+                start = time.monotonic()
+                self._wakeup.clear()
+                list(executor.map(self._poll, self.pairs))
+                # New pairs are polled at once
+                self._wakeup.wait(max(start + self.interval - time.monotonic(), 0))
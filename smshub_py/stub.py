@@ -0,0 +1,223 @@
+"""
+Local stand-in for SmsHub `handler_api.php` for tests and benchmarks without network::
+
+    with SmsHubStub(sms_delay=lambda: 2) as stub:
+        w = SmsHubWrapper('KEY', base_url=stub.base_url)
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Union
+from urllib.parse import urlsplit, parse_qs
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+
+from .status import *
+
+DEFAULT_PRICES = {
+    (country, service): (round(5 + (country * 7 + len(service) * 3) % 40 * 0.5, 2), 100 + country * 10)
+    for country in range(0, 16) for service in ('vk', 'ok', 'wa', 'tg', 'go', 'fb', 'ig', 'tw')
+}
+
+
+class _Activation:
+    __slots__ = ('service', 'country', 'price', 'status', 'code', 'sms_at')
+
+    def __init__(self, service: str, country: int, price: float, sms_at: Optional[float]):
+        self.service = service
+        self.country = country
+        self.price = price
+        self.status = STATUS_WAIT_CODE
+        self.code = None
+        self.sms_at = sms_at
+
+
+class SmsHubStub:
+    def __init__(self, key: Optional[str] = None, balance: float = 1000.,
+                 prices: Optional[dict[tuple[int, str], tuple[float, int]]] = None,
+                 latency: Union[float, Callable[[], float]] = 0.,
+                 sms_delay: Callable[[], Optional[float]] = lambda: random.expovariate(1 / 10),
+                 error_rate: float = 0., errors: tuple[str, ...] = ('ERROR_SQL',), server_error_rate: float = 0.,
+                 host: str = '127.0.0.1', port: int = 0):
+        """
+        SmsHub API served from memory, with activations following :mod:`smshub_py.status`
+        :param key: Accepted API key. Any key is accepted if not passed
+        :param balance: Initial balance
+        :param prices: `Dict` (country ID, service) - (price, numbers quantity)
+        :param latency: Response delay (Seconds) or function returning it
+        :param sms_delay: Function returning time from getting number or retry until SMS arrives (Seconds),
+            `None` if SMS never arrives
+        :param error_rate: Fraction of requests answered with one of `errors`
+        :param errors: Error responses to inject
+        :param server_error_rate: Fraction of requests answered with HTTP 500
+        :param host: Listen address
+        :param port: Listen port, 0 for any free port
+        """
+        self.key = key
+        self.balance = balance
+        self.prices = dict(DEFAULT_PRICES if prices is None else prices)
+        self.latency = latency
+        self.sms_delay = sms_delay
+        self.error_rate = error_rate
+        self.errors = errors
+        self.server_error_rate = server_error_rate
+        self.activations: dict[int, _Activation] = {}
+        self.requests: dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _handler(self))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/stubs/handler_api.php'
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        """
+        Serve in background thread
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, name='SmsHubStub', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def handle(self, query: dict[str, str]) -> tuple[int, str]:
+        """
+        :param query: Request parameters
+        :return: HTTP status and response body
+        """
+        action = query.get('action', '')
+        with self._lock:
+            self.requests[action] = self.requests.get(action, 0) + 1
+        if self.server_error_rate and random.random() < self.server_error_rate:
+            return 500, 'Internal Server Error'
+        if self.key is not None and query.get('api_key') != self.key:
+            return 200, 'BAD_KEY'
+        if self.error_rate and random.random() < self.error_rate:
+            return 200, random.choice(self.errors)
+        method = getattr(self, f'_{action}', None)
+        if method is None:
+            return 200, 'BAD_ACTION'
+        with self._lock:
+            return 200, method(query)
+
+    def _getBalance(self, query: dict[str, str]) -> str:
+        return f'ACCESS_BALANCE:{self.balance:.2f}'
+
+    def _getPrices(self, query: dict[str, str]) -> str:
+        service, country = query.get('service'), query.get('country')
+        prices = {}
+        for (c, s), (price, count) in self.prices.items():
+            if (service and s != service) or (country and c != int(country)):
+                continue
+            prices.setdefault(str(c), {})[s] = {f'{price:.2f}': count}
+        return json.dumps(prices)
+
+    def _getNumbersStatus(self, query: dict[str, str]) -> str:
+        country = int(query.get('country') or 0)
+        return json.dumps({s: count for (c, s), (_, count) in self.prices.items() if c == country})
+
+    def _getNumber(self, query: dict[str, str]) -> str:
+        service, country = query.get('service', ''), int(query.get('country') or 0)
+        offer = self.prices.get((country, service))
+        if offer is None:
+            return 'WRONG_SERVICE'
+        price, count = offer
+        if count <= 0:
+            return 'NO_NUMBERS'
+        if self.balance < price:
+            return 'NO_BALANCE'
+        self.balance -= price
+        self.prices[country, service] = (price, count - 1)
+        id_ = next(self._ids)
+        self.activations[id_] = _Activation(service, country, price, self._schedule_sms())
+        return f'ACCESS_NUMBER:{id_}:{79000000000 + id_}'
+
+    def _getStatus(self, query: dict[str, str]) -> str:
+        activation = self.activations.get(int(query.get('id') or 0))
+        if activation is None:
+            return 'NO_ACTIVATION'
+        self._deliver(activation)
+        if activation.status in (STATUS_OK, STATUS_WAIT_RETRY):
+            return f'{activation.status}:{activation.code}'
+        return activation.status
+
+    def _setStatus(self, query: dict[str, str]) -> str:
+        id_ = int(query.get('id') or 0)
+        activation = self.activations.get(id_)
+        if activation is None:
+            return 'NO_ACTIVATION'
+        self._deliver(activation)
+        status = int(query.get('status') or 0)
+        if status == SMS_SENT and activation.status == STATUS_WAIT_CODE:
+            return ACCESS_READY
+        if status == CANCEL and activation.status == STATUS_WAIT_CODE:
+            activation.status = STATUS_CANCEL
+            self.balance += activation.price
+            return ACCESS_CANCEL
+        if status == SMS_RETRY and activation.status == STATUS_OK:
+            activation.status = STATUS_WAIT_RETRY
+            activation.sms_at = self._schedule_sms()
+            return ACCESS_RETRY_GET
+        if status == SMS_ACCEPTED and activation.status in (STATUS_OK, STATUS_WAIT_RETRY):
+            del self.activations[id_]
+            return ACCESS_ACTIVATION
+        return 'BAD_STATUS'
+
+    @staticmethod
+    def _deliver(activation: _Activation):
+        if activation.status in (STATUS_WAIT_CODE, STATUS_WAIT_RETRY) and activation.sms_at is not None \
+                and time.monotonic() >= activation.sms_at:
+            activation.status = STATUS_OK
+            activation.code = f'{random.randrange(10 ** 6):06d}'
+
+    def _schedule_sms(self) -> Optional[float]:
+        delay = self.sms_delay()
+        return None if delay is None else time.monotonic() + delay
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients going away, e.g. with cancelled requests, are not errors of the stub
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def _handler(stub: SmsHubStub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            query = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+            latency = stub.latency() if callable(stub.latency) else stub.latency
+            if latency:
+                time.sleep(latency)
+            status, body = stub.handle(query)
+            data = body.encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json' if body[:1] in '{[' else 'text/plain')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            return
+
+    return Handler
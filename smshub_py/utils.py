@@ -1,7 +1,12 @@
-from .wrapper import SmsHubWrapper
-from .asyncio.wrapper import AsyncSmsHubWrapper
+from typing import Optional, TYPE_CHECKING
+import heapq
+
 from .exceptions import NoCountryException
 
+if TYPE_CHECKING:
+    from .wrapper import SmsHubWrapper
+    from .asyncio.wrapper import AsyncSmsHubWrapper
+
 __countries_id = {0: 'RU', 1: 'UA', 2: 'KZ', 3: 'CN', 4: 'PH', 5: 'MM', 6: 'ID', 7: 'MY', 8: 'KE', 9: 'TZ', 10: 'VN',
                   11: 'KP', 12: 'US', 13: 'IL', 14: 'HK', 15: 'PL', 16: 'GB', 18: 'CG', 19: 'NG', 21: 'EG', 22: 'IN',
                   23: 'IE', 24: 'KH', 25: 'LA', 26: 'HT', 27: 'CI', 28: 'GM', 29: 'RS', 30: 'YE', 31: 'ZA', 32: 'RO',
@@ -19,33 +24,39 @@ __countries_id = {0: 'RU', 1: 'UA', 2: 'KZ', 3: 'CN', 4: 'PH', 5: 'MM', 6: 'ID',
 __id_countries = {v: k for k, v in __countries_id.items()}
 
 
-def find_min_prices(wrapper: SmsHubWrapper, service: str, count: int = None) -> list[tuple[float, str, int]]:
+def _min_prices(prices: dict[str, dict[str, dict[str, int]]], service: str, count: Optional[int]) -> \
+        list[tuple[float, str, int]]:
+    offers = ((float(price), country, quantity)
+              for country, val in prices.items() if service in val
+              for price, quantity in val[service].items())
+    if count is None:
+        return sorted(offers, key=lambda x: x[0])
+    return heapq.nsmallest(count, offers, key=lambda x: x[0])
+
+
+def find_min_prices(wrapper: 'SmsHubWrapper', service: str, count: int = None) -> list[tuple[float, str, int]]:
     """
+    Cheapest offers of a service in all countries, one request per call.
+    Use :class:`smshub_py.pricebook.PriceBook` to run many queries on one response
     :param wrapper: :class:`SmsHubWrapper` wrapper object
     :param service: Service code
     :param count: Results count (optional)
     :return: List of tuples (price, country ID, numbers quantity) sorted by price
     """
-    ans = []
-    for country, val in wrapper.get_prices(service).items():
-        if service in val.keys():
-            ans.extend([(float(i[0]), country, i[1]) for i in val[service].items()])
-    return sorted(ans, key=lambda x: x[0])[:count]
+    return _min_prices(wrapper.get_prices(service), service, count)
 
 
-async def async_find_min_prices(wrapper: AsyncSmsHubWrapper, service: str, count: int = None) -> \
+async def async_find_min_prices(wrapper: 'AsyncSmsHubWrapper', service: str, count: int = None) -> \
         list[tuple[float, str, int]]:
     """
+    Cheapest offers of a service in all countries, one request per call.
+    Use :class:`smshub_py.pricebook.PriceBook` to run many queries on one response
     :param wrapper: :class:`AsyncSmsHubWrapper` wrapper object
     :param service: Service code
     :param count: Results count (optional)
     :return: List of tuples (price, country ID, numbers quantity) sorted by price
     """
-    ans = []
-    for country, val in (await wrapper.get_prices(service)).items():
-        if service in val.keys():
-            ans.extend([(float(i[0]), country, i[1]) for i in val[service].items()])
-    return sorted(ans, key=lambda x: x[0])[:count]
+    return _min_prices(await wrapper.get_prices(service), service, count)
 
 
 def id_to_country(id_: int) -> str:
@@ -1,51 +1,155 @@
-from typing import Optional
+from typing import Collection, Iterator, Optional, Union, TYPE_CHECKING
+import json
+import time
 import httpx
 
-from . import exceptions
-from .status import STATUS_WAIT_RETRY, STATUS_OK
+from . import exceptions, responses
+from .cache import TTLCache
+from .retry import RetryPolicy, CircuitBreaker
+from .instrumentation import Instrumentation
+
+from .status import CANCEL, SMS_ACCEPTED, ACCESS_CANCEL, ACCESS_ACTIVATION, STATUS_CANCEL
+
+if TYPE_CHECKING:
+    from .ratelimit import RateLimiter
+    from .journal import Journal
+    from .ledger import BalanceLedger
+    from .routing import Router
+
+
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
 
 
 class SmsHubWrapper:
     base_url = 'https://www.smshub.org/stubs/handler_api.php'
+    _transient_errors = (exceptions.SqlError, exceptions.ServerError, httpx.TransportError)
 
-    def __init__(self, key: str, proxy: Optional[str] = None):
+    def __init__(self, key: str, proxy: Optional[str] = None, timeout: Union[float, httpx.Timeout] = 10,
+                 limits: Optional[httpx.Limits] = None, http2: Optional[bool] = None,
+                 base_url: Optional[str] = None, cache: Optional[TTLCache] = None,
+                 limiter: Optional['RateLimiter'] = None, retry: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None, instrumentation: Optional[Instrumentation] = None,
+                 journal: Optional['Journal'] = None, router: Optional['Router'] = None,
+                 ledger: Optional['BalanceLedger'] = None):
         """
         Wrapper for SmsHub API
         :param key: API Key for SmsHub
         :param proxy: protocol://ip:port OR protocol://user:password@ip:port
+        :param timeout: Request timeout (Seconds) or :class:`httpx.Timeout`
+        :param limits: Connection pool limits, see :class:`httpx.Limits`
+        :param http2: Use HTTP/2. By default enabled when `h2` package is installed
+        :param base_url: SmsHub API endpoint (optional)
+        :param cache: :class:`TTLCache` for `get_prices` and `get_number_status` responses (optional).
+            Cached responses are shared between callers and must not be modified
+        :param limiter: :class:`RateLimiter` every request waits for (optional). May be shared between wrappers
+        :param retry: :class:`RetryPolicy` for transient errors (optional)
+        :param breaker: :class:`CircuitBreaker` failing requests fast while SmsHub is unavailable (optional)
+        :param instrumentation: :class:`Instrumentation` hooks, e.g. :class:`MetricsCollector` (optional)
+        :param journal: :class:`Journal` recording got numbers and status changes for crash recovery (optional)
+        :param router: :class:`Router` choosing country when `get_number` is called without it (optional)
+        :param ledger: :class:`BalanceLedger` answering `get_balance` locally between requests (optional).
+            Tracks one API key, so must not be shared with wrappers of other keys
         """
         self.key = key
+        self.cache = cache
+        self.limiter = limiter
+        self.retry = retry
+        self.breaker = breaker
+        self.instrumentation = instrumentation
+        self.journal = journal
+        self.router = router
+        self.ledger = ledger
         self.proxy = proxy
+        if base_url is not None:
+            self.base_url = base_url
+        self._client = httpx.Client(
+            proxy=proxy,
+            timeout=timeout,
+            limits=limits if limits is not None else httpx.Limits(max_connections=100, max_keepalive_connections=20,
+                                                                  keepalive_expiry=30),
+            http2=_HTTP2_AVAILABLE if http2 is None else http2
+        )
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        return
-
-    @staticmethod
-    def _process_status(r: httpx.Response):
-        if r.text == 'BAD_KEY':
-            raise exceptions.BadApiKey
-        elif r.text == 'ERROR_SQL':
-            raise exceptions.SqlError
-        elif r.text == 'NO_NUMBERS':
-            raise exceptions.NoNumbers
-        elif r.text == 'NO_BALANCE':
-            raise exceptions.NoBalance
-        elif r.text == 'WRONG_SERVICE':
-            raise exceptions.WrongService
-        elif r.text == 'NO_ACTIVATION':
-            raise exceptions.NoActivation
+        self.close()
+
+    def close(self):
+        """
+        Close underlying connection pool
+        """
+        self._client.close()
+
+    def _request(self, params: dict) -> str:
+        attempt = 0
+        while True:
+            if self.breaker is not None:
+                self.breaker.check()
+            try:
+                text = self._send(params)
+            except self._transient_errors as e:
+                if self.breaker is not None:
+                    self.breaker.failure()
+                if self.retry is None or not self.retry.should_retry(params['action'], attempt):
+                    raise
+                if self.instrumentation is not None:
+                    self.instrumentation.on_retry(params['action'], attempt, e)
+                time.sleep(self.retry.backoff(attempt))
+                attempt += 1
+                continue
+            if self.breaker is not None:
+                self.breaker.success()
+            return text
+
+    def _send(self, params: dict) -> str:
+        action = params['action']
+        if self.limiter is not None:
+            self.limiter.acquire(action)
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return self._get(params)[0]
+        instrumentation.before_request(action)
+        start = time.perf_counter()
+        size, error = 0, None
+        try:
+            text, size = self._get(params)
+            return text
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            instrumentation.after_request(action, time.perf_counter() - start, size, error)
+
+    def _get(self, params: dict) -> tuple[str, int]:
+        r = self._client.get(self.base_url, params={'api_key': self.key, **params})
+        if r.status_code >= 500:
+            raise exceptions.ServerError(r.status_code)
+        return responses.check(r.text), len(r.content)
+
+    def _request_json(self, params: dict):
+        if self.cache is None:
+            return json.loads(self._request(params))
+        key = (params['action'], params.get('service'), params.get('country'), params.get('operator'))
+        return self.cache.get_or_fetch(key, lambda: json.loads(self._request(params)))
 
     def get_balance(self) -> float:
         """
-        Get balance value
+        Get balance value. With `ledger` SmsHub is requested only when it is due to sync
         :return: Balance value
         """
-        req = httpx.get(self.base_url, params={'api_key': self.key, 'action': 'getBalance'}, proxies=self.proxy)
-        self._process_status(req)
-        return float(req.text.replace('ACCESS_BALANCE:', ''))
+        if self.ledger is not None and not self.ledger.due():
+            return self.ledger.balance
+        text = self._request({'action': 'getBalance'})
+        balance = responses.parse_balance(text)
+        if self.ledger is not None:
+            self.ledger.synced(balance)
+        return balance
 
     def get_number_status(self, country: Optional[int] = None, operator: Optional[str] = None) -> dict[str, int]:
         """
@@ -54,32 +158,43 @@ class SmsHubWrapper:
         :param operator: Operator code
         :return: `Dict` service - numbers quantity
         """
-        req = httpx.get(self.base_url, params={
-            'api_key': self.key,
+        return self._request_json({
             'action': 'getNumbersStatus',
             'country': country,
             'operator': operator
-        }, proxies=self.proxy)
-        self._process_status(req)
-        return req.json()
+        })
 
-    def get_number(self, service: str, operator: Optional[str] = None, country: Optional[int] = None) -> (int, int):
+    def get_number(self, service: str, operator: Optional[str] = None, country: Optional[int] = None) -> \
+            responses.Number:
         """
         Request for using number
         :param service: Service code
         :param operator: Operator code
-        :param country: Country ID
+        :param country: Country ID. Chosen by `router` if not passed
         :return: Activation ID and phone number
         """
-        req = httpx.get(self.base_url, params={
-            'api_key': self.key,
-            'action': 'getNumber',
-            'service': service,
-            'operator': operator,
-            'country': country
-        }, proxies=self.proxy)
-        self._process_status(req)
-        return tuple(map(int, req.text.split(':')[1:]))
+        if self.router is not None and country in (None, ''):
+            return self.router.get_number(self, service, operator)
+        return self._get_number(service, operator, country)
+
+    def _get_number(self, service: str, operator: Optional[str], country: Optional[int]) -> responses.Number:
+        try:
+            text = self._request({
+                'action': 'getNumber',
+                'service': service,
+                'operator': operator,
+                'country': country
+            })
+        except exceptions.NoBalance:
+            if self.ledger is not None:
+                self.ledger.invalidate()
+            raise
+        number = responses.parse_number(text)
+        if self.journal is not None:
+            self.journal.opened(number.activation_id, number.phone, service, country, operator)
+        if self.ledger is not None:
+            self.ledger.debit(number.activation_id, service, country)
+        return number
 
     def set_status(self, id_: int, status: int) -> str:
         """
@@ -88,31 +203,50 @@ class SmsHubWrapper:
         :param status: Status ID
         :return: Status message
         """
-        req = httpx.get(self.base_url, params={
-            'api_key': self.key,
-            'action': 'setStatus',
-            'id': id_,
-            'status': status
-        }, proxies=self.proxy)
-        self._process_status(req)
-        return req.text
+        try:
+            text = self._request({
+                'action': 'setStatus',
+                'id': id_,
+                'status': status
+            })
+        except exceptions.NoActivation:
+            if self.journal is not None:
+                self.journal.closed(id_)
+            if self.ledger is not None:
+                self.ledger.settle(id_)
+            raise
+        if self.journal is not None:
+            self.journal.status_set(id_, status, text)
+        if self.ledger is not None:
+            if status == CANCEL and text == ACCESS_CANCEL:
+                self.ledger.refund(id_)
+            elif status == SMS_ACCEPTED and text == ACCESS_ACTIVATION:
+                self.ledger.settle(id_)
+        return text
 
-    def get_status(self, id_: int) -> (int, int):
+    def get_status(self, id_: int) -> responses.Status:
         """
         Get status of activation
         :param id_: Activation ID
         :return: Status message, with code if possible
         """
-        req = httpx.get(self.base_url, params={
-            'api_key': self.key,
-            'action': 'getStatus',
-            'id': id_
-        }, proxies=self.proxy)
-        self._process_status(req)
-        if req.text.startswith(STATUS_WAIT_RETRY) or req.text.startswith(STATUS_OK):
-            status, code = req.text.split(':')
-            return status, code
-        return req.text, 0
+        try:
+            text = self._request({
+                'action': 'getStatus',
+                'id': id_
+            })
+        except exceptions.NoActivation:
+            if self.journal is not None:
+                self.journal.closed(id_)
+            if self.ledger is not None:
+                self.ledger.settle(id_)
+            raise
+        status = responses.parse_status(text)
+        if self.journal is not None:
+            self.journal.status_got(id_, status.status)
+        if self.ledger is not None and status.status == STATUS_CANCEL:
+            self.ledger.refund(id_)
+        return status
 
     def get_prices(self, service: str = None, country: int = None) -> dict[str, dict[str, dict[str, int]]]:
         """
@@ -121,11 +255,56 @@ class SmsHubWrapper:
         :param country: Country ID
         :return: `Dict` with prices
         """
-        req = httpx.get(self.base_url, params={
-            'api_key': self.key,
+        prices = self._request_json({
             'action': 'getPrices',
             'service': service,
             'country': country
-        }, proxies=self.proxy)
-        self._process_status(req)
-        return req.json()
+        })
+        if self.ledger is not None:
+            self.ledger.prices_received(service, country, prices)
+        return prices
+
+    def stream_prices(self, service: Optional[str] = None, country: Optional[int] = None,
+                      services: Optional[Collection[str]] = None,
+                      countries: Optional[Collection[int]] = None) -> Iterator[responses.PriceRecord]:
+        """
+        Get prices parsed while the response is being received. Uses much less memory than `get_prices`
+        for unfiltered responses and yields first offers before the body is complete.
+        Not cached and not retried, because offers may already be consumed when an error occurs
+        :param service: Service code, filtered by SmsHub
+        :param country: Country ID, filtered by SmsHub
+        :param services: Only offers of these service codes, filtered while parsing (optional)
+        :param countries: Only offers of these country IDs, filtered while parsing (optional)
+        :return: Iterator of offers (country ID, service code, price, numbers quantity) in response order
+        """
+        action = 'getPrices'
+        if self.breaker is not None:
+            self.breaker.check()
+        if self.limiter is not None:
+            self.limiter.acquire(action)
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.before_request(action)
+        parser = responses.PriceParser(services, countries)
+        params = {'api_key': self.key, 'action': action, 'service': service, 'country': country}
+        start = time.perf_counter()
+        size, error = 0, None
+        try:
+            with self._client.stream('GET', self.base_url, params=params) as r:
+                if r.status_code >= 500:
+                    raise exceptions.ServerError(r.status_code)
+                for chunk in r.iter_bytes():
+                    size += len(chunk)
+                    yield from parser.feed(chunk)
+            yield from parser.close()
+        except Exception as e:
+            error = e
+            if self.breaker is not None and isinstance(e, self._transient_errors):
+                self.breaker.failure()
+            raise
+        else:
+            if self.breaker is not None:
+                self.breaker.success()
+        finally:
+            if instrumentation is not None:
+                instrumentation.after_request(action, time.perf_counter() - start, size, error)
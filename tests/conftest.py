@@ -0,0 +1,35 @@
+import pytest
+
+from smshub_py.stub import SmsHubStub
+from smshub_py.wrapper import SmsHubWrapper
+
+
+class FakeClock:
+    """
+    Stand-in for the `time` module of a tested module
+    """
+
+    def __init__(self, now: float = 1000.):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def stub():
+    # SMS never arrives unless a test changes `sms_delay`
+    with SmsHubStub(sms_delay=lambda: None) as stub:
+        yield stub
+
+
+@pytest.fixture
+def wrapper(stub):
+    with SmsHubWrapper('KEY', base_url=stub.base_url) as w:
+        yield w
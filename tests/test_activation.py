@@ -0,0 +1,162 @@
+import asyncio
+
+import pytest
+
+from smshub_py.activation import SmsActivation
+from smshub_py.asyncio.activation import AsyncSmsActivation
+from smshub_py.asyncio.wrapper import AsyncSmsHubWrapper
+from smshub_py.exceptions import SqlError
+from smshub_py.instrumentation import MetricsCollector
+from smshub_py.status import STATUS_CANCEL, STATUS_OK, STATUS_WAIT_CODE
+from smshub_py.wrapper import SmsHubWrapper
+
+
+@pytest.fixture
+def metrics():
+    return MetricsCollector()
+
+
+@pytest.fixture
+def instrumented(stub, metrics):
+    with SmsHubWrapper('KEY', base_url=stub.base_url, instrumentation=metrics) as w:
+        yield w
+
+
+def test_from_number_makes_no_requests(stub, wrapper):
+    bought = SmsActivation(None, 'tg', country=1, wrapper=wrapper, lazy=True)
+    requests = dict(stub.requests)
+    a = SmsActivation.from_number(bought.activation_id, bought.phone, 'tg', wrapper=wrapper, country=1)
+    assert stub.requests == requests and a.status is None
+    a.update_status()
+    assert a.status == STATUS_WAIT_CODE and stub.requests['getStatus'] == 1
+
+
+def test_lazy_skips_status_request(stub, wrapper):
+    stub.sms_delay = lambda: 0
+    a = SmsActivation(None, 'tg', country=1, wrapper=wrapper, lazy=True)
+    assert stub.requests == {'getNumber': 1} and a.status == STATUS_WAIT_CODE
+    # Status is fetched on demand
+    a.update_status()
+    assert a.status == STATUS_OK and stub.requests['getStatus'] == 1
+    SmsActivation(None, 'tg', country=1, wrapper=wrapper)
+    assert stub.requests == {'getNumber': 2, 'getStatus': 2}
+
+
+def test_async_lazy_and_from_number(stub):
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url) as w:
+            a = AsyncSmsActivation(None, 'tg', country=1, wrapper=w, lazy=True)
+            # Number is got on first use
+            assert stub.requests == {} and a.activation_id is None
+            async with a:
+                assert stub.requests == {'getNumber': 1} and a.status == STATUS_WAIT_CODE
+                await a.init_()
+                taken = AsyncSmsActivation.from_number(a.activation_id, a.phone, 'tg', wrapper=w, country=1)
+                await taken.init_()
+                assert stub.requests == {'getNumber': 1} and taken.status is None
+                await a.cancel()
+
+    asyncio.run(main())
+
+
+def test_released_on_exception(stub, instrumented, metrics):
+    with pytest.raises(ValueError):
+        with SmsActivation(None, 'tg', country=1, wrapper=instrumented) as a:
+            raise ValueError
+    assert a.closed and stub.activations[a.activation_id].status == STATUS_CANCEL
+    assert metrics.leaked == 0
+
+
+def test_code_finished_on_exception(stub, instrumented):
+    stub.sms_delay = lambda: 0
+    with pytest.raises(ValueError):
+        with SmsActivation(None, 'tg', country=1, wrapper=instrumented) as a:
+            raise ValueError
+    # Code was received, so the activation is finished instead of cancelled
+    assert a.closed and a.activation_id not in stub.activations
+
+
+def test_open_on_normal_exit_is_leak(stub, instrumented, metrics):
+    with SmsActivation(None, 'tg', country=1, wrapper=instrumented) as a:
+        pass
+    assert not a.closed and stub.activations[a.activation_id].status == STATUS_WAIT_CODE
+    assert metrics.leaked == 1
+
+
+def test_failed_release_is_leak(stub, instrumented, metrics):
+    with pytest.raises(ValueError):
+        with SmsActivation(None, 'tg', country=1, wrapper=instrumented):
+            stub.errors, stub.error_rate = ('ERROR_SQL',), 1.
+            raise ValueError
+    assert metrics.leaked == 1
+
+
+def test_released_when_first_status_fails(stub, metrics, monkeypatch):
+    stub._getStatus = lambda query: 'ERROR_SQL'
+    closed = []
+    monkeypatch.setattr(SmsHubWrapper, 'base_url', stub.base_url)
+    monkeypatch.setattr(SmsHubWrapper, 'close', lambda self: closed.append(self))
+    with pytest.raises(SqlError):
+        SmsActivation('KEY', 'tg', country=1)
+    [activation] = stub.activations.values()
+    assert activation.status == STATUS_CANCEL
+    # Own wrapper is closed
+    assert len(closed) == 1
+
+
+def test_async_released_on_cancellation(stub, metrics):
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url, instrumentation=metrics) as w:
+            a = AsyncSmsActivation(None, 'tg', country=1, wrapper=w)
+
+            async def work():
+                async with a:
+                    await asyncio.sleep(10)
+
+            task = asyncio.create_task(work())
+            await asyncio.sleep(0.3)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return a
+
+    a = asyncio.run(main())
+    assert a.closed and stub.activations[a.activation_id].status == STATUS_CANCEL
+    assert metrics.leaked == 0
+
+
+def test_async_released_when_first_status_fails(stub, metrics):
+    stub._getStatus = lambda query: 'ERROR_SQL'
+
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url, instrumentation=metrics) as w:
+            with pytest.raises(SqlError):
+                async with AsyncSmsActivation(None, 'tg', country=1, wrapper=w):
+                    pass
+
+    asyncio.run(main())
+    [activation] = stub.activations.values()
+    assert activation.status == STATUS_CANCEL
+    assert metrics.leaked == 0
+
+
+def test_async_own_wrapper_closed_when_first_status_fails(stub, monkeypatch):
+    stub._getStatus = lambda query: 'ERROR_SQL'
+    closed = []
+
+    async def close(self):
+        closed.append(self)
+
+    monkeypatch.setattr(AsyncSmsHubWrapper, 'base_url', stub.base_url)
+    monkeypatch.setattr(AsyncSmsHubWrapper, 'close', close)
+
+    async def main():
+        a = AsyncSmsActivation('KEY', 'tg', country=1)
+        with pytest.raises(SqlError):
+            await a.init_()
+        # `close` is replaced, so the session is closed here
+        await a.wrapper.session.close()
+
+    asyncio.run(main())
+    [activation] = stub.activations.values()
+    assert activation.status == STATUS_CANCEL and len(closed) == 1
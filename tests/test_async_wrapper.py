@@ -0,0 +1,41 @@
+import asyncio
+
+from smshub_py.asyncio.wrapper import AsyncSmsHubWrapper
+
+
+def test_session_reused_within_loop(stub):
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url) as w:
+            await w.get_balance()
+            session = w.session
+            await w.get_balance()
+            return session is w.session, session
+
+    reused, session = asyncio.run(main())
+    # Closed by __aexit__
+    assert reused and session.closed
+
+
+def test_close(stub):
+    async def main():
+        w = AsyncSmsHubWrapper('KEY', base_url=stub.base_url)
+        await w.get_balance()
+        session = w.session
+        await w.close()
+        # Closing twice is harmless
+        await w.close()
+        return session, w._session
+
+    session, current = asyncio.run(main())
+    assert session.closed and current is None
+
+
+def test_second_event_loop(stub):
+    w = AsyncSmsHubWrapper('KEY', base_url=stub.base_url)
+    first = asyncio.run(w.get_balance())
+    session = w._session
+    assert asyncio.run(w.get_balance()) == first
+    # Session of the finished loop is replaced
+    assert w._session is not session and session.closed
+    asyncio.run(w.close())
+    assert w._session is None and stub.requests['getBalance'] == 2
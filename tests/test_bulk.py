@@ -0,0 +1,58 @@
+import asyncio
+
+from smshub_py.asyncio.bulk import async_acquire_many, async_release_all
+from smshub_py.asyncio.wrapper import AsyncSmsHubWrapper
+from smshub_py.bulk import acquire_many, release_all
+from smshub_py.exceptions import NoBalance, NoNumbers
+from smshub_py.status import STATUS_CANCEL
+
+
+def test_country_fallback(stub, wrapper):
+    stub.prices = {(1, 'tg'): (10., 2), (2, 'tg'): (12., 10)}
+    result = acquire_many(wrapper, 'tg', 5, countries=[1, 2], max_concurrency=3)
+    assert sorted(a.country_code for a in result.activations) == [1, 1, 2, 2, 2]
+    assert result.failures == [] and result.not_attempted == 0
+    assert not release_all(result.activations)
+    assert all(a.status == STATUS_CANCEL for a in stub.activations.values())
+
+
+def test_all_countries_exhausted(stub, wrapper):
+    stub.prices = {(1, 'tg'): (10., 1), (2, 'tg'): (12., 1)}
+    result = acquire_many(wrapper, 'tg', 4, countries=[1, 2], max_concurrency=1)
+    assert sorted(a.country_code for a in result.activations) == [1, 2]
+    # The last country is found empty once, then no country is tried again
+    assert [(f.country, type(f.error)) for f in result.failures] == [(2, NoNumbers)]
+    assert result.not_attempted == 1 and stub.requests['getNumber'] == 4
+    assert not result.stopped
+
+
+def test_last_country_failure_reported(stub, wrapper):
+    stub.prices = {(1, 'tg'): (10., 0)}
+    result = acquire_many(wrapper, 'tg', 1, countries=[1])
+    assert [(f.country, type(f.error)) for f in result.failures] == [(1, NoNumbers)]
+
+
+def test_stop_on_no_balance(stub, wrapper):
+    stub.prices = {(1, 'tg'): (10., 100)}
+    stub.balance = 25
+    result = acquire_many(wrapper, 'tg', 10, countries=[1], max_concurrency=1)
+    assert len(result.activations) == 2
+    assert result.stopped and [type(f.error) for f in result.failures] == [NoBalance]
+    # No requests after the stop
+    assert result.not_attempted == 7 and stub.requests['getNumber'] == 3
+
+
+def test_async_fallback_and_stop(stub):
+    stub.prices = {(1, 'tg'): (10., 1), (2, 'tg'): (10., 100)}
+    stub.balance = 35
+
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url) as w:
+            result = await async_acquire_many(w, 'tg', 6, countries=[1, 2], max_concurrency=1)
+            errors = await async_release_all(result.activations)
+            return result, errors
+
+    result, errors = asyncio.run(main())
+    assert [a.country_code for a in result.activations] == [1, 2, 2]
+    assert result.stopped and result.not_attempted == 2 and not errors
+    assert all(a.status == STATUS_CANCEL for a in stub.activations.values())
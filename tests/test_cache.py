@@ -0,0 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+
+import pytest
+
+from smshub_py import cache as cache_module
+from smshub_py.asyncio.cache import AsyncTTLCache
+from smshub_py.cache import TTLCache
+
+from conftest import FakeClock
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache_module, 'time', clock)
+    return clock
+
+
+class Source:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.calls
+
+
+def wait_refreshed(cache: TTLCache):
+    deadline = time.monotonic() + 5
+    while cache._inflight and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_fresh_stale_expired(clock):
+    cache, fetch = TTLCache(ttl=10, stale_ttl=5), Source()
+    assert cache.get_or_fetch('k', fetch) == 1
+    clock.advance(9)
+    assert cache.get_or_fetch('k', fetch) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Stale entry is returned at once and refreshed in background
+    clock.advance(2)
+    assert cache.get_or_fetch('k', fetch) == 1
+    wait_refreshed(cache)
+    assert cache.stale_hits == 1 and fetch.calls == 2
+    assert cache.get_or_fetch('k', fetch) == 2
+
+    # Expired beyond stale time
+    clock.advance(16)
+    assert cache.get_or_fetch('k', fetch) == 3
+    assert cache.misses == 2
+
+
+def test_stale_disabled(clock):
+    cache, fetch = TTLCache(ttl=10, stale_ttl=0), Source()
+    cache.get_or_fetch('k', fetch)
+    clock.advance(10)
+    assert cache.get_or_fetch('k', fetch) == 2
+    assert cache.stale_hits == 0
+
+
+def test_lru_eviction(clock):
+    cache = TTLCache(maxsize=2)
+    for key in 'abc':
+        cache.get_or_fetch(key, lambda: key)
+    assert len(cache) == 2 and cache.get_or_fetch('a', lambda: 'new') == 'new'
+
+
+def test_concurrent_misses_coalesced(clock):
+    cache, release, fetch = TTLCache(), threading.Event(), Source()
+
+    def slow():
+        release.wait(5)
+        return fetch()
+
+    with ThreadPoolExecutor(8) as executor:
+        futures = [executor.submit(cache.get_or_fetch, 'k', slow) for _ in range(8)]
+        deadline = time.monotonic() + 5
+        while cache.coalesced < 7 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        assert [f.result(5) for f in futures] == [1] * 8
+    assert fetch.calls == 1 and (cache.misses, cache.coalesced) == (1, 7)
+
+
+def test_error_shared_and_not_cached(clock):
+    cache, release = TTLCache(), threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError
+
+    with ThreadPoolExecutor(2) as executor:
+        futures = [executor.submit(cache.get_or_fetch, 'k', failing) for _ in range(2)]
+        deadline = time.monotonic() + 5
+        while not cache.coalesced and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(5)
+    assert len(cache) == 0 and not cache._inflight
+    assert cache.get_or_fetch('k', lambda: 1) == 1
+
+
+def test_async_coalesced_and_stale(clock):
+    calls = []
+
+    async def fetch():
+        calls.append(None)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        cache = AsyncTTLCache(ttl=10, stale_ttl=5)
+        assert await asyncio.gather(*(cache.get_or_fetch('k', fetch) for _ in range(5))) == [1] * 5
+        assert (cache.misses, cache.coalesced) == (1, 4)
+        clock.advance(11)
+        assert await cache.get_or_fetch('k', fetch) == 1
+        await asyncio.sleep(0.1)
+        assert await cache.get_or_fetch('k', fetch) == 2
+        assert cache.stale_hits == 1 and not cache._inflight
+
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+from smshub_py.activation import SmsActivation
+from smshub_py.engine import AsyncEngine, EngineWrapper
+from smshub_py.exceptions import TimeoutException
+from smshub_py.polling import FixedInterval
+
+
+def test_waits_share_engine_poller(stub):
+    stub.sms_delay = lambda: 0.3
+    with AsyncEngine(interval=0.05) as engine, \
+            EngineWrapper('KEY', base_url=stub.base_url, engine=engine) as w:
+        queued = []
+
+        def wait(_):
+            a = SmsActivation(None, 'tg', country=1, wrapper=w)
+            result = a.wait_for_sms()
+            return a.code is not None and result.polls > 0
+
+        with ThreadPoolExecutor(10) as executor:
+            futures = [executor.submit(wait, i) for i in range(10)]
+            deadline = time.monotonic() + 5
+            while not queued and time.monotonic() < deadline:
+                if len(engine.poller):
+                    queued.append(len(engine.poller))
+                time.sleep(0.01)
+            assert all(f.result(10) for f in futures)
+        assert queued and len(engine.poller) == 0
+
+
+def test_timeout(stub):
+    with EngineWrapper('KEY', base_url=stub.base_url) as w:
+        a = SmsActivation(None, 'tg', country=1, wrapper=w)
+        with pytest.raises(TimeoutException):
+            a.wait_for_sms(timeout=0.3)
+        assert a.polls > 0
+
+
+def test_close_releases_waiters(stub):
+    w = EngineWrapper('KEY', base_url=stub.base_url)
+    a = SmsActivation(None, 'tg', country=1, wrapper=w)
+    errors = []
+
+    def wait():
+        try:
+            a.wait_for_sms(timeout=60)
+        except CancelledError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=wait, daemon=True)
+    thread.start()
+    time.sleep(0.3)
+    w.close()
+    thread.join(5)
+    assert not thread.is_alive() and errors
+
+
+def test_wait_uses_caller_policy(stub):
+    class Counting(FixedInterval):
+        delays = 0
+
+        def next_delay(self, activation, polls, elapsed):
+            Counting.delays += 1
+            return super().next_delay(activation, polls, elapsed)
+
+    stub.sms_delay = lambda: 0.3
+    # Engine default would poll once a minute
+    with AsyncEngine(interval=60) as engine, EngineWrapper('KEY', base_url=stub.base_url, engine=engine) as w:
+        a = SmsActivation(None, 'tg', country=1, wrapper=w)
+        assert a.wait_for_sms(interval=0.05, timeout=5).polls > 1
+        b = SmsActivation(None, 'tg', country=1, wrapper=w)
+        assert b.wait_for_sms(timeout=5, policy=Counting(0.05)).polls > 1
+        assert Counting.delays > 0
+
+
+def test_close_with_shared_engine(stub):
+    with AsyncEngine(interval=0.05) as engine:
+        closing = EngineWrapper('KEY', base_url=stub.base_url, engine=engine)
+        other = EngineWrapper('KEY', base_url=stub.base_url, engine=engine)
+        waiting = SmsActivation(None, 'tg', country=1, wrapper=closing)
+        errors = []
+
+        def wait():
+            try:
+                waiting.wait_for_sms(timeout=60)
+            except CancelledError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=wait, daemon=True)
+        thread.start()
+        time.sleep(0.3)
+        closing.close()
+        thread.join(5)
+        assert not thread.is_alive() and errors
+        # Nothing polls through the closed wrapper, so its session is not reopened
+        polls = stub.requests['getStatus']
+        time.sleep(0.3)
+        assert stub.requests['getStatus'] == polls and closing.wrapper._session is None
+        assert len(engine.poller) == 0
+
+        # The shared poller keeps serving other wrappers
+        stub.sms_delay = lambda: 0.1
+        a = SmsActivation(None, 'tg', country=1, wrapper=other)
+        assert a.wait_for_sms(timeout=5).polls > 0
+        with pytest.raises(CancelledError):
+            SmsActivation.from_number(waiting.activation_id, waiting.phone, 'tg', wrapper=closing).wait_for_sms()
+        other.close()
@@ -0,0 +1,38 @@
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+import smshub_py
+
+ROOT = Path(__file__).parents[1]
+
+
+def test_no_http_clients_on_import():
+    code = ("import smshub_py, smshub_py.utils, smshub_py.status, sys; "
+            "assert 'httpx' not in sys.modules and 'aiohttp' not in sys.modules, sorted(sys.modules)")
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=ROOT)
+
+
+def test_sync_use_does_not_load_aiohttp():
+    code = ("import smshub_py, sys; smshub_py.SmsActivation; "
+            "assert 'httpx' in sys.modules and 'aiohttp' not in sys.modules")
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=ROOT)
+
+
+@pytest.mark.parametrize('name', smshub_py.__all__)
+def test_lazy_names_resolve(name):
+    value = getattr(smshub_py, name)
+    assert value.__name__ == name and name in dir(smshub_py)
+
+
+def test_unknown_name():
+    with pytest.raises(AttributeError):
+        smshub_py.Unknown
+
+
+def test_star_import_of_status():
+    namespace = {}
+    exec('from smshub_py.status import *', namespace)
+    assert not [name for name in namespace if name.startswith('STATE')]
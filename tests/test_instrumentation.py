@@ -0,0 +1,75 @@
+import pytest
+
+from smshub_py.exceptions import SqlError
+from smshub_py.instrumentation import Histogram, MetricsCollector
+
+
+@pytest.fixture
+def metrics():
+    metrics = MetricsCollector(latency_buckets=(0.1, 0.5, 1), poll_buckets=(1, 5))
+    for latency in (0.05, 0.05, 0.3, 2):
+        metrics.before_request('getStatus')
+        metrics.after_request('getStatus', latency, 10, None)
+    metrics.before_request('getNumber')
+    metrics.after_request('getNumber', 0.2, 7, SqlError())
+    metrics.on_retry('getNumber', 0, SqlError())
+    metrics.after_request('getNumber', 0.4, 25, None)
+    metrics.on_wait(3, 10., True)
+    metrics.on_wait(8, 120., False)
+    metrics.on_leak(123)
+    return metrics
+
+
+def test_histogram_percentiles():
+    histogram = Histogram((1, 2, 3))
+    assert histogram.percentile(50) == 0
+    for value in (0.5, 1, 1.5, 2.5, 10):
+        histogram.observe(value)
+    # Values equal to a bound go to its bucket
+    assert histogram.counts == [2, 1, 1, 1]
+    assert [histogram.percentile(q) for q in (0, 40, 50, 60, 80, 100)] == [1, 1, 2, 2, 3, float('inf')]
+    assert (histogram.sum, histogram.count) == (15.5, 5)
+
+
+def test_summary(metrics):
+    summary = metrics.summary(percentiles=(50, 75, 100))
+    assert summary['getStatus'] == {'count': 4, 'mean': pytest.approx(0.6), 'p50': 0.1, 'p75': 0.5,
+                                    'p100': float('inf'), 'bytes': 40, 'errors': 0, 'retries': 0}
+    assert summary['getNumber'] == {'count': 2, 'mean': pytest.approx(0.3), 'p50': 0.5, 'p75': 0.5, 'p100': 0.5,
+                                    'bytes': 32, 'errors': 1, 'retries': 1}
+
+
+def test_waits_and_leaks(metrics):
+    assert metrics.polls.counts == [0, 1, 0] and metrics.timeouts == 1
+    assert metrics.leaked == 1
+    assert metrics.errors == {('getNumber', 'SqlError'): 1}
+
+
+def test_openmetrics(metrics):
+    lines = metrics.to_openmetrics(prefix='test').splitlines()
+    assert lines[0] == '# TYPE test_request_duration_seconds histogram'
+    assert lines[-1] == '# EOF'
+    for line in ('test_request_duration_seconds_bucket{action="getStatus",le="0.1"} 2',
+                 'test_request_duration_seconds_bucket{action="getStatus",le="1"} 3',
+                 'test_request_duration_seconds_bucket{action="getStatus",le="+Inf"} 4',
+                 'test_request_duration_seconds_count{action="getStatus"} 4',
+                 'test_response_bytes_total{action="getNumber"} 32',
+                 'test_errors_total{action="getNumber",error="SqlError"} 1',
+                 'test_retries_total{action="getNumber"} 1',
+                 'test_wait_polls_bucket{le="5"} 1',
+                 'test_wait_polls_count 1',
+                 'test_wait_timeouts_total 1',
+                 'test_leaked_activations_total 1'):
+        assert line in lines
+    # Every sample belongs to a family declared before it
+    families = [line.split()[2] for line in lines if line.startswith('# TYPE')]
+    assert len(families) == len(set(families))
+    for line in lines:
+        if not line.startswith('#'):
+            assert any(line.startswith(family) for family in families)
+
+
+def test_empty():
+    metrics = MetricsCollector()
+    assert metrics.summary() == {}
+    assert metrics.to_openmetrics().endswith('smshub_leaked_activations_total 0\n# EOF\n')
@@ -0,0 +1,167 @@
+import asyncio
+import threading
+
+import pytest
+
+from smshub_py.asyncio.journal import async_cancel_open, async_recover
+from smshub_py.asyncio.poller import AsyncActivationPoller
+from smshub_py.asyncio.wrapper import AsyncSmsHubWrapper
+from smshub_py.journal import FileJournal, Journal, SqliteJournal, _replay, cancel_open, recover
+from smshub_py.status import *
+from smshub_py.wrapper import SmsHubWrapper
+
+NUMBER = {'phone': 79000000001, 'service': 'tg', 'country': 0, 'operator': None}
+
+
+def number(id_: int, ts: float = 1.):
+    return ts, 'number', id_, {**NUMBER, 'phone': 79000000000 + id_}
+
+
+@pytest.fixture(params=[FileJournal, SqliteJournal])
+def journal(request, tmp_path):
+    with request.param(str(tmp_path / 'journal'), flush_interval=60) as journal:
+        yield journal
+
+
+def test_replay():
+    records = _replay([
+        number(1), number(2), number(3), number(4), number(5),
+        (2., 'status', 1, {'status': STATUS_OK}),
+        (2., 'finish', 2, None),
+        (2., 'cancel', 3, None),
+        (2., 'closed', 4, None),
+        (2., 'retry', 5, None),
+        # Events of unknown activations are ignored
+        (3., 'status', 6, {'status': STATUS_OK}),
+        (3., 'closed', 7, None),
+    ])
+    assert list(records) == [1, 5]
+    assert records[1].status == STATUS_OK
+    assert records[5].status == STATUS_WAIT_RETRY
+    assert records[5].phone == 79000000005 and records[5].opened_at == 1.
+
+
+def test_replay_number_again_reopens():
+    records = _replay([number(1), (2., 'cancel', 1, None), number(1, 3.)])
+    assert records[1].status == STATUS_WAIT_CODE and records[1].opened_at == 3.
+
+
+def test_events_and_compact(journal):
+    for id_ in (1, 2, 3):
+        journal.opened(id_, 79000000000 + id_, 'tg', 0, None)
+    journal.status_got(1, STATUS_WAIT_CODE)
+    journal.status_got(1, STATUS_OK)
+    journal.status_set(2, SMS_ACCEPTED, 'BAD_STATUS')
+    journal.status_set(3, CANCEL, ACCESS_CANCEL)
+    journal.flush()
+    before = list(journal._read())
+    assert [r.activation_id for r in journal.open_activations()] == [1, 2]
+    # Repeated status is not written
+    assert sum(e[1] == 'status' for e in before) == 1
+
+    journal.compact()
+    after = list(journal._read())
+    assert len(after) < len(before)
+    assert {e[2] for e in after} == {1, 2}
+    assert journal.open_activations() == list(_replay(before).values())
+    assert [r.status for r in journal.open_activations()] == [STATUS_OK, STATUS_WAIT_CODE]
+
+    # Still appendable after compaction
+    journal.status_set(1, SMS_ACCEPTED, ACCESS_ACTIVATION)
+    assert [r.activation_id for r in journal.open_activations()] == [2]
+
+
+def test_reopen(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    with FileJournal(path) as journal:
+        journal.opened(1, 79000000001, 'tg', 0, None)
+    with open(path, 'a') as f:
+        # Line torn by crash
+        f.write('[1.0,"clo')
+    with FileJournal(path) as journal:
+        journal.opened(2, 79000000002, 'tg', 0, None)
+        assert [r.activation_id for r in journal.open_activations()] == [1, 2]
+
+
+def test_recover(tmp_path, stub, wrapper):
+    with FileJournal(str(tmp_path / 'journal'), flush_interval=60) as journal:
+        w = SmsHubWrapper('KEY', base_url=stub.base_url, journal=journal)
+        id_, phone = w.get_number('tg', country=1)
+        w.get_status(id_)
+        activations = recover(journal, wrapper)
+        w.close()
+    assert [(a.activation_id, a.phone, a.status) for a in activations] == [(id_, phone, STATUS_WAIT_CODE)]
+
+
+def test_async_recover(tmp_path, stub):
+    stub.sms_delay = lambda: 0.1
+
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url, journal=journal) as w, \
+                AsyncActivationPoller(interval=0.05) as poller:
+            id_, _ = await w.get_number('tg', country=1)
+            received = asyncio.get_running_loop().create_future()
+            activations = await async_recover(journal, w, poller, callback=received.set_result)
+            assert [a.activation_id for a in activations] == [id_]
+            return await asyncio.wait_for(received, 5)
+
+    with FileJournal(str(tmp_path / 'journal'), flush_interval=60) as journal:
+        activation = asyncio.run(main())
+        assert activation.code is not None
+
+
+@pytest.mark.parametrize('same_journal', [True, False])
+def test_cancel_open_gone_activation(tmp_path, stub, same_journal):
+    with FileJournal(str(tmp_path / 'journal'), flush_interval=60) as journal:
+        w = SmsHubWrapper('KEY', base_url=stub.base_url, journal=journal)
+        gone, _ = w.get_number('tg', country=1)
+        alive, _ = w.get_number('tg', country=1)
+        del stub.activations[gone]
+        canceller = w if same_journal else SmsHubWrapper('KEY', base_url=stub.base_url)
+        result = cancel_open(journal, canceller)
+        assert sorted(result.cancelled) == [gone, alive] and result.failures == []
+        assert journal.open_activations() == []
+        w.close()
+        canceller.close()
+
+
+def test_async_cancel_open_gone_activation(tmp_path, stub):
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url, journal=journal) as w:
+            gone, _ = await w.get_number('tg', country=1)
+            del stub.activations[gone]
+            return await async_cancel_open(journal, w)
+
+    with FileJournal(str(tmp_path / 'journal'), flush_interval=60) as journal:
+        result = asyncio.run(main())
+        assert result.cancelled == [1]
+        assert journal.open_activations() == []
+
+
+class ThreadCheckingJournal(FileJournal):
+    def open_activations(self):
+        self.threads.append(threading.current_thread())
+        return super().open_activations()
+
+
+def test_async_helpers_read_journal_off_loop(tmp_path, stub):
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url, journal=journal) as w:
+            await w.get_number('tg', country=1)
+            assert len(await async_recover(journal, w)) == 1
+            return await async_cancel_open(journal, w)
+
+    with ThreadCheckingJournal(str(tmp_path / 'journal'), flush_interval=60) as journal:
+        journal.threads = []
+        result = asyncio.run(main())
+        assert result.cancelled == [1] and len(journal.threads) == 2
+        assert threading.main_thread() not in journal.threads
+
+
+def test_abstract():
+    class Incomplete(Journal):
+        def _read(self):
+            return []
+
+    with pytest.raises(TypeError):
+        Incomplete()
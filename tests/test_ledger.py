@@ -0,0 +1,54 @@
+from smshub_py.bulk import acquire_many
+from smshub_py.ledger import BalanceLedger
+from smshub_py.status import CANCEL
+from smshub_py.wrapper import SmsHubWrapper
+
+PRICES = {'1': [], '2': {'tg': {'10.50': 3, '9': 0}}, '3': {}}
+
+
+def test_price_of_empty_countries():
+    ledger = BalanceLedger()
+    ledger.prices_received(None, None, PRICES)
+    assert ledger.price_of('tg', 1) is None
+    assert ledger.price_of('tg', 2) == 10.5
+    assert ledger.price_of('tg', 3) is None
+    assert ledger.can_afford('tg', 1)
+
+
+def test_debit_never_raises():
+    ledger = BalanceLedger()
+    ledger.synced(100)
+    ledger.prices_received('tg', None, {'1': {'tg': 'malformed'}})
+    ledger.debit(1, 'tg', 1)
+    assert ledger.due() and ledger.balance == 100
+
+
+def test_wrapper_keeps_balance(stub):
+    ledger = BalanceLedger(sync_interval=3600)
+    with SmsHubWrapper('KEY', base_url=stub.base_url, ledger=ledger) as w:
+        assert w.get_balance() == stub.balance
+        w.get_prices('tg')
+        id_, _ = w.get_number('tg', country=1)
+        assert w.get_balance() == stub.balance
+        w.set_status(id_, CANCEL)
+        assert w.get_balance() == stub.balance
+        assert stub.requests['getBalance'] == 1
+
+
+def test_get_number_with_empty_countries(stub):
+    with SmsHubWrapper('KEY', base_url=stub.base_url, ledger=BalanceLedger()) as w:
+        w.get_balance()
+        w.ledger.prices_received(None, None, {'1': [], '2': []})
+        id_, _ = w.get_number('tg', country=1)
+        assert id_ in stub.activations
+        result = acquire_many(w, 'tg', 3, countries=[1])
+        assert len(result.activations) == 3 and result.failures == []
+
+
+def test_acquire_many_stops_when_short(stub):
+    with SmsHubWrapper('KEY', base_url=stub.base_url, ledger=BalanceLedger()) as w:
+        w.get_prices('tg')
+        w.ledger.synced(0)
+        result = acquire_many(w, 'tg', 3, countries=[1])
+        assert result.activations == [] and result.stopped
+        assert 'getNumber' not in stub.requests
@@ -0,0 +1,179 @@
+from concurrent.futures import CancelledError
+import asyncio
+import threading
+import time
+
+import pytest
+
+from smshub_py.activation import SmsActivation
+from smshub_py.asyncio.activation import AsyncSmsActivation
+from smshub_py.asyncio.poller import AsyncActivationPoller
+from smshub_py.asyncio.wrapper import AsyncSmsHubWrapper
+from smshub_py.exceptions import TimeoutException
+from smshub_py.poller import ActivationPoller
+from smshub_py.polling import FixedInterval
+
+
+def test_codes_received(stub, wrapper):
+    stub.sms_delay = lambda: 0.2
+    with ActivationPoller(interval=0.05) as poller:
+        activations = [SmsActivation(None, 'tg', country=1, wrapper=wrapper) for _ in range(5)]
+        futures = [poller.add(a) for a in activations]
+        assert [f.result(5) for f in futures] == [a.code for a in activations]
+    assert len(poller) == 0
+
+
+def test_timeout(wrapper):
+    with ActivationPoller(interval=0.05) as poller:
+        a = SmsActivation(None, 'tg', country=1, wrapper=wrapper)
+        with pytest.raises(TimeoutException):
+            poller.add(a, timeout=0.2).result(5)
+
+
+def test_stop_releases_waiters(stub, wrapper):
+    stub.latency = 0.1
+    poller = ActivationPoller(interval=0.05)
+    poller.start()
+    errors = []
+
+    def wait():
+        try:
+            SmsActivation(None, 'tg', country=1, wrapper=wrapper).wait_for_sms(poller=poller)
+        except CancelledError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=wait, daemon=True) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    poller.stop()
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert len(errors) == 4 and len(poller) == 0
+
+
+def test_stop_not_started(wrapper):
+    poller = ActivationPoller()
+    future = poller.add(SmsActivation(None, 'tg', country=1, wrapper=wrapper))
+    poller.stop()
+    assert future.cancelled()
+
+
+class CancellingPolicy(FixedInterval):
+    """
+    Cancels the future while the poller is about to resolve it
+    """
+
+    def __init__(self):
+        super().__init__(0.05)
+        self.future = None
+
+    def record(self, activation, elapsed: float):
+        self.future.cancel()
+
+
+def test_cancelled_while_resolving(stub, wrapper, caplog):
+    stub.sms_delay = lambda: 0
+    policy, called = CancellingPolicy(), []
+    with ActivationPoller(interval=0.05, workers=1) as poller:
+        policy.future = poller.add(SmsActivation(None, 'tg', country=1, wrapper=wrapper), called.append, policy=policy)
+        # Worker is not broken by the cancelled future
+        a = SmsActivation(None, 'tg', country=1, wrapper=wrapper)
+        assert poller.add(a).result(5) == a.code
+    assert policy.future.cancelled() and called == [] and not caplog.records
+
+
+def test_callback_failure_logged(stub, wrapper, caplog):
+    stub.sms_delay = lambda: 0
+
+    def callback(activation):
+        raise ValueError
+
+    with ActivationPoller(interval=0.05) as poller:
+        a = SmsActivation(None, 'tg', country=1, wrapper=wrapper)
+        assert poller.add(a, callback).result(5) == a.code
+        deadline = time.monotonic() + 5
+        while not caplog.records and time.monotonic() < deadline:
+            time.sleep(0.01)
+    [record] = caplog.records
+    assert record.name == 'smshub_py.poller' and record.exc_info[0] is ValueError
+    assert str(a.activation_id) in record.getMessage()
+
+
+def test_async_stop_cancels_pending(stub):
+    stub.latency = 0.1
+
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url) as w:
+            poller = AsyncActivationPoller(interval=0.05)
+            poller.start()
+            activations = []
+            for _ in range(4):
+                id_, phone = await w.get_number('tg', country=1)
+                activations.append(AsyncSmsActivation.from_number(id_, phone, 'tg', wrapper=w, country=1))
+            futures = [poller.add(a) for a in activations]
+            await asyncio.sleep(0.25)
+            await poller.stop()
+            return futures
+
+    futures = asyncio.run(main())
+    assert all(f.cancelled() for f in futures)
+
+
+async def new_activations(w: AsyncSmsHubWrapper, count: int = 3) -> list[AsyncSmsActivation]:
+    activations = [AsyncSmsActivation(None, 'tg', country=1, wrapper=w) for _ in range(count)]
+    for a in activations:
+        await a.init_()
+    return activations
+
+
+def test_async_iteration(stub):
+    stub.sms_delay = lambda: 0.1
+
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url) as w:
+            poller = AsyncActivationPoller(interval=0.05)
+            poller.start()
+            # Codes delivered through futures only are not kept for iteration
+            activations = await new_activations(w)
+            await asyncio.gather(*(poller.add(a) for a in activations))
+            assert poller._received is None
+
+            received = []
+
+            async def iterate():
+                async for a in poller:
+                    received.append(a)
+
+            iterating = asyncio.create_task(iterate())
+            await asyncio.sleep(0)
+            activations = await new_activations(w)
+            await asyncio.gather(*(poller.add(a) for a in activations))
+            await asyncio.sleep(0)
+            await poller.stop()
+            # `async for` ends on stop
+            await asyncio.wait_for(iterating, 5)
+            return activations, received
+
+    activations, received = asyncio.run(main())
+    assert sorted(a.activation_id for a in received) == sorted(a.activation_id for a in activations)
+
+
+def test_async_callback_failure_logged(stub, caplog):
+    stub.sms_delay = lambda: 0
+
+    def callback(activation):
+        raise ValueError
+
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url) as w, AsyncActivationPoller(interval=0.05) as poller:
+            [a] = await new_activations(w, 1)
+            assert await poller.add(a, callback) == a.code
+            await asyncio.sleep(0.05)
+            return a
+
+    a = asyncio.run(main())
+    [record] = caplog.records
+    assert record.name == 'smshub_py.asyncio.poller' and record.exc_info[0] is ValueError
+    assert str(a.activation_id) in record.getMessage()
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+
+from smshub_py import polling
+from smshub_py.activation import SmsActivation
+from smshub_py.exceptions import TimeoutException
+from smshub_py.polling import ExponentialBackoff, FastThenSlow, FixedInterval, HistoricalPolicy, WaitResult
+
+ACTIVATION = SimpleNamespace(service='tg', country_code=1)
+
+
+def test_exponential_backoff():
+    policy = ExponentialBackoff(initial=1, factor=2, maximum=10, jitter=0)
+    assert [policy.next_delay(ACTIVATION, polls, 0) for polls in range(7)] == [1, 1, 2, 4, 8, 10, 10]
+
+
+def test_exponential_backoff_jitter(monkeypatch):
+    policy = ExponentialBackoff(initial=4, factor=2, maximum=10, jitter=0.25)
+    monkeypatch.setattr(polling.random, 'uniform', lambda a, b: a)
+    assert policy.next_delay(ACTIVATION, 2, 0) == 6
+    monkeypatch.setattr(polling.random, 'uniform', lambda a, b: b)
+    assert policy.next_delay(ACTIVATION, 2, 0) == 10
+    # Jitter applies to capped interval too
+    assert policy.next_delay(ACTIVATION, 5, 0) == 12.5
+
+
+def test_fast_then_slow():
+    policy = FastThenSlow(fast=1, fast_for=30, slow=5)
+    assert [policy.next_delay(ACTIVATION, 1, elapsed) for elapsed in (0, 29.9, 30, 100)] == [1, 1, 5, 5]
+
+
+def test_historical_fallback_below_min_samples():
+    policy = HistoricalPolicy(fallback=FixedInterval(3), min_samples=3)
+    for elapsed in (10, 20):
+        policy.record(ACTIVATION, elapsed)
+    assert policy.arrival_window('tg', 1) is None
+    assert policy.next_delay(ACTIVATION, 1, 15) == 3
+
+
+def test_historical_arrival_window():
+    policy = HistoricalPolicy(min_samples=5, low=0.25, high=0.75)
+    for elapsed in (50, 10, 30, 20, 40):
+        policy.record(ACTIVATION, elapsed)
+    assert policy.arrival_window('tg', 1) == (20, 40)
+    # History is kept per service and country
+    assert policy.arrival_window('tg', 2) is None and policy.arrival_window('vk', 1) is None
+
+
+def test_historical_window_limit():
+    policy = HistoricalPolicy(min_samples=2, window=3, low=0, high=1)
+    for elapsed in (1, 100, 10, 20):
+        policy.record(ACTIVATION, elapsed)
+    # The first arrival has left the window
+    assert policy.arrival_window('tg', 1) == (10, 100)
+
+
+def test_historical_delays():
+    policy = HistoricalPolicy(fast=1, slow=5, min_samples=2, low=0, high=1)
+    policy.record(ACTIVATION, 20)
+    policy.record(ACTIVATION, 40)
+    # Before window: slow, but not past its start, and never faster than `fast`
+    assert policy.next_delay(ACTIVATION, 1, 0) == 5
+    assert policy.next_delay(ACTIVATION, 1, 17) == 3
+    assert policy.next_delay(ACTIVATION, 1, 19.5) == 1
+    # Inside window, then after it
+    assert policy.next_delay(ACTIVATION, 1, 30) == 1
+    assert policy.next_delay(ACTIVATION, 1, 40) == 5
+
+
+def test_wait_result(stub, wrapper):
+    stub.sms_delay = lambda: 0.2
+    policy = HistoricalPolicy(fallback=FixedInterval(0.05), min_samples=1)
+    a = SmsActivation(None, 'tg', country=1, wrapper=wrapper, lazy=True)
+    result = a.wait_for_sms(policy=policy)
+    assert isinstance(result, WaitResult)
+    assert result.polls == stub.requests['getStatus'] > 1
+    assert 0.15 < result.elapsed < 5
+    # Arrival is recorded in the policy
+    assert policy.arrival_window('tg', 1) is not None
+
+
+def test_wait_timeout(stub, wrapper):
+    a = SmsActivation(None, 'tg', country=1, wrapper=wrapper, lazy=True)
+    with pytest.raises(TimeoutException):
+        a.wait_for_sms(timeout=0.2, policy=FixedInterval(0.05))
+    assert stub.requests['getStatus'] >= 2
@@ -0,0 +1,124 @@
+import asyncio
+import itertools
+
+import pytest
+
+from smshub_py import exceptions
+from smshub_py.asyncio.pool import AsyncWrapperPool
+from smshub_py.journal import FileJournal
+from smshub_py.ledger import BalanceLedger
+from smshub_py.pool import WrapperPool
+from smshub_py.ratelimit import RateLimiter
+from smshub_py.retry import CircuitBreaker
+from smshub_py.status import CANCEL, ACCESS_CANCEL, STATUS_WAIT_CODE, STATUS_CANCEL
+from smshub_py.stub import SmsHubStub
+
+
+@pytest.fixture
+def stubs():
+    # One stub per key, with distinct activation IDs
+    with SmsHubStub(sms_delay=lambda: None) as a, SmsHubStub(sms_delay=lambda: None) as b:
+        b._ids = itertools.count(1000)
+        yield a, b
+
+
+def point(pool, stubs):
+    for wrapper, stub in zip(pool.wrappers, stubs):
+        wrapper.base_url = stub.base_url
+    return pool
+
+
+def test_sticky_routing(stubs):
+    with point(WrapperPool([('A', None), ('B', None)]), stubs) as pool:
+        numbers = [pool.get_number('tg', country=1) for _ in range(6)]
+        owners = {n.activation_id: pool._balancer.stick(n.activation_id) for n in numbers}
+        # Both keys got numbers, and each ID is served by the stub which issued it
+        assert {id_ >= 1000 for id_ in owners} == {False, True}
+        for n in numbers:
+            assert pool.get_status(n.activation_id).status == STATUS_WAIT_CODE
+            assert pool.set_status(n.activation_id, CANCEL) == ACCESS_CANCEL
+        assert all(x.status == STATUS_CANCEL for s in stubs for x in s.activations.values())
+
+
+def test_unknown_activation_finds_owner(stubs, tmp_path):
+    a, b = stubs
+    with FileJournal(str(tmp_path / 'journal'), flush_interval=60) as journal:
+        # Bought through key B by a previous run
+        with point(WrapperPool([('B', None)], journal=journal), [b]) as previous:
+            id_, _ = previous.get_number('tg', country=1)
+        with point(WrapperPool([('A', None), ('B', None)], journal=journal), stubs) as pool:
+            # Key A looks best
+            pool._balancer.members[1].latency = 10
+            assert pool.get_status(id_).status == STATUS_WAIT_CODE
+            assert pool._balancer.stick(id_) is pool._balancer.members[1]
+            assert [r.activation_id for r in journal.open_activations()] == [id_]
+            assert a.requests['getStatus'] == 1 and b.requests['getStatus'] == 2
+            # Remembered
+            pool.get_status(id_)
+            assert a.requests['getStatus'] == 1
+
+            # Unknown to every key
+            with pytest.raises(exceptions.NoActivation):
+                pool.get_status(99999)
+            assert pool._balancer.stick(99999) is None
+
+
+def test_unknown_activation_async(stubs):
+    a, b = stubs
+    id_ = int(b.handle({'action': 'getNumber', 'service': 'tg', 'country': '1'})[1].split(':')[1])
+
+    async def main():
+        async with point(AsyncWrapperPool([('A', ''), ('B', '')]), stubs) as pool:
+            pool._balancer.members[1].latency = 10
+            assert await pool.set_status(id_, CANCEL) == ACCESS_CANCEL
+            assert pool._balancer.stick(id_) is pool._balancer.members[1]
+
+    asyncio.run(main())
+
+
+def test_shared_breaker_and_limiter(stubs):
+    breaker, limiter = CircuitBreaker(threshold=1, cooldown=60), RateLimiter(1000)
+    with point(WrapperPool([('A', None), ('B', None)], breaker=breaker, limiter=limiter), stubs) as pool:
+        assert all(w.breaker is breaker and w.limiter is limiter for w in pool.wrappers)
+        for _ in range(4):
+            pool.get_number_status(1)
+        # One budget for all keys
+        assert limiter.requests['getNumbersStatus'] == 4
+
+
+def test_breaker_per_member(stubs):
+    a, b = stubs
+    with point(WrapperPool([('A', None), ('B', None)], failure_threshold=10,
+                           per_member=lambda key, proxy: {'breaker': CircuitBreaker(threshold=1, cooldown=60)}),
+               stubs) as pool:
+        breakers = [w.breaker for w in pool.wrappers]
+        assert breakers[0] is not breakers[1]
+        a.server_error_rate = 1.
+        pool._balancer.members[1].latency = 10
+        # Key A fails and opens its own circuit, key B keeps serving
+        with pytest.raises(exceptions.ServerError):
+            pool.get_number_status(1)
+        assert breakers[0].is_open and not breakers[1].is_open
+        assert pool.get_number_status(1)
+        assert b.requests['getNumbersStatus'] == 1
+
+
+def test_ejection(stubs):
+    a, b = stubs
+    a.key = 'OTHER'
+    with point(WrapperPool([('A', None), ('B', None)]), stubs) as pool:
+        pool._balancer.members[1].latency = 10
+        for _ in range(3):
+            assert pool.get_number('tg', country=1).activation_id >= 1000
+        assert isinstance(pool._balancer.members[0].ejected_by, exceptions.BadApiKey)
+        assert pool.get_balance() == b.balance
+
+
+def test_ledger_rejected():
+    with pytest.raises(ValueError):
+        WrapperPool([('A', None)], ledger=BalanceLedger())
+
+
+def test_no_credentials():
+    with pytest.raises(ValueError):
+        WrapperPool([])
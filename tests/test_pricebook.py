@@ -0,0 +1,71 @@
+import pytest
+
+from smshub_py.pricebook import Offer, PriceBook
+from smshub_py.utils import _min_prices
+
+PRICES = {
+    '0': {'tg': {'10.00': 5, '12.50': 1}, 'vk': {'3.00': 100}},
+    '1': {'tg': {'8.00': 0}, 'vk': {'4.00': 7}},
+    '2': {'tg': {'9.00': 3}},
+    '3': [],
+}
+
+
+@pytest.fixture
+def book():
+    return PriceBook(PRICES)
+
+
+def offers(book: PriceBook, service: str) -> list[tuple[float, int]]:
+    return [(o.price, o.country) for o in book.cheapest(service, min_count=0)]
+
+
+def test_cheapest(book):
+    assert len(book) == 6 and sorted(book.services) == ['tg', 'vk']
+    assert book.cheapest('tg') == [Offer(9., 2, 3, 'tg'), Offer(10., 0, 5, 'tg'), Offer(12.5, 0, 1, 'tg')]
+    assert book.cheapest('tg', count=1, min_count=4) == [Offer(10., 0, 5, 'tg')]
+    assert [o.country for o in book.cheapest('tg', countries={0})] == [0, 0]
+    assert [o.country for o in book.cheapest('tg', exclude={2})] == [0, 0]
+    assert book.cheapest('unknown') == []
+
+
+def test_cheapest_any(book):
+    assert [(o.price, o.service) for o in book.cheapest_any(['tg', 'vk'], count=3)] == \
+           [(3., 'vk'), (4., 'vk'), (9., 'tg')]
+
+
+def test_matches_find_min_prices(book):
+    expected = [(price, int(country), count) for price, country, count in _min_prices(PRICES, 'tg', None)]
+    assert [(o.price, o.country, o.count) for o in book.cheapest('tg', min_count=0)] == expected
+
+
+def test_update_whole_response(book):
+    book.update({'5': {'tg': {'1.00': 2}}})
+    # Everything else is gone
+    assert book.services == ['tg'] and offers(book, 'tg') == [(1., 5)]
+
+
+def test_update_service_scope(book):
+    book.update({'5': {'tg': {'1.00': 2}}}, service='tg')
+    assert offers(book, 'tg') == [(1., 5)]
+    # Other services are kept
+    assert offers(book, 'vk') == [(3., 0), (4., 1)]
+    # Service missing in the new response is removed
+    book.update({}, service='vk')
+    assert 'vk' not in book and 'tg' in book
+
+
+def test_update_country_scope(book):
+    book.update({'0': {'tg': {'11.00': 1}}}, country=0)
+    # Offers of country 0 replaced, vk of country 0 is gone, other countries kept
+    assert offers(book, 'tg') == [(8., 1), (9., 2), (11., 0)]
+    assert offers(book, 'vk') == [(4., 1)]
+
+
+def test_update_service_and_country_scope(book):
+    book.update({'0': {'tg': {'11.00': 1}}}, service='tg', country='0')
+    assert offers(book, 'tg') == [(8., 1), (9., 2), (11., 0)]
+    # Other service in the same country is kept
+    assert offers(book, 'vk') == [(3., 0), (4., 1)]
+    book.update({'2': []}, service='tg', country=2)
+    assert offers(book, 'tg') == [(8., 1), (11., 0)]
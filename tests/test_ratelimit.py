@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from smshub_py import ratelimit
+from smshub_py.ratelimit import FileBackend, LocalBackend, RateLimiter
+
+from conftest import FakeClock
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit, 'time', clock)
+    return clock
+
+
+@pytest.fixture(params=['local', 'file'])
+def backend(request, tmp_path):
+    return LocalBackend() if request.param == 'local' else FileBackend(str(tmp_path / 'state'))
+
+
+def test_burst_then_rate(clock, backend):
+    assert [backend.take('k', 2, 3) for _ in range(3)] == [0, 0, 0]
+    # Bucket is empty, each next token comes 1 / rate later
+    assert backend.take('k', 2, 3) == pytest.approx(0.5)
+    assert backend.take('k', 2, 3) == pytest.approx(1)
+    clock.advance(10)
+    # Refilled up to burst only
+    assert [backend.take('k', 2, 3) for _ in range(3)] == [0, 0, 0]
+    assert backend.take('k', 2, 3) > 0
+    # Buckets are independent
+    assert backend.take('other', 2, 3) == 0
+
+
+def test_clock_backwards_does_not_drain(clock, tmp_path):
+    backend = FileBackend(str(tmp_path / 'state'))
+    backend.take('k', 1, 5)
+    clock.advance(-3600)
+    assert backend.take('k', 1, 5) == 0
+
+
+def test_file_backend_shared(clock, tmp_path):
+    first, second = FileBackend(str(tmp_path / 'state')), FileBackend(str(tmp_path / 'state'))
+    assert first.take('k', 1, 2) == 0
+    assert second.take('k', 1, 2) == 0
+    assert first.take('k', 1, 2) == pytest.approx(1)
+
+
+@pytest.mark.parametrize('state', [b'{"k": [0.5', b'\xff\xfe', b'[]', b'{"k": "broken"}'])
+def test_file_backend_corrupt_state(clock, tmp_path, state):
+    path = tmp_path / 'state'
+    path.write_bytes(state)
+    backend = FileBackend(str(path))
+    assert backend.take('k', 1, 2) == 0
+    # State is rewritten and usable again
+    assert backend.take('k', 1, 2) == 0
+    assert backend.take('k', 1, 2) == pytest.approx(1)
+
+
+def test_file_backend_large_state(clock, tmp_path):
+    path = tmp_path / 'state'
+    # State is larger than one read
+    path.write_text(json.dumps({f'key-{i}': [2, clock.time()] for i in range(3000)}))
+    assert path.stat().st_size > 1 << 16
+    backend = FileBackend(str(path))
+    # Buckets at the end of the file are read too
+    assert [backend.take('key-2999', 1, 2) for _ in range(3)] == [0, 0, pytest.approx(1)]
+    assert len(json.loads(path.read_text())) == 3000
+
+
+def test_limiter_budgets(clock):
+    limiter = RateLimiter(1, burst=1, per_action={'getStatus': (10, 2)})
+    assert limiter.reserve('getBalance') == 0
+    # Actions without own budget share the default one
+    assert limiter.reserve('getPrices') == pytest.approx(1)
+    assert [limiter.reserve('getStatus') for _ in range(3)] == [0, 0, pytest.approx(0.1)]
+    assert limiter.requests == {'getBalance': 1, 'getPrices': 1, 'getStatus': 3}
+    assert limiter.mean_delay('getStatus') == pytest.approx(0.1 / 3)
+    assert limiter.max_delays['getPrices'] == pytest.approx(1)
+    assert limiter.mean_delay('getNumber') == 0
@@ -0,0 +1,120 @@
+import pytest
+
+from smshub_py import registry
+from smshub_py.exceptions import IncorrectResponse
+from smshub_py.registry import ActivationRegistry
+from smshub_py.status import STATUS_WAIT_CODE, STATUS_WAIT_RETRY, STATUS_OK, STATUS_CANCEL
+
+from conftest import FakeClock
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(registry, 'time', clock)
+    return clock
+
+
+def ids(records) -> list[int]:
+    return [r.activation_id for r in records]
+
+
+def test_add_get_update(clock):
+    r = ActivationRegistry(wrapper='w')
+    r.add(1, 79000000001, 'tg', 0, 'mts')
+    r.add(2, 79000000002, 'vk')
+    assert r.get(1) == registry.ActivationRecord(1, 79000000001, 'tg', 0, 'mts', 'w', STATUS_WAIT_CODE, None,
+                                                 clock.now, None)
+    assert r.get(2).country is None and r.get(2).operator is None
+    assert r.update(1, STATUS_OK, '123456')
+    assert (r.get(1).status, r.get(1).code) == (STATUS_OK, '123456')
+    assert not r.update(3, STATUS_OK, '1')
+    assert r.update(2, STATUS_CANCEL)
+    assert 2 not in r and len(r) == 1
+
+
+def test_older_than(clock):
+    r = ActivationRegistry()
+    for id_ in range(1, 6):
+        r.add(id_, 79000000000 + id_, 'tg')
+        clock.advance(10)
+    # Added at 0, 10, 20, 30 and 40 seconds, now is 50
+    assert ids(r.older_than(STATUS_WAIT_CODE, 25)) == [1, 2, 3]
+    assert ids(r.older_than(STATUS_WAIT_CODE, 50)) == [1]
+    assert r.older_than(STATUS_WAIT_CODE, 51) == []
+    # Changing status restarts time in status
+    r.update(2, STATUS_OK, '1')
+    assert ids(r.older_than(STATUS_WAIT_CODE, 25)) == [1, 3]
+    assert r.older_than(STATUS_OK, 1) == []
+    clock.advance(5)
+    assert ids(r.older_than(STATUS_OK, 5)) == [2]
+    # Same status keeps the time
+    r.update(2, STATUS_OK, '2')
+    assert ids(r.older_than(STATUS_OK, 5)) == [2]
+    r.update(2, STATUS_WAIT_RETRY, '2')
+    assert r.count(STATUS_OK) == 0 and r.count(STATUS_WAIT_RETRY) == 1
+    r.remove(1)
+    assert ids(r.older_than(STATUS_WAIT_CODE, 0)) == [3, 4, 5]
+
+
+def test_pop_expired(clock):
+    r = ActivationRegistry()
+    r.add(1, 1, 'tg', timeout=30)
+    r.add(2, 2, 'tg', timeout=10)
+    r.add(3, 3, 'tg', timeout=20)
+    r.add(4, 4, 'tg')
+    assert r.next_deadline() == clock.now + 10
+    assert r.pop_expired() == []
+    clock.advance(20)
+    assert ids(r.pop_expired()) == [2, 3]
+    # Returned once, and stays registered
+    assert r.pop_expired() == [] and 2 in r and r.get(2).deadline is None
+    assert r.next_deadline() == clock.now + 10
+
+
+def test_pop_expired_changed_and_removed(clock):
+    r = ActivationRegistry()
+    r.add(1, 1, 'tg', timeout=10)
+    r.add(2, 2, 'tg', timeout=10)
+    r.add(3, 3, 'tg', timeout=10)
+    r.set_timeout(1, 100)
+    r.set_timeout(3, None)
+    r.remove(2)
+    clock.advance(50)
+    assert r.pop_expired() == []
+    assert ids(r.pop_expired(clock.now + 50)) == [1]
+    assert r.next_deadline() is None
+
+
+def test_pop_expired_after_replacing(clock):
+    r = ActivationRegistry()
+    r.add(1, 1, 'tg', timeout=10)
+    r.remove(1)
+    r.add(1, 1, 'tg', timeout=30)
+    # Slot of the removed activation is reused
+    r.add(2, 2, 'tg', timeout=10)
+    assert len(r._ids) == 2
+    clock.advance(10)
+    assert ids(r.pop_expired()) == [2]
+    clock.advance(20)
+    assert ids(r.pop_expired()) == [1]
+
+
+def test_heap_pruned(clock):
+    r = ActivationRegistry()
+    r.add(1, 1, 'tg')
+    for i in range(1000):
+        r.set_timeout(1, i + 1)
+    assert len(r._heap) < 100
+    clock.advance(1000)
+    assert ids(r.pop_expired()) == [1]
+
+
+def test_unknown_status():
+    r = ActivationRegistry()
+    r.add(1, 1, 'tg')
+    for call in (lambda: r.add(2, 2, 'tg', status='STATUS_UNKNOWN'), lambda: r.update(1, 'BAD_KEY'),
+                 lambda: r.count('STATUS_UNKNOWN'), lambda: r.with_status(''), lambda: r.older_than('?', 0)):
+        with pytest.raises(IncorrectResponse):
+            call()
+    assert ids(r) == [1] and r.get(1).status == STATUS_WAIT_CODE
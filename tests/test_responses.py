@@ -0,0 +1,117 @@
+import json
+import random
+
+import pytest
+
+from smshub_py import exceptions
+from smshub_py.responses import (ERRORS, Number, PriceParser, PriceRecord, Status, check, parse_balance, parse_number,
+                                 parse_status)
+from smshub_py.status import STATUS_CANCEL, STATUS_OK, STATUS_WAIT_CODE, STATUS_WAIT_RETRY
+
+PRICES = {
+    '0': {'vk': {'10.50': 3, '12': 0}, 'tg': {'7.25': '15'}},
+    '1': [],
+    '16': {'wa': {'20': 1}},
+    '42': {},
+    '187': {'tg': {'5': 100, '5.50': 2}, 'go': {'1.10': 9}},
+    '999': [],
+}
+
+
+def expected(prices: dict) -> list[PriceRecord]:
+    return [PriceRecord(int(country), service, float(price), int(count))
+            for country, services in prices.items() if services
+            for service, offers in services.items()
+            for price, count in offers.items()]
+
+
+def parse(chunks, **kwargs) -> list[PriceRecord]:
+    parser = PriceParser(**kwargs)
+    records = []
+    for chunk in chunks:
+        records.extend(parser.feed(chunk))
+    return records + parser.close()
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_every_split_point(indent):
+    body = json.dumps(PRICES, indent=indent).encode()
+    for i in range(len(body) + 1):
+        assert parse([body[:i], body[i:]]) == expected(PRICES)
+
+
+def test_random_chunks():
+    rng = random.Random(7)
+    prices = {str(c): [] if c % 5 == 0 else {s: {f'{rng.uniform(1, 50):.2f}': rng.randrange(100)}
+                                            for s in ('vk', 'tg', 'wa', 'go')}
+              for c in range(200)}
+    body = json.dumps(prices).encode()
+    for _ in range(20):
+        cuts = sorted(rng.sample(range(1, len(body)), rng.randrange(1, 200)))
+        chunks = [body[i:j] for i, j in zip([0, *cuts], [*cuts, len(body)])]
+        assert parse(chunks) == expected(prices)
+
+
+def test_byte_by_byte_utf8():
+    body = json.dumps({'0': {'tg': {'1': 1}}, 'note': 'цена'}, ensure_ascii=False).encode()
+    assert parse([body[i:i + 1] for i in range(len(body))]) == [PriceRecord(0, 'tg', 1., 1)]
+
+
+def test_filters():
+    body = json.dumps(PRICES).encode()
+    assert parse([body], services={'tg'}, countries={187}) == [PriceRecord(187, 'tg', 5., 100),
+                                                                PriceRecord(187, 'tg', 5.5, 2)]
+
+
+def test_only_empty_countries():
+    assert parse([b'{"1": [], ', b'"2": []}']) == []
+    assert parse([b'[]']) == []
+
+
+def test_truncated():
+    with pytest.raises(exceptions.IncorrectResponse):
+        parse([json.dumps(PRICES).encode()[:-3]])
+
+
+def test_error_response():
+    with pytest.raises(exceptions.BadApiKey):
+        parse([b'BAD_', b'KEY'])
+
+
+@pytest.mark.parametrize('text, error', ERRORS.items())
+def test_check_errors(text, error):
+    with pytest.raises(error):
+        check(text)
+
+
+def test_check_passes_other_responses():
+    assert check('ACCESS_BALANCE:1.5') == 'ACCESS_BALANCE:1.5'
+    # Unknown response is left to the parsers
+    assert check('SOMETHING_ELSE') == 'SOMETHING_ELSE'
+
+
+def test_parse_balance():
+    assert parse_balance('ACCESS_BALANCE:12.34') == 12.34
+    for text in ('SOMETHING_ELSE', 'ACCESS_BALANCE', 'ACCESS_BALANCE:abc', 'ACCESS_NUMBER:1'):
+        with pytest.raises(exceptions.IncorrectResponse):
+            parse_balance(text)
+
+
+def test_parse_number():
+    assert parse_number('ACCESS_NUMBER:123:79001234567') == Number(123, 79001234567)
+    for text in ('SOMETHING_ELSE', 'ACCESS_NUMBER:123', 'ACCESS_NUMBER:1:2:3', 'ACCESS_NUMBER:x:79001234567',
+                 'ACCESS_BALANCE:123:79001234567'):
+        with pytest.raises(exceptions.IncorrectResponse):
+            parse_number(text)
+
+
+def test_parse_status():
+    assert parse_status(f'{STATUS_OK}:12345') == Status(STATUS_OK, '12345')
+    assert parse_status(f'{STATUS_WAIT_RETRY}:123') == Status(STATUS_WAIT_RETRY, '123')
+    # Code may contain colons
+    assert parse_status(f'{STATUS_OK}:a:b') == Status(STATUS_OK, 'a:b')
+    assert parse_status(STATUS_WAIT_CODE) == Status(STATUS_WAIT_CODE, 0)
+    assert parse_status(STATUS_CANCEL) == Status(STATUS_CANCEL, 0)
+    # Malformed status is returned as is
+    assert parse_status('GARBAGE:1') == Status('GARBAGE:1', 0)
+    assert parse_status('') == Status('', 0)
@@ -0,0 +1,65 @@
+import pytest
+
+from smshub_py import retry
+from smshub_py.exceptions import CircuitOpen, ServerError
+from smshub_py.retry import CircuitBreaker, RetryPolicy
+from smshub_py.wrapper import SmsHubWrapper
+
+from conftest import FakeClock
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(retry, 'time', clock)
+    return clock
+
+
+def test_breaker_transitions(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=30)
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    assert not breaker.is_open
+    breaker.check()
+
+    breaker.failure()
+    assert breaker.is_open
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    # Half-open after cooldown: one failure opens it again
+    clock.advance(30)
+    assert not breaker.is_open
+    breaker.failure()
+    assert breaker.is_open
+
+    # ...and one success closes it
+    clock.advance(30)
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    assert not breaker.is_open
+
+
+def test_breaker_in_wrapper(stub):
+    stub.server_error_rate = 1.
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    with SmsHubWrapper('KEY', base_url=stub.base_url, breaker=breaker) as w:
+        for _ in range(2):
+            with pytest.raises(ServerError):
+                w.get_balance()
+        requests = stub.requests['getBalance']
+        with pytest.raises(CircuitOpen):
+            w.get_balance()
+        assert stub.requests['getBalance'] == requests
+
+
+def test_retry_policy():
+    policy = RetryPolicy(attempts=2, base=1, cap=3)
+    assert policy.should_retry('getStatus', 0) and policy.should_retry('getStatus', 1)
+    assert not policy.should_retry('getStatus', 2)
+    assert not policy.should_retry('getNumber', 0)
+    assert all(0 <= policy.backoff(attempt) <= 3 for attempt in range(10) for _ in range(20))
@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+from smshub_py.activation import SmsActivation
+from smshub_py.asyncio.wrapper import AsyncSmsHubWrapper
+from smshub_py.exceptions import NoNumbers
+from smshub_py.routing import DeliveryStats, Router
+from smshub_py.wrapper import SmsHubWrapper
+
+PRICES = {
+    '1': {'tg': {'10.00': 5}},
+    '2': {'tg': {'12.00': 5, '11.00': 0}},
+    '3': {'tg': {'15.00': 5}},
+    '4': {'vk': {'1.00': 5}},
+    '5': [],
+}
+
+
+def countries(routes) -> list[int]:
+    return [r.country for r in routes]
+
+
+def test_rank_by_price_without_data():
+    routes = Router().rank('tg', PRICES)
+    assert countries(routes) == [1, 2, 3]
+    # Offers without numbers are skipped
+    assert routes[1].price == 12 and routes[1].success_rate == 0.8 and routes[1].arrival_time == 60
+
+
+def test_rank_by_delivery():
+    stats = DeliveryStats()
+    router = Router(stats, time_value=0.1)
+    for _ in range(20):
+        stats.record('tg', 1, 100, False)
+        stats.record('tg', 2, 100, True)
+        stats.record('tg', 3, 5, True)
+    # Country 1 rarely delivers, country 2 delivers slowly
+    assert countries(router.rank('tg', PRICES)) == [3, 2, 1]
+
+
+def test_rank_filters():
+    assert countries(Router(countries={2, 3}).rank('tg', PRICES)) == [2, 3]
+    assert countries(Router(exclude={1}).rank('tg', PRICES)) == [2, 3]
+    assert countries(Router(min_count=6).rank('tg', PRICES)) == []
+
+
+def test_delivery_stats_window():
+    stats = DeliveryStats(window=4)
+    for elapsed in (1, 2, 3, 4):
+        stats.record('tg', 1, elapsed, True)
+    stats.record('tg', 1, 100, False)
+    stats.record('tg', 1, 100, False)
+    assert stats.samples('tg', 1) == 4
+    # 2 successes of the last 4, smoothed towards the prior
+    assert stats.success_rate('tg', 1, prior=0.5, prior_weight=2) == pytest.approx(0.5)
+    assert stats.arrival_time('tg', 1) == 2 and stats.arrival_time('tg', 1, q=1) == 4
+    assert stats.success_rate('tg', 2) == 0.8 and stats.arrival_time('tg', 2) is None
+
+
+@pytest.fixture
+def routed(stub):
+    # Prices show numbers country 1 has already run out of
+    stub.prices = {(1, 'tg'): (10., 0), (2, 'tg'): (12., 5), (3, 'tg'): (15., 5)}
+    stub._getPrices = lambda query: json.dumps({str(c): {'tg': {'10.00': 5}} for c in (1, 2, 3)})
+    return stub
+
+
+def test_get_number_fallback(routed):
+    routed.sms_delay = lambda: 0
+    router = Router()
+    with SmsHubWrapper('KEY', base_url=routed.base_url, router=router) as w:
+        a = SmsActivation(None, 'tg', wrapper=w)
+        assert a.country_code == 2 and routed.activations[a.activation_id].country == 2
+        assert router.country_of(a.activation_id) == 2
+        # Outcome of the wait is recorded for the routed country
+        a.wait_for_sms(interval=0.05, timeout=5)
+    assert router.stats.samples('tg', 2) == 1 and router.stats.arrival_time('tg', 2) is not None
+
+
+def test_get_number_max_attempts(routed):
+    routed.prices[2, 'tg'] = (12., 0)
+    with SmsHubWrapper('KEY', base_url=routed.base_url, router=Router(max_attempts=2)) as w:
+        with pytest.raises(NoNumbers):
+            w.get_number('tg')
+    assert routed.requests['getNumber'] == 2
+
+
+def test_get_number_without_prices(stub):
+    stub._getPrices = lambda query: '{}'
+    with SmsHubWrapper('KEY', base_url=stub.base_url, router=Router()) as w:
+        # SmsHub chooses country
+        id_, _ = w.get_number('tg')
+    assert stub.activations[id_].country == 0
+
+
+def test_async_get_number_fallback(routed):
+    router = Router()
+
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=routed.base_url, router=router) as w:
+            return await w.get_number('tg')
+
+    id_, _ = asyncio.run(main())
+    assert router.country_of(id_) == 2 and routed.activations[id_].country == 2
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import pytest
+
+from smshub_py.asyncio.stock import AsyncStockWatcher
+from smshub_py.asyncio.wrapper import AsyncSmsHubWrapper
+from smshub_py.exceptions import TimeoutException
+from smshub_py.stock import StockBook, StockChange, StockWatcher
+
+
+def test_book_changes():
+    book = StockBook()
+    pair = (1, None)
+    assert book.apply(pair, {'tg': 5, 'vk': 0}) == [StockChange(1, None, 'tg', None, 5)]
+    assert book.apply(pair, {'tg': 5, 'wa': 2}) == [StockChange(1, None, 'wa', 0, 2)]
+    assert book.apply(pair, {'wa': 1}) == [StockChange(1, None, 'tg', 5, 0), StockChange(1, None, 'wa', 2, 1)]
+    assert book.count(pair, 'wa') == 1 and book.count(pair, 'tg') == 0 and book.count((2, None), 'tg') is None
+    assert book.snapshot(pair) == {'wa': 1}
+
+
+def test_threshold_crossing(stub, wrapper):
+    changes = []
+    with StockWatcher(wrapper, [(1, None)], interval=0.05) as watcher:
+        watcher.subscribe(changes.append, services={'tg'}, threshold=50)
+        watcher.wait_for('tg', 1, timeout=5)
+        stub.prices[1, 'tg'] = (1., 10)
+        watcher.wait_for('vk', 1, timeout=5)
+        deadline = time.monotonic() + 5
+        while len(changes) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    assert [(c.previous, c.count) for c in changes] == [(None, 110), (110, 10)]
+
+
+def test_failing_callback_keeps_polling(stub, wrapper):
+    received = []
+    with StockWatcher(wrapper, [(1, None)], interval=0.05) as watcher:
+        failing = watcher.subscribe(lambda change: 1 / 0)
+        watcher.subscribe(received.append)
+        watcher.wait_for('tg', 1, timeout=5)
+        stub.prices[2, 'tg'] = (1., 7)
+        assert watcher.wait_for('tg', 2, timeout=5) == 7
+        assert watcher._thread.is_alive()
+        assert isinstance(watcher.callback_errors[failing], ZeroDivisionError)
+        assert received
+        watcher.unsubscribe(failing)
+        assert failing not in watcher.callback_errors
+
+
+def test_wait_for_timeout(wrapper):
+    with StockWatcher(wrapper, [(1, None)], interval=0.05) as watcher:
+        with pytest.raises(TimeoutException):
+            watcher.wait_for('missing', 1, timeout=0.2)
+
+
+def test_async_failing_callback_keeps_polling(stub):
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url) as w:
+            async with AsyncStockWatcher(w, [(1, '')], interval=0.05) as watcher:
+                watcher.subscribe(lambda change: 1 / 0)
+                await watcher.wait_for('tg', 1, timeout=5)
+                stub.prices[2, 'tg'] = (1., 7)
+                count = await watcher.wait_for('tg', 2, timeout=5)
+                return count, watcher._runner.done()
+
+    assert asyncio.run(main()) == (7, False)
@@ -0,0 +1,87 @@
+import asyncio
+
+from smshub_py.asyncio.activation import AsyncSmsActivation
+from smshub_py.asyncio.watch import StatusWatcher, watch
+from smshub_py.asyncio.wrapper import AsyncSmsHubWrapper
+from smshub_py.status import CANCEL, STATUS_CANCEL, STATUS_OK, STATUS_WAIT_CODE
+
+
+async def collect(stream) -> list:
+    return [event async for event in stream]
+
+
+def run(stub, scenario):
+    async def main():
+        async with AsyncSmsHubWrapper('KEY', base_url=stub.base_url) as w:
+            watcher = StatusWatcher(interval=0.05)
+            a = AsyncSmsActivation(None, 'tg', country=1, wrapper=w)
+            await a.init_()
+            return await asyncio.wait_for(scenario(watcher, a), 5)
+
+    return asyncio.run(main())
+
+
+def test_shared_polling_and_deduplication(stub):
+    stub.sms_delay = lambda: 0.3
+
+    async def scenario(watcher, a):
+        first = asyncio.create_task(collect(watch(a, watcher=watcher)))
+        second = asyncio.create_task(collect(watch(a, a, watcher=watcher)))
+        await asyncio.sleep(0.1)
+        # One poll for both streams
+        assert len(watcher) == 1 and len(watcher._watches[a].queues) == 2
+        while a.status != STATUS_OK:
+            await asyncio.sleep(0.02)
+        await a.finish()
+        return await first, await second, len(watcher)
+
+    first, second, watched = run(stub, scenario)
+    # Repeated STATUS_WAIT_CODE is not published, streams end when activation is finished
+    assert [(e.status, e.previous) for e in first] == [(STATUS_OK, STATUS_WAIT_CODE)]
+    assert [(e.status, e.code) for e in second] == [(e.status, e.code) for e in first]
+    assert first[0].code is not None and watched == 0
+
+
+def test_ends_on_cancel_elsewhere(stub):
+    async def scenario(watcher, a):
+        stream = asyncio.create_task(collect(watch(a, watcher=watcher)))
+        await asyncio.sleep(0.1)
+        stub.handle({'action': 'setStatus', 'id': str(a.activation_id), 'status': str(CANCEL)})
+        return await stream
+
+    events = run(stub, scenario)
+    assert [e.status for e in events] == [STATUS_CANCEL]
+
+
+def test_ends_when_gone(stub):
+    async def scenario(watcher, a):
+        stream = asyncio.create_task(collect(watch(a, watcher=watcher)))
+        await asyncio.sleep(0.1)
+        del stub.activations[a.activation_id]
+        events = await stream
+        return events, a.closed
+
+    events, closed = run(stub, scenario)
+    assert events == [] and closed
+
+
+def test_stop_ends_streams(stub):
+    async def scenario(watcher, a):
+        stream = asyncio.create_task(collect(watch(a, watcher=watcher)))
+        await asyncio.sleep(0.1)
+        await watcher.stop()
+        return await stream, len(watcher)
+
+    assert run(stub, scenario) == ([], 0)
+
+
+def test_break_unsubscribes(stub):
+    stub.sms_delay = lambda: 0.1
+
+    async def scenario(watcher, a):
+        async for event in watch(a, watcher=watcher):
+            break
+        await asyncio.sleep(0.1)
+        return event.status, len(watcher), watcher._runner
+
+    assert run(stub, scenario) == (STATUS_OK, 0, None)
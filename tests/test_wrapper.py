@@ -0,0 +1,28 @@
+import httpx
+
+from smshub_py import wrapper as wrapper_module
+from smshub_py.wrapper import SmsHubWrapper
+
+
+def test_client_reused(stub, monkeypatch):
+    clients = []
+
+    class Client(httpx.Client):
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            clients.append(self)
+
+    monkeypatch.setattr(wrapper_module.httpx, 'Client', Client)
+    with SmsHubWrapper('KEY', base_url=stub.base_url) as w:
+        for _ in range(3):
+            assert w.get_balance() == stub.balance
+        w.get_number_status(country=1)
+        assert clients == [w._client] and not w._client.is_closed
+    assert w._client.is_closed
+
+
+def test_close(stub):
+    w = SmsHubWrapper('KEY', base_url=stub.base_url)
+    w.get_balance()
+    w.close()
+    assert w._client.is_closed